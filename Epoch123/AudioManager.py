@@ -1,45 +1,55 @@
-import numpy as np
-import soundfile as sf
-import pygame as pg
-import os
-import tempfile
 import logging
-from PySide6.QtWidgets import QWidget, QHBoxLayout, QMessageBox
-from PySide6.QtCore import QObject, Signal, QThread, QTimer
-from pydub import AudioSegment
+from PySide6.QtWidgets import QWidget, QHBoxLayout
+from PySide6.QtCore import Signal, QThread, QTimer
 from GUIElements import Button
-import time 
+from BackgroundTasks import TaskCancelled
+from core.AudioBuffer import AudioBuffer
+from core.PlaybackEngine import ArraySource, create_engine
 
 logging.basicConfig(level=logging.INFO)
 
-class AudioProcessor(QObject):
-    data_loaded = Signal(np.ndarray, float, object)
-    error_occurred = Signal(str)
-
-    def __init__(self, audio_path):
-        super().__init__()
+class AudioProcessor:
+    """
+        Decodes an audio file. Runs on a worker thread: FileNavigator submits
+        process_audio to a thread pool, and a newer selection sets cancel_event
+        so a stale load stops between decode steps instead of finishing.
+        With a waveform_cache the file's peak pyramid is built here too, so
+        the plot only has to load it; for long lazily read recordings that
+        is the only full pass over the file.
+    """
+    def __init__(self, audio_path, waveform_cache=None):
         self.audio_path = audio_path
+        self.waveform_cache = waveform_cache
 
-    def process_audio(self):
-        """Process the audio file and emit results or errors."""
+    def process_audio(self, cancel_event=None):
+        """Return (audio_path, mono data, samplerate, audio buffer); raises TaskCancelled if cancelled."""
         try:
-            data, samplerate = sf.read(self.audio_path, always_2d=True)
-            audio_segment = AudioSegment.from_file(self.audio_path)
-
-            # If audio is stereo, take the mean of both channels to downmix to mono
-            if data.shape[1] > 1:
-                data = np.mean(data, axis=1)
-
-            self.data_loaded.emit(data, samplerate, audio_segment)
+            audio = AudioBuffer.from_file(self.audio_path)
+            if cancel_event is not None and cancel_event.is_set():
+                raise TaskCancelled()
+            if self.waveform_cache is not None:
+                self.waveform_cache.get(self.audio_path, audio.mono)
+                if cancel_event is not None and cancel_event.is_set():
+                    raise TaskCancelled()
+            # Plotting and editing work on the mono mix; the buffer keeps the channels
+            return self.audio_path, audio.mono, audio.sample_rate, audio
+        except TaskCancelled:
+            raise
         except Exception as e:
             error_message = f"Error processing audio: {e}"
-            self.error_occurred.emit(error_message)
             logging.error(error_message)
+            raise RuntimeError(error_message) from e
 
 
 class AudioPlayer(QThread):
+    """
+        Plays the current audio data through a PlaybackEngine: the streaming
+        callback engine where available, mixer.Sounds otherwise. A selected
+        region plays straight out of the full array, and the playhead is
+        reported as a sample index of that array.
+    """
     error = Signal(str)
-    update_position = Signal(int)
+    update_position = Signal(int)  # sample index being heard
     playback_finished = Signal()  # Signal to indicate playback has finished
 
     def __init__(self, audio_path=None, sample_rate=0, audio_data=None):
@@ -47,74 +57,117 @@ class AudioPlayer(QThread):
         self.audio_path = audio_path
         self.sample_rate = sample_rate
         self.audio_data = audio_data
-        self.temp_file = None
+        self.audio = None
+        self.region = None
+        self.looping = False
+        self.reverse = False
+        self.volume = 1.0
         self.playing = False
-        self.start_time = None
-        self.start_frame = 0
-        self.pause_time = 0
-        self.set_initial_frame(0)
+        self.loaded = None  # (audio_data, reverse) the engine currently holds
+        self._engine = None  # opened on first use, which loads pygame and the audio device
 
         self.timer = QTimer()
         self.timer.timeout.connect(self.emit_position)
-        self.timer.setInterval(50)  # Update every 100 ms
-        if not pg.mixer.get_init():
-            pg.mixer.init()
+        self.timer.setInterval(16)  # ~60 playhead updates per second; PlotWidget blits them
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            self._engine = create_engine()
+        return self._engine
 
-    def set_initial_frame(self, frame):
-        """Set the initial frame to start playback from."""
-        self.initial_frame = frame
+    def set_region(self, start=None, stop=None):
+        """Play only frames [start, stop) of the current data; no arguments selects everything."""
+        self.region = None if start is None and stop is None else (start, stop)
+
+    def set_looping(self, looping):
+        self.looping = looping
+        self.engine.set_looping(looping)
+
+    def toggle_looping(self):
+        self.set_looping(not self.looping)
 
     def emit_position(self):
-        if pg.mixer.music.get_busy():
-            position = pg.mixer.music.get_pos()  # Get current position in milliseconds
-            self.update_position.emit(position + self.initial_frame * (1000 / self.sample_rate))
+        if self.engine.is_active():
+            # A mix has no plot of its own, so only playback of the current data moves the playhead
+            if self.loaded[0] is self.audio_data:
+                position = self.engine.playhead()
+                if self.reverse:
+                    position = len(self.audio_data) - 1 - position
+                self.update_position.emit(position)
         else:
+            self.engine.pause()
             self.playback_finished.emit()
             self.timer.stop()
+            self.playing = False
 
     def set_audio(self, audio, audio_data, sample_rate, audio_path):
         self.audio = audio
-        self.audio_data = audio_data
-        self.sample_rate = sample_rate
         self.audio_path = audio_path
+        self.set_audio_data(audio_data, sample_rate)
 
     def set_audio_data(self, audio_data, sample_rate=0):
         self.audio_data = audio_data
         self.sample_rate = sample_rate
+        self.region = None
 
     def start(self):
-        self.playing = True
         try:
             if self.audio_data is not None:
-                # Write the audio data to a temporary file
-                self.temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-                sf.write(self.temp_file.name, self.audio_data, self.sample_rate)
-                pg.mixer.music.load(self.temp_file.name)
-                pg.mixer.music.play()
-                self.start_time = time.time()
-                self.timer.start()
+                self.play(reverse=False)
             else:
                 logging.error("No audio data to play")
         except Exception as e:
             self.error.emit(str(e))
             logging.error(f"Error playing audio: {e}")
-        finally:
-            self.cleanup()
-            self.is_playing = False
+
+    def play(self, reverse):
+        if self.loaded is None or self.loaded[0] is not self.audio_data or self.loaded[1] != reverse:
+            # Views only: starting playback costs the same for any file length.
+            # Lazily read recordings are sources themselves and stream from disk.
+            if hasattr(self.audio_data, 'read'):
+                source = self.audio_data
+            else:
+                source = ArraySource(self.audio_data, self.sample_rate)
+            self.engine.load(source.reversed() if reverse else source)
+            self.loaded = (self.audio_data, reverse)
+        self.reverse = reverse
+        start, stop = self.region or (None, None)
+        if reverse and self.region is not None:
+            # Reversed data runs backwards, so mirror the region onto it
+            frames = len(self.audio_data)
+            start, stop = frames - stop, frames - start
+        self.engine.set_region(start, stop)
+        self.start_engine()
+
+    def play_source(self, source):
+        """Play any playback source from the start, e.g. a MixerSource of several files."""
+        try:
+            self.engine.load(source)
+            self.loaded = (source, False)
+            self.reverse = False
+            self.start_engine()
+        except Exception as e:
+            self.error.emit(str(e))
+            logging.error(f"Error playing audio: {e}")
+
+    def start_engine(self):
+        self.engine.set_looping(self.looping)
+        self.engine.set_gain(self.volume)
+        self.engine.play()
+        self.playing = True
+        self.timer.start()
 
     def stop(self):
-        if pg.mixer.get_init():
-            pg.mixer.music.stop()
-        self.cleanup()
+        self.engine.stop()
         self.timer.stop()
         self.playback_finished.emit()
         self.playing = False
 
     def pause(self):
         try:
-            if pg.mixer.get_init() and self.playing:
-                pg.mixer.music.pause()
-                self.pause_time = pg.mixer.music.get_pos()
+            if self.playing:
+                self.engine.pause()
                 self.timer.stop()
                 self.playing = False
         except Exception as e:
@@ -123,9 +176,8 @@ class AudioPlayer(QThread):
 
     def resume(self):
         try:
-            if pg.mixer.get_init() and not self.playing:
-                pg.mixer.music.unpause()
-                self.start_time = self.start_time + (pg.mixer.music.get_pos() - self.pause_time)
+            if not self.playing and self.engine.is_active():
+                self.engine.resume()
                 self.timer.start()
                 self.playing = True
         except Exception as e:
@@ -134,28 +186,26 @@ class AudioPlayer(QThread):
 
     def set_volume(self, volume):
         try:
-            pg.mixer.music.set_volume(volume / 100)
+            self.volume = volume / 100
+            self.engine.set_gain(self.volume)
         except Exception as e:
             self.error.emit(str(e))
             logging.error(f"Error setting volume: {e}")
-            
+
     def play_reverse(self):
+        if self.audio_data is None:
+            logging.error("No audio data to play")
+            return
         try:
-            with tempfile.NamedTemporaryFile(suffix=".mp3", delete=True) as temp:
-                self.audio.reverse().export(temp.name, format="mp3")
-                pg.mixer.music.load(temp.name)
-                pg.mixer.music.play()
-            self.playing = True
-            self.start_time = time.time()
+            self.play(reverse=True)
         except Exception as e:
-            QMessageBox.critical(None, "Error", f"Error playing audio in reverse: {e}")
+            self.error.emit(f"Error playing audio in reverse: {e}")
             logging.error(f"Error playing audio in reverse: {e}")
-            raise
 
-    def cleanup(self):
-        if self.temp_file:
-            os.unlink(self.temp_file.name)
-            self.temp_file = None
+    def close(self):
+        self.timer.stop()
+        if self._engine is not None:
+            self._engine.close()
 
 class AudioControlWidget(QWidget):
     def __init__(self, audio_player, parent=None):
@@ -173,6 +223,7 @@ class AudioControlWidget(QWidget):
             "⏹": self.audio_player.stop,
             "⏸": self.audio_player.pause,
             "▶⏸": self.audio_player.resume,
+            "🔁": self.audio_player.toggle_looping,
         }
         for label, func in button_actions.items():
             button = self.create_button(label, func)
@@ -0,0 +1,143 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class TaskSignals(QObject):
+    """Signals a FunctionTask emits; connect them to bound methods so they are delivered on the GUI thread."""
+    finished = Signal(int, object)  # request id, result
+    failed = Signal(int, str)  # request id, error message
+    progress = Signal(int, float, object)  # request id, fraction done, partial result or None
+
+
+class TaskCancelled(Exception):
+    """Raised by a task function that noticed its cancel_event was set."""
+
+
+class FunctionTask(QRunnable):
+    """
+        Runs func(*args, **kwargs) on a QThreadPool thread and reports the result with its request id.
+        Long-running functions can accept the task's cancel_event and return early once it is set,
+        and report_progress to show how far they are or hand over a partial result early.
+    """
+    def __init__(self, request_id, func, *args, **kwargs):
+        super().__init__()
+        self.request_id = request_id
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = TaskSignals()
+        self.cancel_event = threading.Event()
+
+    def report_progress(self, fraction, partial=None):
+        self.signals.progress.emit(self.request_id, fraction, partial)
+
+    def run(self):
+        try:
+            result = self.func(*self.args, **self.kwargs)
+        except TaskCancelled:
+            self.signals.failed.emit(self.request_id, "Cancelled")
+        except Exception as e:
+            logging.error(f"Background task {self.request_id} failed: {e}")
+            self.signals.failed.emit(self.request_id, str(e))
+        else:
+            self.signals.finished.emit(self.request_id, result)
+
+
+class SingleThreadExecutor:
+    """
+        Stands in for a one-thread QThreadPool (start, tryTake, waitForDone) on
+        a Python thread that lives until shutdown(). Python thread-locals such as
+        MetaDataDB's connection last between its tasks; QThreadPool threads get
+        a fresh Python thread state, and so lose them, with every task.
+    """
+    def __init__(self, thread_name_prefix=''):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=thread_name_prefix)
+        self.futures = {}  # id(runnable) -> future, until it has run
+
+    def start(self, runnable):
+        """Queue a QRunnable or a plain callable."""
+        key = id(runnable)
+        future = self.executor.submit(runnable.run if isinstance(runnable, QRunnable) else runnable)
+        self.futures[key] = future
+        future.add_done_callback(lambda done: self.futures.pop(key, None))
+
+    def tryTake(self, runnable):
+        """Remove runnable from the queue; False once it has started."""
+        future = self.futures.pop(id(runnable), None)
+        return future is not None and future.cancel()
+
+    def waitForDone(self):
+        self.executor.submit(lambda: None).result()
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class LatestTaskRunner(QObject):
+    """
+        Runs background tasks where only the newest request matters, e.g. search
+        queries issued while typing. Every submit() gets a new request id; results
+        from older requests are dropped instead of being delivered.
+    """
+    result_ready = Signal(object)
+    error = Signal(str)
+    progress = Signal(float, object)  # fraction done, partial result or None
+
+    def __init__(self, thread_pool=None, parent=None):
+        super().__init__(parent)
+        self.thread_pool = thread_pool or QThreadPool.globalInstance()
+        self.latest_request_id = 0
+        self.pending = {}
+
+    @property
+    def busy(self):
+        """True while the newest request has not delivered its result."""
+        return self.latest_request_id in self.pending
+
+    def submit(self, func, *args, pass_cancel_event=False, pass_progress=False, **kwargs):
+        """
+            Queue func on the pool, superseding any earlier request. Returns the new request id.
+            With pass_cancel_event, func also receives cancel_event=<threading.Event> so it can stop early.
+            With pass_progress, func also receives progress(fraction, partial=None), relayed as progress.
+        """
+        self.cancel()
+        task = FunctionTask(self.latest_request_id, func, *args, **kwargs)
+        if pass_cancel_event:
+            task.kwargs['cancel_event'] = task.cancel_event
+        if pass_progress:
+            task.kwargs['progress'] = task.report_progress
+        task.setAutoDelete(False)
+        task.signals.finished.connect(self.on_task_finished)
+        task.signals.failed.connect(self.on_task_failed)
+        task.signals.progress.connect(self.on_task_progress)
+        self.pending[task.request_id] = task
+        self.thread_pool.start(task)
+        return task.request_id
+
+    def cancel(self):
+        """
+            Drop the current request: it is pulled from the pool queue if it has not
+            started yet, otherwise its cancel_event is set and its result ignored.
+        """
+        task = self.pending.get(self.latest_request_id)
+        if task is not None:
+            task.cancel_event.set()
+            if self.thread_pool.tryTake(task):
+                self.pending.pop(task.request_id, None)
+        self.latest_request_id += 1
+
+    def on_task_finished(self, request_id, result):
+        self.pending.pop(request_id, None)
+        if request_id == self.latest_request_id:
+            self.result_ready.emit(result)
+
+    def on_task_progress(self, request_id, fraction, partial):
+        if request_id == self.latest_request_id:
+            self.progress.emit(fraction, partial)
+
+    def on_task_failed(self, request_id, message):
+        self.pending.pop(request_id, None)
+        if request_id == self.latest_request_id:
+            self.error.emit(message)
@@ -2,11 +2,10 @@ import os
 import logging
 import shutil
 import tempfile
-from functools import lru_cache
 from pathlib import Path
 
-from PySide6.QtCore import Qt
-from PySide6.QtWidgets import QFrame, QVBoxLayout, QLineEdit, QLabel, QFileSystemModel, QTreeView, QHBoxLayout, QMenu, QMessageBox, QWidget, QFileDialog
+from PySide6.QtCore import Qt, QTimer, QThreadPool
+from PySide6.QtWidgets import QFrame, QVBoxLayout, QLineEdit, QLabel, QTableView, QHBoxLayout, QMenu, QMessageBox, QWidget, QFileDialog, QAbstractItemView, QHeaderView
 from PySide6.QtGui import QAction
 from eutils import get_main_sound_dir_path
 from PlotWidget import PlotWidget
@@ -14,31 +13,35 @@ from AudioManager import AudioProcessor, AudioControlWidget
 from MetaData import MetaDataWidget
 from GUIElements import Button
 from eutils import show_error_message
-from pydub import AudioSegment
-
-class CustomFileSystemModel(QFileSystemModel):
-    def flags(self, index):
-        flags = super().flags(index)
-        if index.column() == 1:
-            flags &= ~Qt.ItemIsEditable
-        return flags
-
-class CustomTreeView(QTreeView):
+from IngestPipeline import IngestWorker
+from LibraryModel import LibraryModel
+from BackgroundTasks import LatestTaskRunner, TaskCancelled, SingleThreadExecutor
+from core.AudioBuffer import AudioBuffer
+from core.Mixer import MixerSource
+from core.AudioCache import AudioCache
+
+class CustomTableView(QTableView):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setStyleSheet("""
-            QTreeView {
+            QTableView {
                 background-color: #151515;
                 color: white;
                 font-size: 14px;
+                border: none;
             }
-            QTreeView::item {
-                height: 25px;
+            QTableView::item {
                 padding: 4px;
             }
-            QTreeView::item:selected {
+            QTableView::item:selected {
                 background-color: #574B90;
             }
+            QHeaderView::section {
+                background-color: #151515;
+                color: white;
+                border: none;
+                padding: 4px;
+            }
         """)
 
     def edit(self, index, trigger, event):
@@ -54,6 +57,13 @@ class CustomTreeView(QTreeView):
 class FileNavigator(QFrame):
     MAX_WIDTH = 500
     MIN_WIDTH = 300
+    SEARCH_DEBOUNCE_MS = 150
+    # Ingest batches land in bursts; the library view re-reads once they pause
+    REFRESH_DEBOUNCE_MS = 250
+    # Widths of the Duration, Rate, Size and Tags columns; Name takes the rest
+    COLUMN_WIDTHS = (70, 70, 70, 90)
+    ROW_HEIGHT = 33
+    AUDIO_LOAD_THREADS = 2
     SEARCH_STYLESHEET = "background-color: #151515; color: white; padding: 2px; border: 1px solid #151515; border-radius: 5px; font-size: 14px"
 
     def __init__(self, parent=None):
@@ -61,13 +71,24 @@ class FileNavigator(QFrame):
         self.parent = parent
         self.setStyleSheet("background-color: #111111")
         self.setLayout(QHBoxLayout())
-        self.model = CustomFileSystemModel(self)
-        self.model.setReadOnly(False)
         self.deleted_files = {}
         self.currently_selected_file = None
+        self.current_audio_path = None
+        self.loading_audio_path = None  # file the audio loader is decoding, if any
         self.root_path = get_main_sound_dir_path('Epoch123/ESMD')
-        self.audio_workers = {}
-        self.audio_cache = {}
+        self.model = LibraryModel(self.parent.metaDataDB, self.root_path, self)
+        self.model.file_renamed.connect(self.on_file_renamed)
+        # Decoding runs on its own small pool so it never queues behind searches
+        self.audio_load_pool = QThreadPool(self)
+        self.audio_load_pool.setMaxThreadCount(self.AUDIO_LOAD_THREADS)
+        self.audio_loader = LatestTaskRunner(self.audio_load_pool, parent=self)
+        self.audio_loader.result_ready.connect(self.on_audio_loaded)
+        self.audio_loader.error.connect(self.on_audio_load_failed)
+        self.mix_loader = LatestTaskRunner(self.audio_load_pool, parent=self)
+        self.mix_loader.result_ready.connect(self.on_mix_loaded)
+        self.mix_loader.error.connect(self.on_audio_load_failed)
+        self.audio_cache = AudioCache()
+        self.current_audio = None  # (data, fs, audio) of the file shown, even if the cache evicted it
         self.plot_widget = PlotWidget(audio_player=self.parent.audio_player)
         # audio_callbacks = [self.plot_widget.play_audio, self.plot_widget.stop_audio, self.plot_widget.pause_audio, self.plot_widget.resume_audio]
         self.audio_controls_widget = AudioControlWidget(audio_player=self.parent.audio_player)
@@ -87,21 +108,47 @@ class FileNavigator(QFrame):
         self.upload_button = Button("Upload File", self.upload_file)
         self.file_nav_layout.addWidget(self.upload_button)
         self.search_bar.textChanged.connect(self.filter_files)
-
-        self.setup_file_tree()
+        # Searches run after typing pauses, on a thread of their own that keeps its
+        # database connection open between queries; stale results are dropped
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.run_search)
+        self.search_executor = SingleThreadExecutor('library-search')
+        self.search_runner = LatestTaskRunner(self.search_executor, parent=self)
+        self.search_runner.result_ready.connect(self.show_search_results)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.setInterval(self.REFRESH_DEBOUNCE_MS)
+        self.refresh_timer.timeout.connect(self.reload_library)
+
+        self.setup_file_list()
         self.info_widget = self.setup_info_widget()
 
-    def setup_file_tree(self):
-        self.file_tree = CustomTreeView()
-        self.file_tree.setMinimumWidth(self.MIN_WIDTH)
-        self.file_tree.setMaximumWidth(self.MAX_WIDTH)
-        self.file_tree.setModel(self.model)
-        self.model.setRootPath(self.root_path)
-        self.file_tree.setRootIndex(self.model.index(self.root_path))
-        self.file_tree.setHeaderHidden(True)
-        for col in range(1, 4):
-            self.file_tree.setColumnHidden(col, True)
-        self.file_nav_layout.addWidget(self.file_tree)
+    def setup_file_list(self):
+        # A table rather than a tree: QTreeView lays out every loaded row whenever a page
+        # arrives, while QTableView only asks the model about the rows on screen
+        self.file_list = CustomTableView()
+        self.file_list.setMinimumWidth(self.MIN_WIDTH)
+        self.file_list.setMaximumWidth(self.MAX_WIDTH)
+        self.file_list.setModel(self.model)
+        self.file_list.setShowGrid(False)
+        self.file_list.setWordWrap(False)
+        rows = self.file_list.verticalHeader()
+        rows.hide()
+        rows.setSectionResizeMode(QHeaderView.Fixed)
+        rows.setDefaultSectionSize(self.ROW_HEIGHT)
+        # Clicking a header re-sorts in the database; the indicator starts at the model's order
+        header = self.file_list.horizontalHeader()
+        header.setSortIndicator(self.model.sort_column, self.model.sort_order)
+        self.file_list.setSortingEnabled(True)
+        header.setSectionResizeMode(LibraryModel.NAME_COLUMN, QHeaderView.Stretch)
+        for column, width in enumerate(self.COLUMN_WIDTHS, start=1):
+            self.file_list.setColumnWidth(column, width)
+        # Ctrl/Shift-click picks several files to play together
+        self.file_list.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.file_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.file_nav_layout.addWidget(self.file_list)
 
     def setup_info_widget(self):
         info_widget = QWidget()
@@ -118,9 +165,9 @@ class FileNavigator(QFrame):
         self.plot_widget.hide()
         self.audio_controls_widget.hide()
         self.metadata_widget.hide()
-        self.file_tree.clicked.connect(self.on_file_selected)
-        self.file_tree.setContextMenuPolicy(Qt.CustomContextMenu)
-        self.file_tree.customContextMenuRequested.connect(self.show_context_menu)
+        self.file_list.clicked.connect(self.on_file_selected)
+        self.file_list.setContextMenuPolicy(Qt.CustomContextMenu)
+        self.file_list.customContextMenuRequested.connect(self.show_context_menu)
         return info_widget
     
     def upload_file(self):
@@ -128,71 +175,74 @@ class FileNavigator(QFrame):
         file_dialog.setFileMode(QFileDialog.ExistingFiles)
         file_paths, _ = file_dialog.getOpenFileNames(self, "Select File(s) to Upload")
         if file_paths:
-            for file_path in file_paths:
-                destination_path = os.path.join(self.root_path, os.path.basename(file_path))
-                file = os.path.basename(destination_path)
-                shutil.copy(file_path, destination_path)
-                audio = AudioSegment.from_file(destination_path)
-                num_channels = audio.channels
-                sample_rate = audio.frame_rate
-                duration = round(audio.duration_seconds, 2)
-                file_size = round(os.path.getsize(destination_path) / 1024, 2)
-                # add file info to database
-                self.parent.metaDataDB.insert_metadata(file, destination_path, num_channels, sample_rate, file_size, duration)
-            self.refresh_view()
+            # Copying and probing happen off the GUI thread; the view refreshes as batches land
+            self.parent.start_ingest(IngestWorker.for_uploads(self.parent.metaDataDB, file_paths, self.root_path))
     
     def filter_files(self, keyword):
-        keyword = keyword.strip().lower()
+        """Restart the search debounce timer; the query runs once typing pauses."""
+        self.search_timer.start()
+
+    def run_search(self):
+        keyword = self.search_bar.text().strip()
         if not keyword:
-            self.model.setRootPath(self.root_path)
+            self.search_runner.cancel()
+            if self.model.file_paths is not None:
+                self.model.set_file_paths(None)
             return
-
-        search_path = self.root_path
-        filtered_files = []
-        for root, _, files in os.walk(search_path):
-            for file in files:
-                if keyword in file.lower():
-                    filtered_files.append(os.path.join(root, file))
-
-        self.model.setRootPath("") 
-        self.model.setRootPath(search_path)
-        self.file_tree.setRootIndex(self.model.index(search_path))
-        for col in range(1, 4):
-            self.file_tree.setColumnHidden(col, True)
-
-        for file in filtered_files:
-            index = self.model.index(file)
+        self.search_runner.submit(self.parent.metaDataDB.search, keyword, directory=self.root_path)
+
+    def close_search(self):
+        """Stop searching and close the search thread's connection, at shutdown."""
+        self.search_timer.stop()
+        self.search_runner.cancel()
+        self.search_executor.start(self.parent.metaDataDB.close)
+        self.search_executor.shutdown()
+
+    def show_search_results(self, file_paths):
+        """Show only the files the search index ranked as matches, in the view's sort order."""
+        self.model.set_file_paths(file_paths)
+        # The best match in the library, wherever the sort put it
+        for file_path in file_paths:
+            index = self.model.index_for_path(file_path)
             if index.isValid():
-                self.file_tree.expand(index.parent())
-                self.file_tree.setCurrentIndex(index)
+                self.file_list.setCurrentIndex(index)
+                break
 
     def edit_buttons(self):
         edit_buttons_layout = QHBoxLayout()
         edit_buttons_layout.setSpacing(10)
         edit_buttons_layout.setAlignment(Qt.AlignCenter)
         edit_buttons_layout.addWidget(Button("Edit File", self.go_to_sound_editor))
-        edit_buttons_layout.addWidget(Button("Delete File", lambda: self.delete_file(self.model.filePath(self.file_tree.currentIndex()))))
+        edit_buttons_layout.addWidget(Button("Delete File", lambda: self.delete_file(self.model.file_path(self.file_list.currentIndex()))))
         return edit_buttons_layout
 
-    @lru_cache(maxsize=50)
     def load_audio(self, file_path):
-        """ Updated to use the new audio processing logic. """
-        self.current_audio_path = file_path
-        # Assume AudioProcessor is a part of a separate module or defined elsewhere
-        processor = AudioProcessor(file_path)
-        processor.data_loaded.connect(lambda data, fs, audio_segment: self.handle_data_loaded(data, fs, audio_segment, file_path))
-        processor.error_occurred.connect(show_error_message)
-        processor.process_audio()
-        return None  # Placeholder, actual data handled asynchronously
-    
-    def handle_data_loaded(self, data, fs, audio_segment, file_path):
-        """Handle the data loaded signal from AudioProcessor."""
-        if file_path not in self.audio_cache:
-            self.audio_cache[file_path] = (data, fs, audio_segment)
-        
+        """
+            Decode file_path on the audio load pool. Selecting another file before
+            this finishes cancels it, so only the newest selection is ever shown.
+        """
+        self.current_audio = None
+        self.loading_audio_path = file_path
+        processor = AudioProcessor(file_path, waveform_cache=self.plot_widget.waveform_cache)
+        self.audio_loader.submit(processor.process_audio, pass_cancel_event=True)
+
+    def on_audio_loaded(self, result):
+        file_path, data, fs, audio = result
+        self.handle_data_loaded(data, fs, audio, file_path)
+
+    def on_audio_load_failed(self, message):
+        self.file_title.setText(f"Selected File: {self.currently_selected_file}")
+        show_error_message(self, message)
+
+    def handle_data_loaded(self, data, fs, audio, file_path):
+        """Show a decoded file: data is the mono mix of the AudioBuffer audio."""
+        data = self.audio_cache.put(file_path, data, fs, audio)
         fs = int(fs)  # Ensure fs is an integer
-        self.parent.audio_player.set_audio(audio_segment, data, fs, file_path)
-        self.plot_widget.update_plot(data, fs, audio_segment)
+        self.current_audio_path = file_path
+        self.current_audio = (data, fs, audio)
+        self.file_title.setText(f"Selected File: {os.path.basename(file_path)}")
+        self.parent.audio_player.set_audio(audio, data, fs, file_path)
+        self.plot_widget.update_plot(data, fs, audio, file_path=file_path)
         self.metadata_widget.update_metadata(file_path)
         self.plot_widget.show()
         self.metadata_widget.show()
@@ -200,24 +250,19 @@ class FileNavigator(QFrame):
         
     def update_widgets(self, file_path, data=None, fs=None, audio=None):
         """Update the plot and metadata widgets with the given data."""
-        self.plot_widget.update_plot(data, fs, audio)
+        self.plot_widget.update_plot(data, fs, audio, file_path=file_path)
         self.metadata_widget.update_metadata(file_path)
         self.plot_widget.show()
         self.metadata_widget.show()
 
     def on_file_selected(self, index):
-        file_path = self.model.filePath(index)
-        if Path(file_path).is_dir():
-            if self.file_tree.isExpanded(index):
-                self.file_tree.collapse(index)
-            else:
-                self.file_tree.expand(index)
-            return
+        file_path = self.model.file_path(index)
 
         # Stop the current playing audio if any
         self.audio_controls_widget.audio_player.stop()
 
         self.currently_selected_file = Path(file_path).name
+        # The database can list a file removed from disk since the last scan
         if not Path(file_path).is_file():
             self.plot_widget.hide()
             self.audio_controls_widget.hide()
@@ -230,17 +275,23 @@ class FileNavigator(QFrame):
         self.metadata_widget.show()
 
         try:
-            if file_path not in self.audio_cache:
-                self.load_audio(file_path)  # This is asynchronous
+            cached = self.audio_cache.get(file_path)
+            if cached is None:
+                self.file_title.setText(f"Loading: {self.currently_selected_file}")
+                self.load_audio(file_path)  # Shown by on_audio_loaded once decoded
             else:
-                data, fs, audio = self.audio_cache[file_path]
+                # A cached file wins over a load still in flight for an earlier selection
+                self.audio_loader.cancel()
+                data, fs, audio = cached
                 fs = int(fs)  # Ensure fs is an integer
+                self.current_audio_path = file_path
+                self.current_audio = (data, fs, audio)
                 self.parent.audio_player.set_audio(audio, data, fs, file_path)
                 self.update_widgets(file_path, data, fs, audio)
 
         except Exception as e:
             message = f"Error loading file '{file_path}': {e}"
-            show_error_message(message)
+            show_error_message(self, message)
             logging.error(message)
 
     def create_action(self, name, func):
@@ -249,21 +300,65 @@ class FileNavigator(QFrame):
         return action
 
     def show_context_menu(self, position):
-        index = self.file_tree.indexAt(position)
+        index = self.file_list.indexAt(position)
         context_menu = QMenu(self)
 
+        selected_files = self.selected_file_paths()
+        if len(selected_files) > 1:
+            context_menu.addAction(self.create_action(f'Play {len(selected_files)} Files Together',
+                                                      lambda: self.play_together(selected_files)))
         if index.isValid():
             context_menu.addAction(self.create_action('Rename', lambda: self.rename_file(index)))
-            context_menu.addAction(self.create_action('Delete', lambda: self.delete_file(self.model.filePath(index))))
-            context_menu.addAction(self.create_action('Create Folder', lambda: self.create_folder(index)))
+            context_menu.addAction(self.create_action('Delete', lambda: self.delete_file(self.model.file_path(index))))
         else:
             context_menu.addAction(self.create_action('Undo Delete', self.undo_delete))
-            context_menu.addAction(self.create_action('Create Folder', self.create_folder))
 
-        context_menu.exec_(self.file_tree.viewport().mapToGlobal(position))
+        context_menu.exec_(self.file_list.viewport().mapToGlobal(position))
+
+    def selected_file_paths(self):
+        paths = (self.model.file_path(index) for index in self.file_list.selectionModel().selectedRows())
+        return [path for path in paths if Path(path).is_file()]
+
+    def play_together(self, file_paths):
+        """Decode file_paths on the load pool, reusing cached decodes, and play them as one mix."""
+        cached = {}
+        for file_path in file_paths:
+            entry = self.audio_cache.get(file_path)
+            if entry is not None and isinstance(entry[2], AudioBuffer):
+                cached[file_path] = entry[2]
+        self.audio_controls_widget.audio_player.stop()
+        self.file_title.setText(f"Loading {len(file_paths)} files")
+        self.mix_loader.submit(self.build_mix, file_paths, cached, pass_cancel_event=True)
+
+    @staticmethod
+    def build_mix(file_paths, cached, cancel_event=None):
+        """A MixerSource of file_paths starting together, at the highest sample rate among them."""
+        buffers = []
+        for file_path in file_paths:
+            if cancel_event is not None and cancel_event.is_set():
+                raise TaskCancelled()
+            buffers.append(cached.get(file_path) or AudioBuffer.from_file(file_path))
+        mixer = MixerSource(max(b.sample_rate for b in buffers), channels=min(max(b.channels for b in buffers), 2))
+        # Equal-power headroom so a handful of full-scale files does not clip
+        gain = 1 / len(buffers) ** 0.5
+        for audio in buffers:
+            mixer.add_track(audio, gain=gain)
+        return mixer
+
+    def on_mix_loaded(self, mixer):
+        self.file_title.setText(f"Playing {len(mixer.tracks)} files together")
+        self.parent.audio_player.play_source(mixer)
 
     def refresh_view(self):
-        self.model.setRootPath(self.root_path)
+        """Re-read the library from the database once changes stop arriving."""
+        self.refresh_timer.start()
+
+    def reload_library(self):
+        self.model.refresh()
+        if self.current_audio_path is not None:
+            index = self.model.index_for_path(self.current_audio_path)
+            if index.isValid():
+                self.file_list.setCurrentIndex(index)
 
     def get_unique_temp_path(self, base_name):
         """Generate a unique temporary file path."""
@@ -279,83 +374,74 @@ class FileNavigator(QFrame):
 
     def delete_file(self, file_path):
         """Move the file or directory to a temporary path for 'deletion'."""
-        if Path(file_path).exists() and QMessageBox.question(self, 'Delete file', 'Are you sure you want to delete this file?', QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
+        # file_path is empty when nothing is selected, and Path('') is the working directory
+        if file_path and Path(file_path).exists() and QMessageBox.question(self, 'Delete file', 'Are you sure you want to delete this file?', QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes:
             temp_file_path = self.get_unique_temp_path(Path(file_path).name)
             if Path(file_path).is_file():
                 shutil.move(file_path, temp_file_path)
-                self.audio_cache.pop(file_path, None)
-                self.audio_workers.pop(file_path, None)
+                self.audio_cache.invalidate(file_path)
+                self.plot_widget.waveform_cache.remove(file_path)
+                self.cancel_load_under(file_path)
                 self.parent.metaDataDB.delete_file(file_path)
             elif Path(file_path).is_dir():
-                for root, _, files in os.walk(file_path):
-                    for file in files:
-                        abs_file_path = Path(root) / file
-                        self.audio_cache.pop(str(abs_file_path), None)
-                        self.audio_workers.pop(str(abs_file_path), None)
-                        self.parent.metaDataDB.delete_file(str(abs_file_path))
+                self.audio_cache.invalidate_prefix(file_path)
+                self.cancel_load_under(file_path)
+                removed = self.parent.metaDataDB.get_files_under(file_path)
+                for removed_path in removed:
+                    self.plot_widget.waveform_cache.remove(removed_path)
+                self.parent.metaDataDB.delete_many(removed)
                 shutil.move(file_path, temp_file_path)
             self.deleted_files[temp_file_path] = file_path
             self.refresh_view()
 
+    def cancel_load_under(self, path):
+        """Drop a decode still in flight for path, or for a file inside the folder path."""
+        loading = self.loading_audio_path
+        if self.audio_loader.busy and loading is not None and (loading == path or loading.startswith(os.path.join(path, ''))):
+            self.audio_loader.cancel()
+            self.loading_audio_path = None
+            self.file_title.setText("No file selected")
+
     def undo_delete(self):
         if self.deleted_files:
             temp_file_path, original_file_path = self.deleted_files.popitem()
             shutil.move(temp_file_path, original_file_path)
-            self.refresh_view()
+            # Deleting dropped the database rows, so index the files again; the view refreshes when done
+            if Path(original_file_path).is_dir():
+                self.parent.scan_and_insert_metadata(original_file_path)
+            else:
+                self.parent.index_files([original_file_path])
 
     def rename_file(self, index):
-        # if index and index.isValid():
-        #     old_path = Path(self.model.filePath(index))
-        #     self.file_tree.edit(index, QTreeView.EditKeyPressed, None)
-        #     new_name = self.model.data(index, Qt.DisplayRole)
-        #     if new_name:
-        #         new_path = old_path.parent / new_name
-        #         shutil.move(old_path, new_path)
-
-        #         if old_path.is_file():
-        #             self.parent.metaDataDB.rename_file(str(old_path), str(new_path))
-        #         else:
-        #             for root, _, files in os.walk(str(new_path)):
-        #                 for file in files:
-        #                     original_file_path = Path(root) / file
-        #                     relative_path = original_file_path.relative_to(new_path)
-        #                     new_file_path = new_path / relative_path
-        #                     self.parent.metaDataDB.rename_file(str(original_file_path), str(new_file_path))
-        # self.refresh_view()
-        pass
-
-    def create_folder(self, index=None):
-        parent_path = Path(self.get_parent_path(index))
-        folder_path = parent_path / "New Folder"
-        folder_path.mkdir()
-        self.refresh_view()
-        new_index = self.model.index(str(folder_path))
-        self.file_tree.setCurrentIndex(new_index)
-        self.file_tree.edit(new_index, QTreeView.EditKeyPressed, None)
-
-    def get_parent_path(self, index):
-        if index and index.isValid():
-            file_path = Path(self.model.filePath(index))
-            return str(file_path.parent) if file_path.is_file() else str(file_path)
-        return self.root_path
+        """Edit the file's name in place; the model renames it on disk and in the database."""
+        self.file_list.edit(index.siblingAtColumn(LibraryModel.NAME_COLUMN), QAbstractItemView.EditKeyPressed, None)
+
+    def on_file_renamed(self, old_path, new_path):
+        """Files renamed in the view must not be served from the cache under their old path."""
+        self.audio_cache.invalidate(old_path)
+        self.plot_widget.waveform_cache.remove(old_path)
+        if self.current_audio_path == old_path:
+            self.current_audio_path = new_path
+            self.currently_selected_file = Path(new_path).name
 
     def go_to_sound_editor(self):
         # if no file is selected, do nothing
-        if self.currently_selected_file is None:
+        if self.currently_selected_file is None or self.current_audio is None:
             QMessageBox.warning(self, "No file selected", "Please select a file to edit")
             return
         try:
-            data, fs, audio = self.audio_cache[self.current_audio_path]
-            self.parent.show_sound_editor()
+            data, fs, audio = self.current_audio
+            # The editor is built on first use, so it exists only once shown
+            sound_editor = self.parent.show_sound_editor()
             self.plot_widget.clear_selection()
             self.parent.audio_player.stop()
             fs = int(fs)  # Ensure fs is an integer
             # self.parent.audio_player.set_audio_data(data, fs)
-            self.parent.sound_editor.plot_widget.data = data
-            self.parent.sound_editor.plot_widget.clear_selection()
-            self.parent.sound_editor.plot_widget.update_plot(data, fs, audio)
-            self.parent.sound_editor.set_audio_data(data, self.current_audio_path, fs, audio)
+            sound_editor.plot_widget.data = data
+            sound_editor.plot_widget.clear_selection()
+            sound_editor.plot_widget.update_plot(data, fs, audio, file_path=self.current_audio_path)
+            sound_editor.set_audio_data(data, self.current_audio_path, fs, audio)
         except RuntimeError as e:
-            QMessageBox.critical(self, "Error", f"Error loading file '{self.model.filePath(self.file_tree.currentIndex())}': {e}")
-            logging.error(f"Error loading file '{self.model.filePath(self.file_tree.currentIndex())}': {e}")
+            QMessageBox.critical(self, "Error", f"Error loading file '{self.model.file_path(self.file_list.currentIndex())}': {e}")
+            logging.error(f"Error loading file '{self.model.file_path(self.file_list.currentIndex())}': {e}")
 
@@ -0,0 +1,123 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from PySide6.QtCore import QThread, Signal
+from core.LibraryScanner import LibraryScanner, ingest_file
+
+
+class IngestWorker(QThread):
+    """
+        Background ingest of sound files into the library.
+        Copying and header probing run on a worker pool; this thread is the
+        single database writer and stores finished rows in batches, so the GUI
+        thread never blocks and sqlite never sees concurrent writers.
+    """
+    progress = Signal(int, int)  # files done, files total
+    batch_written = Signal(int)  # rows stored by the last batch
+    ingest_finished = Signal(int, int)  # rows written, files failed
+
+    BATCH_SIZE = 200
+    # Below this many files a thread pool beats paying for process start-up
+    PROCESS_POOL_THRESHOLD = 256
+
+    def __init__(self, metadata_db, jobs=None, scan_directory=None, max_workers=None, parent=None):
+        super().__init__(parent)
+        self.metadata_db = metadata_db
+        self.jobs = list(jobs) if jobs else []
+        self.scan_directory = scan_directory
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._cancelled = False
+
+    @classmethod
+    def for_directory(cls, metadata_db, directory, **kwargs):
+        """Index the new or changed files found under directory."""
+        return cls(metadata_db, scan_directory=directory, **kwargs)
+
+    @classmethod
+    def for_uploads(cls, metadata_db, file_paths, destination_dir, **kwargs):
+        """Copy file_paths into destination_dir and index the copies."""
+        jobs = [(path, os.path.join(destination_dir, os.path.basename(path))) for path in file_paths]
+        return cls(metadata_db, jobs=jobs, **kwargs)
+
+    def cancel(self):
+        """Stop submitting work; files already being processed still finish."""
+        self._cancelled = True
+
+    def create_executor(self, job_count):
+        workers = min(self.max_workers, max(job_count, 1))
+        if job_count >= self.PROCESS_POOL_THRESHOLD and workers > 1:
+            # Spawn rather than fork: forking a process that runs Qt threads is unsafe
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return ThreadPoolExecutor(max_workers=workers)
+
+    def run(self):
+        try:
+            written, failed = self.ingest()
+        except Exception as e:
+            # Still report completion, or the window keeps the worker and its progress message forever
+            logging.error(f"Library ingest failed: {e}")
+            written, failed = 0, len(self.jobs)
+        finally:
+            # The connection belongs to this thread, so close it before the thread ends
+            self.metadata_db.close()
+        self.ingest_finished.emit(written, failed)
+
+    def ingest(self):
+        """Process every job and return (rows written, files failed)."""
+        jobs = self.jobs
+        if self.scan_directory is not None:
+            changed, removed = LibraryScanner(self.metadata_db).find_changes(self.scan_directory)
+            # Files deleted outside the app would otherwise stay listed in the library view
+            if removed:
+                self.metadata_db.delete_many(removed)
+            jobs = [(path, None) for path, _ in changed]
+
+        total, done, written, failed = len(jobs), 0, 0, 0
+        self.progress.emit(0, total)
+        if not jobs:
+            return 0, 0
+
+        batch, futures, unread = [], {}, set()
+        executor = self.create_executor(total)
+        try:
+            for source, destination in jobs:
+                futures[executor.submit(ingest_file, source, destination)] = source
+            unread.update(futures)
+            for future in as_completed(futures):
+                if self._cancelled:
+                    break
+                unread.discard(future)
+                failed += self.collect(future, futures[future], batch)
+                done += 1
+                if len(batch) >= self.BATCH_SIZE:
+                    written += self.write_batch(batch)
+                    batch = []
+                self.progress.emit(done, total)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+            # Jobs that finished before or during cancellation have already copied their file, so keep their rows
+            finished = [future for future in unread if future.done() and not future.cancelled()]
+            for future in finished:
+                failed += self.collect(future, futures[future], batch)
+            if batch:
+                written += self.write_batch(batch)
+            if finished:
+                done += len(finished)
+                self.progress.emit(done, total)
+        return written, failed
+
+    @staticmethod
+    def collect(future, source, batch):
+        """Append the future's row to batch; return 1 if the job failed, else 0."""
+        try:
+            batch.append(future.result())
+        except Exception as e:
+            logging.error(f"Failed to ingest {os.path.basename(source)}: {e}")
+            return 1
+        return 0
+
+    def write_batch(self, rows):
+        self.metadata_db.upsert_scanned_files(rows)
+        self.batch_written.emit(len(rows))
+        return len(rows)
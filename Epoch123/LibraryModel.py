@@ -0,0 +1,176 @@
+import os
+import logging
+from PySide6.QtCore import Qt, QAbstractItemModel, QModelIndex, Signal
+
+
+class LibraryModel(QAbstractItemModel):
+    """
+        Flat, sortable list of the sound files under a directory, read from the
+        metadata database a page at a time. Views ask for more rows through
+        canFetchMore/fetchMore as they scroll; each page and each re-sort is an
+        index range query, so a 200k-file library never loads all at once.
+        Nothing here touches the filesystem except renames.
+    """
+    file_renamed = Signal(str, str)  # old path, new path
+
+    # (header, LIBRARY_SORT_KEYS entry) per column
+    COLUMNS = [
+        ("Name", 'file_name'),
+        ("Duration", 'duration'),
+        ("Rate", 'sample_rate'),
+        ("Size", 'file_size'),
+        ("Tags", 'tag_list'),
+    ]
+    NAME_COLUMN = 0
+    PAGE_SIZE = 256
+
+    # Indexes into the rows MetaDataDB.library_page returns
+    SORT_VALUE, FILE_ID, FILE_NAME, FILE_PATH, DURATION, SAMPLE_RATE, FILE_SIZE, TAG_LIST = range(8)
+
+    def __init__(self, metadata_db, root_path, parent=None):
+        super().__init__(parent)
+        self.metadata_db = metadata_db
+        self.root_path = root_path
+        self.sort_column = self.NAME_COLUMN
+        self.sort_order = Qt.AscendingOrder
+        self.file_paths = None  # only these files when set, e.g. search results
+        self.total = 0
+        self.rows = []
+        self.row_for_path = {}
+        self.reload()
+
+    def query_page(self, after=None, limit=None):
+        return self.metadata_db.library_page(
+            self.root_path, self.COLUMNS[self.sort_column][1], descending=self.sort_order == Qt.DescendingOrder,
+            after=after, limit=limit or self.PAGE_SIZE, file_paths=self.file_paths)
+
+    def reload(self, keep_rows=0, recount=True):
+        """
+            Re-read the library, loading at least keep_rows rows so views keep
+            their scroll position. recount=False keeps the file count, for a
+            re-sort of the same files.
+        """
+        self.beginResetModel()
+        if recount:
+            self.total = self.metadata_db.count_library(self.root_path, self.file_paths)
+        self.rows = self.query_page(limit=max(keep_rows, self.PAGE_SIZE))
+        self.row_for_path = {row[self.FILE_PATH]: i for i, row in enumerate(self.rows)}
+        self.endResetModel()
+
+    def refresh(self):
+        """Pick up files added, removed or changed in the database since the last read."""
+        self.reload(keep_rows=len(self.rows))
+
+    def set_file_paths(self, file_paths):
+        """Show only file_paths, or every file again when None."""
+        self.file_paths = None if file_paths is None else list(file_paths)
+        self.reload(keep_rows=len(self.file_paths or ()))
+
+    def file_path(self, index):
+        return self.rows[index.row()][self.FILE_PATH] if index.isValid() else ''
+
+    def index_for_path(self, file_path, column=0):
+        """Index of file_path if its row has been loaded, else an invalid index."""
+        row = self.row_for_path.get(file_path)
+        return QModelIndex() if row is None else self.index(row, column)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and len(self.rows) < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.rows:
+            return
+        last = self.rows[-1]
+        page = self.query_page(after=(last[self.SORT_VALUE], last[self.FILE_ID]))
+        if not page:
+            # Rows were deleted since the count; stop asking for more
+            self.total = len(self.rows)
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+        self.rows.extend(page)
+        for i, row in enumerate(page, start=start):
+            self.row_for_path[row[self.FILE_PATH]] = i
+        self.endInsertRows()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        if (column, order) == (self.sort_column, self.sort_order) or not 0 <= column < len(self.COLUMNS):
+            return
+        self.sort_column, self.sort_order = column, order
+        self.reload(recount=False)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not 0 <= row < len(self.rows) or not 0 <= column < len(self.COLUMNS):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(self.COLUMNS):
+            return self.COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        column = index.column()
+        if role in (Qt.DisplayRole, Qt.EditRole):
+            if column == 0:
+                return row[self.FILE_NAME]
+            if column == 1:
+                return "" if row[self.DURATION] is None else f"{row[self.DURATION]:.1f} s"
+            if column == 2:
+                return "" if row[self.SAMPLE_RATE] is None else f"{row[self.SAMPLE_RATE] / 1000:g} kHz"
+            if column == 3:
+                return "" if row[self.FILE_SIZE] is None else f"{row[self.FILE_SIZE]:.0f} KB"
+            return row[self.TAG_LIST] or ""
+        if role == Qt.ToolTipRole:
+            return os.path.relpath(row[self.FILE_PATH], self.root_path)
+        if role == Qt.TextAlignmentRole and column in (1, 2, 3):
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == self.NAME_COLUMN:
+            flags |= Qt.ItemIsEditable
+        return flags
+
+    def setData(self, index, value, role=Qt.EditRole):
+        """Renaming a file in the view renames it on disk and in the database."""
+        if role != Qt.EditRole or index.column() != self.NAME_COLUMN:
+            return False
+        old_path = self.file_path(index)
+        new_name = str(value).strip()
+        if not new_name or new_name == os.path.basename(old_path) or os.sep in new_name:
+            return False
+        new_path = os.path.join(os.path.dirname(old_path), new_name)
+        if os.path.exists(new_path):
+            logging.error(f"Cannot rename {old_path}: {new_path} already exists")
+            return False
+        try:
+            os.rename(old_path, new_path)
+        except OSError as e:
+            logging.error(f"Failed to rename {old_path}: {e}")
+            return False
+        self.metadata_db.rename_file(old_path, new_path)
+        row = list(self.rows[index.row()])
+        row[self.FILE_NAME], row[self.FILE_PATH] = new_name, new_path
+        self.rows[index.row()] = tuple(row)
+        del self.row_for_path[old_path]
+        self.row_for_path[new_path] = index.row()
+        # The row keeps its place until the next reload, even if the new name sorts elsewhere
+        self.dataChanged.emit(index, index)
+        self.file_renamed.emit(old_path, new_path)
+        return True
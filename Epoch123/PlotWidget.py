@@ -1,21 +1,63 @@
 import numpy as np
 from PySide6.QtWidgets import QWidget, QMenu, QVBoxLayout, QFileDialog
 from PySide6.QtGui import QAction
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-import matplotlib.pyplot as plt
-from matplotlib.widgets import SpanSelector
+from PySide6.QtCore import Signal
 import soundfile as sf
 import logging
 import os
+import time
+from core.WaveformCache import PeakPyramid, WaveformCache
+from core.EditHistory import EditHistory
+from core.EditGraph import EditNode, CropNode, CropOutNode, as_node
+from BackgroundTasks import LatestTaskRunner, TaskCancelled
+from eutils import get_main_sound_dir_path, show_error_message
+
+
+def preload():
+    """Import the bulk of matplotlib ahead of the first plot, e.g. on a background thread."""
+    import matplotlib.figure  # noqa: F401
+    import matplotlib.backends.backend_agg  # noqa: F401
+
+
+class FrameStats:
+    """Running frame-time figures for playhead repaints, checked against a 60 fps budget."""
+    BUDGET_MS = 1000 / 60
+
+    def __init__(self):
+        self.frames = 0
+        self.over_budget = 0
+        self.total_ms = 0.0
+        self.worst_ms = 0.0
+
+    def record(self, elapsed_ms):
+        self.frames += 1
+        self.total_ms += elapsed_ms
+        self.worst_ms = max(self.worst_ms, elapsed_ms)
+        if elapsed_ms > self.BUDGET_MS:
+            self.over_budget += 1
+            logging.debug(f"Playhead frame took {elapsed_ms:.1f} ms, over the {self.BUDGET_MS:.1f} ms budget")
+
+    @property
+    def mean_ms(self):
+        return self.total_ms / self.frames if self.frames else 0.0
 
 
 class PlotWidget(QWidget):
+    # Emitted with the new data after every edit, undo and redo
+    data_changed = Signal(object)
+    # Raw samples are drawn only when zoomed in this far; denser views are drawn as min/max envelopes
+    RAW_SAMPLES_PER_PIXEL = 2
+
     def __init__(self, audio_player=None, parent=None):
         super().__init__(parent)
-        self.figure, self.ax = plt.subplots()
-        self.canvas = FigureCanvas(self.figure)
+        # The figure is built by the first update_plot: matplotlib is slow to import and many plots never draw
+        self.figure, self.ax, self.canvas = None, None, None
         self.line = None
+        self.envelope = None
         self.position_line = None
+        self.background = None
+        self.last_playhead_pixel = None
+        self.frame_stats = FrameStats()
         self.selection_rect = None
         self.selected_region = None
         self.span_selector = None
@@ -24,21 +66,38 @@ class PlotWidget(QWidget):
         self.data = None
         self.fs = None
         self.audio = None
+        self.peaks = None
+        self.file_peaks = None  # (data, peaks) of the file as loaded, the root of any edit graph
+        self.waveform_cache = WaveformCache(os.path.join(get_main_sound_dir_path('Epoch123/DB'), 'peaks'))
 
-        # Initialize undo and redo stacks
-        self.undo_stack = []
-        self.redo_stack = []
+        # Undo and redo keep what each edit changed rather than copies of the data
+        self.history = EditHistory()
         self.data_stack = []
 
+        # Overviews of filtered or pitch shifted data are rendered on a worker
+        self.renderer = LatestTaskRunner(parent=self)
+        self.renderer.progress.connect(self.on_render_progress)
+        self.renderer.result_ready.connect(self.on_render_finished)
+        self.renderer.error.connect(self.on_render_failed)
+
         if audio_player:
             self.audio_player = audio_player
             self.audio_player.update_position.connect(self.update_position_line)
             self.audio_player.playback_finished.connect(self.reset_position_line)
 
-        # Set up the canvas layout
-        layout = QVBoxLayout(self)
-        layout.addWidget(self.canvas)
-        self.setLayout(layout)
+        self.setLayout(QVBoxLayout(self))
+
+    def ensure_figure(self):
+        """Build the figure and its canvas the first time there is something to draw."""
+        if self.figure is not None:
+            return
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
+
+        self.figure = Figure()
+        self.ax = self.figure.add_subplot()
+        self.canvas = FigureCanvas(self.figure)
+        self.layout().addWidget(self.canvas)
         self.setup_plot()
         self.connect_events()
 
@@ -53,15 +112,22 @@ class PlotWidget(QWidget):
         self.ax.grid(color='orange', linestyle='-', linewidth=0.25, alpha=0.5)
         self.ax.set_axisbelow(False)
 
-        self.position_line = self.ax.axvline(0, color='gray', lw=1, zorder=3)
+        # Animated: left out of full redraws and blitted over the cached background instead
+        self.position_line = self.ax.axvline(0, color='gray', lw=1, zorder=3, animated=True)
 
     def connect_events(self):
         """Connect plot events for interaction."""
         self.canvas.mpl_connect('button_press_event', self.on_click)
+        self.canvas.mpl_connect('draw_event', self.on_draw)
+        self.canvas.mpl_connect('resize_event', lambda event: self.refresh_waveform())
+        # Every zoom, pan or undo goes through set_xlim, so redraw the matching peak level there
+        self.ax.callbacks.connect('xlim_changed', lambda ax: self.refresh_waveform())
         self.reset_span_selector()
 
     def reset_span_selector(self):
         """Reset the SpanSelector to enable new selections."""
+        from matplotlib.widgets import SpanSelector
+
         if self.span_selector:
             self.span_selector.disconnect_events()
         self.span_selector = SpanSelector(self.ax, self.on_select, 'horizontal', useblit=True, props=dict(alpha=0.3, facecolor='pink'))
@@ -87,24 +153,118 @@ class PlotWidget(QWidget):
         amplitude_labels[0], amplitude_labels[-1] = '', ''  # Avoid overlap
         self.ax.set_yticklabels(amplitude_labels, color='orange', fontsize=8, ha='left', va='top', x=0.02)
 
-    def update_plot(self, data, fs, audio):
-        """Update the plot with new audio data."""
+    def update_plot(self, data, fs, audio=None, file_path=None):
+        """
+            Update the plot with new audio data.
+            Pass file_path for unedited file data so its peak pyramid comes from the on-disk cache;
+            that starts a new file, so the edit history is cleared too.
+            The time axis is derived from len(data) / fs, so edited data always gets correct ticks.
+            An edit graph whose overview needs a render pass is drawn once that finishes on a worker,
+            with a preview from a decimated copy in the meantime.
+        """
+        self.ensure_figure()
+        self.renderer.cancel()
+        if file_path:
+            self.history.clear()
         self.audio = audio
         self.data = data
         self.fs = fs
-        x_data = np.arange(len(data))
+        if file_path:
+            self.peaks = self.waveform_cache.get(file_path, data)
+            self.file_peaks = (data, self.peaks)
+        elif isinstance(data, EditNode) and data.overview_pending():
+            self.peaks = None
+            self.renderer.submit(self.render_peaks, data, self.peaks_for, pass_cancel_event=True, pass_progress=True)
+        elif isinstance(data, EditNode):
+            self.peaks = data.peaks(self.peaks_for)
+        else:
+            self.peaks = self.peaks_for(data)
 
         if self.line is None:
-            self.line, = self.ax.plot(x_data, data, color='purple', lw=0.5)
-        else:
-            self.line.set_data(x_data, data)
+            from matplotlib.collections import PolyCollection
+
+            # Raw samples are drawn as a line when zoomed in, peak levels as a filled envelope otherwise
+            self.line, = self.ax.plot([], [], color='purple', lw=0.5)
+            self.envelope = PolyCollection([], facecolor='purple', edgecolor='purple', linewidths=0.5)
+            self.ax.add_collection(self.envelope)
 
         self.position_line.set_xdata([0])
         self.ax.set_xlim(0, len(data))
-        self.set_ticks(audio.duration_seconds, len(data))
+        self.refresh_waveform()
+        self.set_ticks(len(data) / fs, len(data))
         self.canvas.draw_idle()
         self.reset_span_selector()
 
+    def peaks_for(self, data):
+        """The pyramid of raw data: the file's from the cache, or built now."""
+        if self.file_peaks is not None and self.file_peaks[0] is data:
+            return self.file_peaks[1]
+        return PeakPyramid.build(data)
+
+    @staticmethod
+    def render_peaks(node, peaks_for, progress, cancel_event):
+        """Worker: report a preview overview of node first, then render the real one; returns node."""
+        def on_chunk(fraction):
+            if cancel_event.is_set():
+                raise TaskCancelled()
+            progress(fraction)
+
+        on_chunk(0.0)
+        preview = node.preview_peaks()
+        if preview is not None:
+            progress(0.0, (node, preview))
+        node.peaks(peaks_for, on_chunk)
+        return node
+
+    def on_render_progress(self, fraction, partial):
+        if partial is not None:
+            node, preview = partial
+            if node is self.data:
+                self.peaks = preview
+                self.refresh_waveform()
+                self.canvas.draw_idle()
+
+    def on_render_finished(self, node):
+        if node is self.data:
+            self.peaks = node.peaks()
+            self.refresh_waveform()
+            self.canvas.draw_idle()
+
+    def on_render_failed(self, message):
+        logging.error(f"Failed to render waveform: {message}")
+        show_error_message(self, f"Failed to render waveform: {message}")
+
+    def cancel_render(self):
+        """Abandon the edit whose overview is still rendering; redo brings it back."""
+        if self.renderer.busy:
+            self.renderer.cancel()
+            self.undo_last_action()
+
+    def refresh_waveform(self):
+        """Draw the peak level matching the visible range and canvas width, or raw samples when zoomed in."""
+        if self.line is None or self.data is None:
+            return
+        if self.peaks is None:
+            # Still rendering on a worker; do not leave the previous data's waveform up
+            self.line.set_data([], [])
+            self.envelope.set_verts([])
+            return
+        xmin, xmax = self.ax.get_xlim()
+        start, stop = max(int(np.floor(xmin)), 0), min(int(np.ceil(xmax)) + 1, len(self.data))
+        samples_per_pixel = (xmax - xmin) / max(self.canvas.width(), 1)
+        envelope = self.peaks.envelope(start, stop, samples_per_pixel)
+        if envelope is None and samples_per_pixel > self.RAW_SAMPLES_PER_PIXEL:
+            envelope = PeakPyramid.window_envelope(self.data, start, stop, samples_per_pixel)
+        if envelope is None:
+            self.line.set_data(np.arange(start, stop), self.data[start:stop])
+            self.envelope.set_verts([])
+        else:
+            x, mins, maxs = envelope
+            # Outline of the max curve left to right, then the min curve back
+            outline = np.column_stack((np.concatenate((x, x[::-1])), np.concatenate((maxs, mins[::-1]))))
+            self.envelope.set_verts([outline])
+            self.line.set_data([], [])
+
     def on_click(self, event):
         """Handle plot selection clicks."""
         if event.button == 1 and self.selected_region and event.inaxes == self.ax:
@@ -113,21 +273,44 @@ class PlotWidget(QWidget):
                 self.clear_selection()
             
     def get_selected_segment(self):
+        """The selected samples with the region bounds; a view for array data, rendered for an edit graph."""
         if self.selected_region:
             xmin, xmax = self.selected_region
             return self.data[int(xmin):int(xmax)], xmin, xmax
         return None, None, None
 
-    def update_position_line(self, position):
-        """Update the position line based on the current position in milliseconds."""
+    def on_draw(self, event):
+        """After every full redraw, cache the static plot and paint the playhead on top of it."""
+        self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+        self.last_playhead_pixel = None
+        self.ax.draw_artist(self.position_line)
+
+    def blit_position_line(self):
+        """Repaint only the playhead: restore the cached background and draw the line over it."""
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        start = time.perf_counter()
+        self.canvas.restore_region(self.background)
+        self.ax.draw_artist(self.position_line)
+        self.canvas.blit(self.ax.bbox)
+        self.frame_stats.record((time.perf_counter() - start) * 1000)
+
+    def update_position_line(self, position_index):
+        """Move the position line to the sample index the audio player reports."""
         if self.fs and self.data is not None:
-            position_index = int(position / 1000 * self.fs)  # Convert milliseconds to index
             if position_index <= len(self.data):
                 self.position_line.set_xdata([position_index, position_index])
-                self.canvas.draw_idle()
+                # Skip the repaint when the playhead has not moved a whole pixel
+                pixel = round(self.ax.transData.transform((position_index, 0))[0])
+                if pixel != self.last_playhead_pixel:
+                    self.last_playhead_pixel = pixel
+                    self.blit_position_line()
 
     def reset_position_line(self):
         """Reset the position line to the initial position of the selected region, or to zero."""
+        if self.figure is None:
+            return
         initial_position = int(self.selected_region[0]) if self.selected_region else 0
         self.position_line.set_xdata([initial_position, initial_position])
         self.canvas.draw_idle()
@@ -140,14 +323,9 @@ class PlotWidget(QWidget):
                 self.selection_rect.remove()
             self.selection_rect = self.ax.axvspan(xmin, xmax, color='pink', alpha=0.3)
 
-            # Extract only the selected region from data
-            start_frame = int(xmin)
-            end_frame = int(xmax)
-            selected_segment = self.data[start_frame:end_frame]
-
-            # Pass the selected region's audio data to the audio player
-            self.audio_player.set_audio_data(selected_segment, self.fs)
-            self.audio_player.set_initial_frame(start_frame)
+            # The player streams the region straight out of the full data
+            self.audio_player.set_audio_data(self.data, self.fs)
+            self.audio_player.set_region(int(xmin), int(xmax))
             self.position_line.set_xdata([xmin])
         else:
             self.clear_selection()
@@ -160,8 +338,9 @@ class PlotWidget(QWidget):
         self.selection_rect = None
         self.selected_region = None
         self.audio_player.set_audio_data(self.data, self.fs)  # Reset audio data to full length
-        self.position_line.set_xdata([0])
-        self.canvas.draw_idle()
+        if self.figure is not None:
+            self.position_line.set_xdata([0])
+            self.canvas.draw_idle()
 
     def on_click(self, event):
         """Clear selection if clicked outside the current selected region."""
@@ -180,6 +359,8 @@ class PlotWidget(QWidget):
 
     def contextMenuEvent(self, event):
         """Override the context menu event to display the menu only when right-clicking on the widget."""
+        if self.figure is None:
+            return  # Nothing plotted yet
         if self.selected_region:
             self.context_menu(event, 'selected_region')
         else:
@@ -231,12 +412,10 @@ class PlotWidget(QWidget):
 
     def zoom_out(self):
         if self.data is not None:
+            self.history.record_view(self.ax.get_xlim(), 'Zoom out')
             self.ax.set_xlim(0, len(self.data))
             self.canvas.draw_idle()
-            # Add the current state to the undo stack
-            self.undo_stack.append(self.data)
-            self.redo_stack.append(self.data)
-            self.set_ticks(self.audio.duration_seconds, len(self.data))
+            self.set_ticks(len(self.data) / self.fs, len(self.data))
             # Reset the selected region
             self.clear_selection()
 
@@ -244,7 +423,7 @@ class PlotWidget(QWidget):
         """Zoom into the currently selected region and adjust ticks accordingly."""
         if self.selected_region:
             xmin, xmax = self.selected_region
-            self.undo_stack.append((np.copy(self.data), (self.ax.get_xlim())))  # Save current data and view limits
+            self.history.record_view(self.ax.get_xlim(), 'Zoom')
             self.ax.set_xlim(xmin, xmax)
             self.set_ticks(None, None, xmin, xmax)  # Update ticks for the zoomed region
             self.clear_selection()
@@ -254,53 +433,45 @@ class PlotWidget(QWidget):
         """Crop the audio data to only include the selected region."""
         if self.selected_region:
             xmin, xmax = self.selected_region
-            self.undo_stack.append((np.copy(self.data), (self.ax.get_xlim())))  # Save current data and view limits
-            self.data = self.data[int(xmin):int(xmax)]
             self.clear_selection()
-            self.update_plot(self.data, self.fs, self.audio)
+            self.apply_edit(CropNode(as_node(self.data, self.fs), xmin, xmax), 'Crop')
 
     def crop_unselected(self):
         """Crop the audio data to exclude the selected region."""
         if self.selected_region:
             xmin, xmax = self.selected_region
-            self.undo_stack.append((np.copy(self.data), (self.ax.get_xlim())))  # Save current data and view limits
-            self.data = np.concatenate((self.data[:int(xmin)], self.data[int(xmax):]))
             self.clear_selection()
-            self.update_plot(self.data, self.fs, self.audio)
-
-    def push_state(self, data):
-        # Save a copy of the data and current view limits
-        current_view = self.ax.get_xlim()
-        self.undo_stack.append((np.copy(data), current_view))
-        self.redo_stack.clear()  # Clear the redo stack whenever new changes are made
+            self.apply_edit(CropOutNode(as_node(self.data, self.fs), xmin, xmax), 'Crop out')
+
+    def apply_edit(self, data, label=''):
+        """Replace the data with an edited version, recording the change for undo."""
+        self.history.record(self.data, data, self.ax.get_xlim(), label)
+        self.show_data(data)
+
+    def show_data(self, data, view=None):
+        """Plot data for the same file, optionally restoring view limits, and announce it if it changed."""
+        changed = data is not self.data
+        if changed:
+            self.update_plot(data, self.fs, self.audio)
+        if view is not None:
+            self.ax.set_xlim(view)
+        self.clear_selection()
+        if changed:
+            self.data_changed.emit(self.data)
 
     def undo_last_action(self):
-        if self.undo_stack:
-            try:
-                last_state, last_view = self.undo_stack.pop()
-                self.redo_stack.append((np.copy(self.data), self.ax.get_xlim()))  # Save current state before undo
-                self.data = last_state
-                self.ax.set_xlim(last_view)  # Restore view limits
-                self.update_plot(self.data, self.fs, self.audio)
-                self.canvas.draw_idle()
-            except ValueError as e:
-                logging.error(f"Failed to unpack undo stack: {e}")
-                # Optionally, add more diagnostics
-                logging.error(f"Current undo stack state: {self.undo_stack}")
-        else:
+        result = self.history.undo(self.data, self.ax.get_xlim())
+        if result is None:
             logging.info("Undo stack is empty")
-
+            return
+        self.show_data(*result)
 
     def redo_last_action(self):
-        if self.redo_stack:
-            next_state, next_view = self.redo_stack.pop()
-            self.undo_stack.append((np.copy(self.data), (self.ax.get_xlim())))  # Save current state before redo
-            self.data = next_state
-            self.update_plot(self.data, self.fs, self.audio)
-            # clear selection if any
-            self.clear_selection()
-            self.ax.set_xlim(next_view)  # Restore view limits
-            self.canvas.draw_idle()
+        result = self.history.redo(self.data, self.ax.get_xlim())
+        if result is None:
+            logging.info("Redo stack is empty")
+            return
+        self.show_data(*result)
 
     def save_plot(self):
         file_path, _ = QFileDialog.getSaveFileName(self, "Save Image", os.path.join(os.path.expanduser("~"), 'Downloads'), "Images (*.png)")
@@ -1,12 +1,12 @@
-from PySide6.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QMessageBox
+import os
+from PySide6.QtWidgets import QFrame, QVBoxLayout, QHBoxLayout, QMessageBox, QProgressBar
 from PySide6.QtCore import Qt
 from GUIElements import Button, LineEdit, GuiWidget, CustomComboBox
 from PlotWidget import PlotWidget
 from AudioManager import AudioControlWidget
-import soundfile as sf
+from core.EditGraph import FilterNode, PitchNode, StretchNode, TrimNode, SourceNode, ChannelSource, as_node, write_render
+from BackgroundTasks import LatestTaskRunner, TaskCancelled
 import numpy as np
-import scipy.signal as sig
-from numpy.fft import fft, ifft
 from GUIElements import Slider
 
 class SoundEditor(QFrame):
@@ -15,6 +15,8 @@ class SoundEditor(QFrame):
         self.parent = parent
         self.audio_player = parent.audio_player
         self.audio_data, self.audio_file, self.sample_rate = None, None, None
+        self.source_data, self.audio = None, None
+        self.pending_trim = None  # (data, dB level) waiting for the data's overview to finish rendering
 
         self.setStyleSheet("background-color: #111111; color: white;")
         layout = QVBoxLayout(self)
@@ -22,9 +24,20 @@ class SoundEditor(QFrame):
 
         # Plot and navigation buttons
         self.plot_widget = PlotWidget(audio_player=self.audio_player, parent=self)
+        self.plot_widget.data_changed.connect(self.on_data_changed)
         self.set_nav_buttons(layout)
+        self.set_progress_row(layout)
         layout.addWidget(self.plot_widget)
 
+        # Rendering for the plot and for saving runs on workers and reports here
+        self.plot_widget.renderer.progress.connect(self.on_task_progress)
+        self.plot_widget.renderer.result_ready.connect(self.on_task_done)
+        self.plot_widget.renderer.error.connect(self.on_task_done)
+        self.saver = LatestTaskRunner(parent=self)
+        self.saver.progress.connect(self.on_task_progress)
+        self.saver.result_ready.connect(self.on_saved)
+        self.saver.error.connect(self.on_save_failed)
+
         # Editor options
         self.editor_layout = QVBoxLayout()
         layout.addLayout(self.editor_layout)
@@ -32,10 +45,15 @@ class SoundEditor(QFrame):
 
     def set_audio_data(self, audio_data, audio_file, sample_rate, audio):
         self.audio_data = audio_data
+        self.source_data = audio_data  # the mono mix edit graphs are built on
         self.audio_file = audio_file
         self.sample_rate = sample_rate
         self.audio = audio
 
+    def on_data_changed(self, audio_data):
+        """Follow edits, crops, undo and redo made through the plot."""
+        self.audio_data = audio_data
+        self.audio_player.set_audio_data(self.audio_data, self.sample_rate)
 
     def set_nav_buttons(self, layout):
         nav_layout = QHBoxLayout()
@@ -45,16 +63,61 @@ class SoundEditor(QFrame):
         nav_layout.addWidget(Button("\u23EA", self.audio_player.play_reverse, setFixedWidth=75))
         layout.addLayout(nav_layout)
 
+    def set_progress_row(self, layout):
+        progress_layout = QHBoxLayout()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.cancel_button = Button("Cancel", self.cancel_task, setFixedWidth=75)
+        progress_layout.addWidget(self.progress_bar)
+        progress_layout.addWidget(self.cancel_button)
+        layout.addLayout(progress_layout)
+        self.hide_progress()
+
+    def hide_progress(self):
+        self.progress_bar.hide()
+        self.cancel_button.hide()
+
+    def on_task_progress(self, fraction, partial=None):
+        self.progress_bar.setValue(int(fraction * 100))
+        self.progress_bar.show()
+        self.cancel_button.show()
+
+    def on_task_done(self, result=None):
+        if self.pending_trim is not None and not self.plot_widget.renderer.busy:
+            data, decibel_level = self.pending_trim
+            self.pending_trim = None
+            # Only if the render that finished was for the data the trim was asked for
+            if result is data and data is self.audio_data:
+                self.apply_trim(data.peaks(self.plot_widget.peaks_for), decibel_level)
+        if not (self.saver.busy or self.plot_widget.renderer.busy):
+            self.hide_progress()
+
+    def cancel_task(self):
+        """Cancel a running save, or else the edit still rendering."""
+        if self.saver.busy:
+            self.saver.cancel()
+            self.show_status("Save cancelled")
+        elif self.plot_widget.renderer.busy:
+            self.pending_trim = None
+            self.plot_widget.cancel_render()
+            self.show_status("Edit cancelled")
+        self.hide_progress()
+
+    def show_status(self, message):
+        self.parent.statusBar().showMessage(message, 5000)
+
     def set_editor(self):
-        self.create_dropdown("Filter", ["Low Pass", "High Pass", "Band Pass"], self.apply_filter)
+        self.cutoff_input = LineEdit(placeholder="Hz", setFixedWidth=100)
+        self.create_dropdown("Filter", ["Low Pass", "High Pass", "Band Pass"], self.apply_filter, [self.cutoff_input])
         self.create_input("Pitch Shift (Semitones):", "0", self.change_pitch, 200)
+        self.create_input("Time Stretch (x):", "1.0", self.stretch_time, 200)
         self.create_input("Trim Level (dB):", "0.0", self.trim_audio, 200)
         self.create_slider("Volume", 0, 100, 1, self.audio_player.set_volume, 200)
 
-    def create_dropdown(self, label, items, callback):
+    def create_dropdown(self, label, items, callback, extra_elements=()):
         dropdown = CustomComboBox(items)
         dropdown.set_on_change(callback)
-        layout = GuiWidget(label_text=f"{label}:", gui_elements=[dropdown])
+        layout = GuiWidget(label_text=f"{label}:", gui_elements=[dropdown, *extra_elements])
         self.editor_layout.addWidget(layout)
 
     def create_input(self, label, placeholder, action, width):
@@ -78,49 +141,67 @@ class SoundEditor(QFrame):
                     QMessageBox.critical(self, "Error", "Audio data is empty.")
                     return
 
-                # Ensure the data is mono for filtering
-                if self.audio_data.ndim > 1:
-                    self.audio_data = np.mean(self.audio_data, axis=1)  # Averaging stereo to mono
-
+                source = as_node(self.audio_data, self.sample_rate)
+                cutoff = self.filter_cutoff(selected_filter)
                 if selected_filter == "Low Pass":
-                    b, a = sig.butter(4, 0.1)
+                    node = FilterNode(source, 'lowpass', cutoff)
                 elif selected_filter == "High Pass":
-                    b, a = sig.butter(4, 0.1, btype='high')
+                    node = FilterNode(source, 'highpass', cutoff)
                 elif selected_filter == "Band Pass":
-                    b, a = sig.butter(4, [0.05, 0.15], btype='band')
+                    node = FilterNode(source, 'bandpass', cutoff)
                 else:
                     QMessageBox.critical(self, "Filter Error", "Unknown filter type.")
                     return
 
-                self.plot_widget.undo_stack.append((np.copy(self.audio_data), (self.plot_widget.ax.get_xlim())))
-                self.audio_data = sig.filtfilt(b, a, self.audio_data)
-                self.audio_player.set_audio_data(self.audio_data, self.sample_rate)  # Update audio player data
-                self.plot_widget.update_plot(self.audio_data, self.sample_rate, self.audio)  # Update plot
-                QMessageBox.information(self, "Filter Applied", f"{selected_filter} filter applied successfully!")
+                self.plot_widget.apply_edit(node, selected_filter)
+                self.show_status(f"{selected_filter} filter applied at {self.format_cutoff(cutoff)} Hz")
+            except ValueError as e:
+                QMessageBox.critical(self, "Filter Error", str(e))
             except Exception as e:
                 QMessageBox.critical(self, "Filter Application Error", f"Failed to apply {selected_filter} filter: {str(e)}")
 
+    def filter_cutoff(self, selected_filter):
+        """
+            Cutoff in Hz from the cutoff field: "f", or "low-high" for band pass.
+            Empty gives the defaults, a tenth of the Nyquist frequency or the
+            band from 5% to 15% of it.
+        """
+        text = self.cutoff_input.text().strip()
+        nyquist = self.sample_rate / 2
+        if not text:
+            return [0.05 * nyquist, 0.15 * nyquist] if selected_filter == "Band Pass" else 0.1 * nyquist
+        try:
+            values = [float(part) for part in text.split('-')]
+        except ValueError:
+            raise ValueError(f"Cutoff '{text}' is not a frequency in Hz")
+        if selected_filter == "Band Pass":
+            if len(values) != 2:
+                raise ValueError("Band pass needs a range such as 300-3000")
+            return values
+        if len(values) != 1:
+            raise ValueError(f"{selected_filter} needs a single cutoff frequency")
+        return values[0]
+
+    @staticmethod
+    def format_cutoff(cutoff):
+        return '-'.join(f"{value:g}" for value in np.atleast_1d(cutoff))
+
     def change_pitch(self, semitones):
-        """Change pitch using FFT-based method."""
+        """Change pitch with the phase vocoder, keeping the length."""
         try:
             factor = 2 ** (semitones / 12)
-            self.plot_widget.undo_stack.append((np.copy(self.audio_data), (self.plot_widget.ax.get_xlim())))
-            self.audio_data = self.fft_pitch_shift(self.audio_data, factor)
-            self.audio_player.set_audio_data(self.audio_data, self.sample_rate)  # Update audio player data
-            self.plot_widget.update_plot(self.audio_data, self.sample_rate, None)
-            QMessageBox.information(self, "Pitch Shift", "Pitch changed successfully!")
+            self.plot_widget.apply_edit(PitchNode(as_node(self.audio_data, self.sample_rate), factor), "Pitch shift")
+            self.show_status(f"Pitch shifted by {semitones:g} semitones")
         except Exception as e:
             self.display_error("Failed to change pitch", e)
 
-    def fft_pitch_shift(self, data, factor):
-        """Shift the pitch by multiplying its FFT spectrum with a factor."""
-        fft_spectrum = fft(data)
-        new_fft_spectrum = np.zeros_like(fft_spectrum)
-        N = len(fft_spectrum)
-        new_indices = (np.arange(N) * factor).astype(int)
-        valid = (new_indices < N)
-        new_fft_spectrum[new_indices[valid]] = fft_spectrum[valid]
-        return ifft(new_fft_spectrum).real
+    def stretch_time(self, ratio):
+        """Make the audio ratio times as long with the phase vocoder, keeping the pitch."""
+        try:
+            self.plot_widget.apply_edit(StretchNode(as_node(self.audio_data, self.sample_rate), ratio), "Time stretch")
+            self.show_status(f"Time stretched by {ratio:g}x")
+        except Exception as e:
+            self.display_error("Failed to stretch audio", e)
 
     def trim_audio(self, decibel_level):
         """Trim audio based on the decibel level, applying a threshold relative to the maximum amplitude."""
@@ -128,35 +209,73 @@ class SoundEditor(QFrame):
             QMessageBox.critical(self, "Error", "No audio data to process.")
             return
 
-        # Calculate the threshold amplitude based on the decibel level
-        ref_level = np.max(np.abs(self.audio_data))
+        # The plotted peaks hold the maximum amplitude of the current data, unless they
+        # are still rendering or only a preview; then trim once the renderer has them
+        peaks = self.plot_widget.peaks
+        if peaks is None or self.plot_widget.renderer.busy:
+            self.pending_trim = (self.audio_data, decibel_level)
+            self.show_status("Trim will apply once the waveform has rendered")
+            return
+        self.apply_trim(peaks, decibel_level)
+
+    def apply_trim(self, peaks, decibel_level):
+        ref_level = peaks.abs_max()
         if ref_level == 0:
             return  # Prevent log of zero if audio is silent
 
         # Convert dB level to a linear amplitude threshold
         threshold = ref_level * (10 ** (decibel_level / 20))
 
-        # Mask array where amplitude is below the threshold
-        masked_data = np.where(np.abs(self.audio_data) < threshold, 0, self.audio_data)
-
-        # Save the original state for undo functionality
-        self.plot_widget.push_state(self.audio_data)
-
-        # Update audio data
-        self.plot_widget.undo_stack.append((np.copy(self.audio_data), (self.plot_widget.ax.get_xlim())))
-        self.audio_data = masked_data
-        self.audio_player.set_audio_data(self.audio_data, self.sample_rate)
-        self.plot_widget.update_plot(self.audio_data, self.sample_rate, self.audio)
-        QMessageBox.information(self, "Trim Audio", f"Audio trimmed at {decibel_level} dB successfully!")
-
+        # Samples below the threshold are zeroed as they are read
+        self.plot_widget.apply_edit(TrimNode(as_node(self.audio_data, self.sample_rate), threshold), "Trim")
+        self.show_status(f"Audio trimmed at {decibel_level} dB")
 
     def save_audio(self):
         if self.audio_file:
-            sf.write(self.audio_file, self.audio_data, self.sample_rate)
-            QMessageBox.information(self, "Save Audio", "Audio saved successfully!")
+            self.show_status(f"Saving {os.path.basename(self.audio_file)}")
+            self.saver.submit(self.write_render, self.channel_graphs(), self.sample_rate, self.audio_file,
+                              pass_cancel_event=True, pass_progress=True)
         else:
             QMessageBox.critical(self, "Error", "No audio file specified.")
 
+    def channel_graphs(self):
+        """
+            One graph per channel to save. The editor shows and edits the mono
+            mix; when the current graph is built on it, the same edits are
+            rebuilt on each channel of the file so saving keeps them apart.
+        """
+        graph = as_node(self.audio_data, self.sample_rate)
+        if self.audio is None or getattr(self.audio, 'channels', 1) < 2:
+            return [graph]
+        root = graph.root()
+        if not (isinstance(root, SourceNode) and root.data is self.source_data):
+            return [graph]
+        return [graph.on_root(SourceNode(ChannelSource(self.audio, channel), self.sample_rate))
+                for channel in range(self.audio.channels)]
+
+    @staticmethod
+    def write_render(graphs, sample_rate, file_path, progress, cancel_event):
+        """Worker: EditGraph.write_render over file_path, reporting progress and stopping on cancel."""
+        def on_chunk(fraction):
+            if cancel_event.is_set():
+                raise TaskCancelled()
+            progress(fraction)
+
+        on_chunk(0.0)
+        return write_render(graphs, sample_rate, file_path, on_chunk)
+
+    def on_saved(self, file_path):
+        # The cached decode of this file is now stale
+        self.parent.file_navigator.audio_cache.invalidate(file_path)
+        # and so are its duration and size in the library
+        self.parent.index_files([file_path])
+        self.on_task_done()
+        self.show_status(f"Saved {os.path.basename(file_path)}")
+
+    def on_save_failed(self, message):
+        self.on_task_done()
+        self.display_error("Failed to save audio", message)
+
     def display_error(self, context, error):
         """Display an error message with context."""
         QMessageBox.critical(self, "Error", f"{context}: {str(error)}")
@@ -0,0 +1,195 @@
+"""
+    Start-up instrumentation. Off unless the app is started with
+    --profile-startup[=PATH] or EPOCH123_PROFILE_STARTUP=PATH (1 for the
+    default path); then it times every import that loads new modules, the
+    phases app.py marks, and the time to the window's first paint, and
+    writes them as JSON to PATH when the window first paints.
+    --profile-startup-quit or EPOCH123_PROFILE_STARTUP_QUIT=1 closes the
+    window once the report is written, for timing runs in scripts.
+
+    All times are seconds since the profiler was enabled at the top of
+    app.py; interpreter_seconds is how long the process ran before that,
+    where the platform can tell.
+"""
+import os
+import sys
+import json
+import logging
+import time
+import builtins
+import platform
+import threading
+from contextlib import contextmanager
+
+DEFAULT_REPORT_PATH = 'startup_profile.json'
+REPORT_VERSION = 1
+
+
+def process_age():
+    """Seconds since this process started, from /proc on Linux; None elsewhere."""
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the parenthesised command name; starttime is field 22 overall
+            fields = f.read().rsplit(')', 1)[1].split()
+        started = int(fields[19]) / os.sysconf('SC_CLK_TCK')
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class StartupProfiler:
+    # Imports faster than this are left out of the report
+    MIN_IMPORT_SECONDS = 0.001
+
+    def __init__(self):
+        self.enabled = False
+        self.report_path = None
+        self.quit_after_paint = False
+        self.origin = None
+        self.interpreter_seconds = None
+        self.marks = {}
+        self.phases = []
+        self.imports = []
+        self.phase_stack = []
+        self.local = threading.local()  # per-thread stack of imports in progress
+        self.original_import = None
+        self.paint_filter = None
+
+    def configure(self, argv):
+        """
+            Enable from the command line or the environment, taking the
+            profiler's own flags out of argv so Qt does not see them.
+        """
+        path = os.environ.get('EPOCH123_PROFILE_STARTUP')
+        quit_after_paint = os.environ.get('EPOCH123_PROFILE_STARTUP_QUIT') == '1'
+        for arg in list(argv[1:]):
+            if arg == '--profile-startup' or arg.startswith('--profile-startup='):
+                path = arg.partition('=')[2] or '1'
+                argv.remove(arg)
+            elif arg == '--profile-startup-quit':
+                quit_after_paint = True
+                argv.remove(arg)
+        if path:
+            self.enable(DEFAULT_REPORT_PATH if path == '1' else path, quit_after_paint)
+
+    def enable(self, report_path, quit_after_paint=False):
+        self.enabled = True
+        self.report_path = report_path
+        self.quit_after_paint = quit_after_paint
+        self.origin = time.perf_counter()
+        self.interpreter_seconds = process_age()
+        self.original_import = builtins.__import__
+        builtins.__import__ = self.timed_import
+
+    def now(self):
+        return time.perf_counter() - self.origin
+
+    def timed_import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        loaded = len(sys.modules)
+        stack = getattr(self.local, 'stack', None)
+        if stack is None:
+            stack = self.local.stack = []
+        entry = {'module': self.absolute_name(name, globals, level), 'start': self.now(), 'nested': 0.0}
+        stack.append(entry)
+        try:
+            return self.original_import(name, globals, locals, fromlist, level)
+        finally:
+            stack.pop()
+            seconds = self.now() - entry['start']
+            # Only statements that loaded something; everything else was a sys.modules lookup
+            if len(sys.modules) > loaded:
+                if stack:
+                    stack[-1]['nested'] += seconds
+                if seconds >= self.MIN_IMPORT_SECONDS:
+                    self.imports.append({
+                        'module': entry['module'],
+                        'names': list(fromlist or ()),
+                        'importer': (globals or {}).get('__name__'),
+                        'thread': threading.current_thread().name,
+                        'depth': len(stack),
+                        'start': round(entry['start'], 6),
+                        'seconds': round(seconds, 6),
+                        'self_seconds': round(seconds - entry['nested'], 6),
+                    })
+
+    @staticmethod
+    def absolute_name(name, globals, level):
+        """The module name an import statement refers to, with relative imports resolved."""
+        if level == 0 or not globals:
+            return name
+        package = (globals.get('__package__') or globals.get('__name__', '')).rsplit('.', level - 1)[0]
+        return f"{package}.{name}" if name else package
+
+    def mark(self, name):
+        """Record the time of a point in start-up, e.g. the first paint."""
+        if self.enabled:
+            self.marks[name] = round(self.now(), 6)
+
+    @contextmanager
+    def phase(self, name):
+        """Time the enclosed start-up step; phases may nest."""
+        if not self.enabled:
+            yield
+            return
+        record = {'name': name, 'parent': self.phase_stack[-1]['name'] if self.phase_stack else None,
+                  'start': round(self.now(), 6)}
+        self.phase_stack.append(record)
+        try:
+            yield
+        finally:
+            self.phase_stack.pop()
+            record['seconds'] = round(self.now() - record['start'], 6)
+            self.phases.append(record)
+
+    def watch_first_paint(self, window):
+        """Write the report when the first widget paints, then close window if asked to."""
+        if not self.enabled:
+            return
+        from PySide6.QtCore import QEvent, QObject, QTimer
+        from PySide6.QtWidgets import QApplication
+
+        profiler = self
+
+        class FirstPaintFilter(QObject):
+            def eventFilter(self, watched, event):
+                if event.type() == QEvent.Paint and profiler.paint_filter is self:
+                    profiler.paint_filter = None
+                    QApplication.instance().removeEventFilter(self)
+                    profiler.mark('first paint')
+                    profiler.finish()
+                    if profiler.quit_after_paint:
+                        QTimer.singleShot(0, window.close)
+                return False
+
+        # On the application, since whichever widget paints first may be a child of window
+        self.paint_filter = FirstPaintFilter(window)
+        QApplication.instance().installEventFilter(self.paint_filter)
+
+    def report(self):
+        return {
+            'version': REPORT_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'argv': sys.argv,
+            'interpreter_seconds': None if self.interpreter_seconds is None else round(self.interpreter_seconds, 3),
+            'first_paint_seconds': self.marks.get('first paint'),
+            'marks': self.marks,
+            'phases': sorted(self.phases, key=lambda phase: phase['start']),
+            'imports': sorted(self.imports, key=lambda entry: entry['start']),
+        }
+
+    def finish(self):
+        """Stop timing imports and write the report."""
+        if self.original_import is not None:
+            builtins.__import__ = self.original_import
+            self.original_import = None
+        try:
+            with open(self.report_path, 'w') as f:
+                json.dump(self.report(), f, indent=2)
+            logging.info(f"Start-up profile written to {self.report_path}")
+        except OSError as e:
+            logging.error(f"Could not write the start-up profile: {e}")
+
+
+startup_profiler = StartupProfiler()
@@ -1,57 +1,132 @@
-from PySide6.QtWidgets import QApplication, QMainWindow, QStackedWidget
-from PySide6.QtCore import QThread
 import sys
+from StartupProfiler import startup_profiler
+# Before the other imports, so their cost is measured when profiling is on
+startup_profiler.configure(sys.argv)
+from PySide6.QtWidgets import QApplication, QMainWindow, QMessageBox, QStackedWidget
+from PySide6.QtCore import QThread, QThreadPool, QTimer
+import threading
+import core
 from FileNavigator import FileNavigator
 from eutils import get_main_sound_dir_path
 import os
 import logging
-from MetaData import MetaDataDB
-from pydub import AudioSegment
+from core.MetaDataDB import MetaDataDB
+from IngestPipeline import IngestWorker
 from AudioManager import AudioPlayer
 from SoundEditor import SoundEditor
+from PlotWidget import preload as preload_plotting
+
+startup_profiler.mark('imports done')
+
+# How long after the window is shown to start importing what start-up defers
+PRELOAD_DELAY_MS = 1000
+
+
+def preload():
+    """Import what the first plot, edit or playback would otherwise wait for."""
+    core.preload()
+    preload_plotting()
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Epoch123 Audio Viewer")
         self.setMinimumSize(850, 650)
-        self.metaDataDB = MetaDataDB()
+        with startup_profiler.phase('MetaDataDB'):
+            self.metaDataDB = MetaDataDB(on_error=lambda title, message: QMessageBox.critical(None, title, message))
         self.audio_path = get_main_sound_dir_path('Epoch123/ESMD')
-        self.scan_and_insert_metadata(self.audio_path)
+        self.ingest_workers = []
 
-        self.audio_player = AudioPlayer()
+        with startup_profiler.phase('AudioPlayer'):
+            self.audio_player = AudioPlayer()
+            self.audio_player.error.connect(self.show_playback_error)
 
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
-        self.file_navigator = FileNavigator(self)
-        self.stack.addWidget(self.file_navigator)
+        with startup_profiler.phase('FileNavigator'):
+            self.file_navigator = FileNavigator(self)
+            self.stack.addWidget(self.file_navigator)
+
+        # Built by show_sound_editor the first time it is needed; most sessions only browse
+        self.sound_editor = None
 
-        self.sound_editor = SoundEditor(self)
-        self.stack.addWidget(self.sound_editor)
+        # Index the library in the background once the window is built
+        with startup_profiler.phase('library scan start'):
+            self.scan_and_insert_metadata(self.audio_path)
 
     def scan_and_insert_metadata(self, directory):
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if file.endswith(('.wav', '.flac', '.mp3')):
-                    full_path = os.path.join(root, file)
-                    try:
-                        audio = AudioSegment.from_file(full_path)
-                        num_channels = audio.channels
-                        sample_rate = audio.frame_rate
-                        duration = round(audio.duration_seconds, 2)
-                        file_size = round(os.path.getsize(full_path) / 1024, 2)
-                        self.metaDataDB.insert_metadata(file, full_path, num_channels, sample_rate, file_size, duration)
-                    except Exception as e:
-                        logging.error(f"Failed to read or insert metadata for {file}: {e}")
+        """Index new or changed sound files in the background; unchanged files are skipped."""
+        self.start_ingest(IngestWorker.for_directory(self.metaDataDB, directory))
+
+    def index_files(self, file_paths):
+        """Re-read the metadata of files already in the library, e.g. after a save changed them."""
+        self.start_ingest(IngestWorker(self.metaDataDB, jobs=[(file_path, None) for file_path in file_paths]))
+
+    def start_ingest(self, worker):
+        """Run an IngestWorker, reporting its progress in the status bar."""
+        # Bound methods (not lambdas) so the slots are queued onto the GUI thread
+        worker.progress.connect(self.show_ingest_progress)
+        worker.batch_written.connect(self.on_ingest_batch_written)
+        worker.ingest_finished.connect(self.on_ingest_finished)
+        self.ingest_workers.append(worker)
+        worker.start()
+
+    def show_playback_error(self, message):
+        QMessageBox.critical(self, "Playback Error", message)
+
+    def show_ingest_progress(self, done, total):
+        if total:
+            self.statusBar().showMessage(f"Indexing sounds: {done}/{total}")
+
+    def on_ingest_batch_written(self, count):
+        self.file_navigator.refresh_view()
+
+    def on_ingest_finished(self, written, failed):
+        worker = self.sender()
+        message = f"Indexed {written} sound(s)"
+        if failed:
+            message += f", {failed} failed"
+        self.statusBar().showMessage(message, 5000)
+        self.file_navigator.refresh_view()
+        worker.wait()
+        if worker in self.ingest_workers:
+            self.ingest_workers.remove(worker)
+
+    def closeEvent(self, event):
+        for worker in self.ingest_workers:
+            worker.cancel()
+        for worker in self.ingest_workers:
+            worker.wait()
+        self.file_navigator.close_search()
+        self.file_navigator.audio_loader.cancel()
+        self.file_navigator.mix_loader.cancel()
+        self.file_navigator.audio_load_pool.waitForDone()
+        # Drop waveform renders but let a save in progress finish
+        if self.sound_editor is not None:
+            self.sound_editor.plot_widget.renderer.cancel()
+        QThreadPool.globalInstance().waitForDone()
+        self.audio_player.close()
+        super().closeEvent(event)
 
     def show_file_nav_widget(self):
         self.stack.setCurrentIndex(0)
 
     def show_sound_editor(self):
-        self.stack.setCurrentIndex(1)
+        """Switch to the editor, building it on first use, and return it."""
+        if self.sound_editor is None:
+            self.sound_editor = SoundEditor(self)
+            self.stack.addWidget(self.sound_editor)
+        self.stack.setCurrentWidget(self.sound_editor)
+        return self.sound_editor
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
-    window.show()
+    with startup_profiler.phase('QApplication'):
+        app = QApplication(sys.argv)
+    with startup_profiler.phase('MainWindow'):
+        window = MainWindow()
+    startup_profiler.watch_first_paint(window)
+    with startup_profiler.phase('show'):
+        window.show()
+    # Starting after the first paint keeps the imports from competing with it for the interpreter
+    QTimer.singleShot(PRELOAD_DELAY_MS, lambda: threading.Thread(target=preload, name='preload', daemon=True).start())
     sys.exit(app.exec())
@@ -0,0 +1,185 @@
+"""
+    Headless batch processing: a chain of the sound editor's edits applied
+    to every file matching a glob or carrying a tag in the metadata
+    database, one file per worker process. Edits run in the order given on
+    the command line, per channel, and files are rendered in blocks, so
+    memory does not grow with their length. Nothing here imports Qt.
+
+    Run from the repository root, for example:
+        python3 Epoch123/batch.py --glob 'Epoch123/ESMD/**/*.wav' --highpass 80 --trim -40 --out-dir processed
+        python3 Epoch123/batch.py --tag drums --pitch -2 --in-place
+"""
+import os
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import soundfile as sf
+from core.AudioBuffer import AudioBuffer
+from core.EditGraph import (ChannelSource, FilterNode, PitchNode, SourceNode, StretchNode, TrimNode,
+                            set_vocoder_threads, write_render)
+
+# Files that would decode to more than this are read in blocks instead; every worker holds one file
+STREAM_THRESHOLD_MB = 64
+# Sample encodings results keep; compressed ones libsndfile may not write fall back to the format's default
+KEPT_SUBTYPES = {'PCM_S8', 'PCM_U8', 'PCM_16', 'PCM_24', 'PCM_32', 'FLOAT', 'DOUBLE'}
+
+
+class ChainOperation(argparse.Action):
+    """Appends (edit, value) to namespace.operations, so the chain keeps the command line order."""
+    def __call__(self, parser, namespace, values, option_string=None):
+        namespace.operations = namespace.operations + [(self.dest, values)]
+
+
+def band(text):
+    """A "low-high" cutoff pair in Hz."""
+    try:
+        low, high = (float(part) for part in text.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a band such as 300-3000")
+    return [low, high]
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip(),
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.set_defaults(operations=[])
+    selection = parser.add_argument_group("files", "Files matching any --glob; with --tag, only those with every tag")
+    selection.add_argument('--glob', action='append', default=[], metavar='PATTERN',
+                           help="glob pattern, ** matching any number of directories")
+    selection.add_argument('--tag', action='append', default=[], help="tag in the metadata database")
+    selection.add_argument('--db', help="metadata database, by default Epoch123/DB/metadata.db")
+
+    chain = parser.add_argument_group("edits", "Applied in the order given; each may be repeated")
+    chain.add_argument('--lowpass', type=float, action=ChainOperation, metavar='HZ')
+    chain.add_argument('--highpass', type=float, action=ChainOperation, metavar='HZ')
+    chain.add_argument('--bandpass', type=band, action=ChainOperation, metavar='LOW-HIGH')
+    chain.add_argument('--pitch', type=float, action=ChainOperation, metavar='SEMITONES')
+    chain.add_argument('--stretch', type=float, action=ChainOperation, metavar='RATIO')
+    chain.add_argument('--trim', type=float, action=ChainOperation, metavar='DB',
+                       help="zero samples quieter than DB below the peak, as the editor's trim does")
+
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument('--out-dir', help="write results here, keeping the files' layout below their common folder")
+    output.add_argument('--in-place', action='store_true', help="replace every file with its result")
+
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument('--stream-mb', type=float, default=STREAM_THRESHOLD_MB,
+                        help="read files that decode to more than this many MB in blocks")
+    return parser
+
+
+def select_files(patterns, tags, db_path=None):
+    """Absolute paths of the files matching any pattern, narrowed to those with every tag, sorted."""
+    selected = None
+    if patterns:
+        selected = {os.path.abspath(path) for pattern in patterns
+                    for path in glob.glob(pattern, recursive=True) if os.path.isfile(path)}
+    if tags:
+        # Imported only when asked, so globbing works without a database
+        from core.MetaDataDB import MetaDataDB
+
+        db = MetaDataDB(db_path)
+        for tag in tags:
+            tagged = {os.path.abspath(path) for path in db.get_files_by_tag(tag)}
+            selected = tagged if selected is None else selected & tagged
+        db.close()
+    return sorted(selected or ())
+
+
+def output_paths(files, out_dir):
+    """Where each file's result goes: itself, or the same place below out_dir relative to the files' common folder."""
+    if out_dir is None:
+        return list(files)
+    common = os.path.commonpath([os.path.dirname(path) for path in files])
+    return [os.path.join(out_dir, os.path.relpath(path, common)) for path in files]
+
+
+def build_chains(audio, operations):
+    """One edit graph per channel of audio with every operation applied in turn."""
+    nodes = [SourceNode(ChannelSource(audio, channel), audio.sample_rate) for channel in range(audio.channels)]
+    for name, value in operations:
+        if name in ('lowpass', 'highpass', 'bandpass'):
+            nodes = [FilterNode(node, name, value) for node in nodes]
+        elif name == 'pitch':
+            nodes = [PitchNode(node, 2 ** (value / 12)) for node in nodes]
+        elif name == 'stretch':
+            nodes = [StretchNode(node, value) for node in nodes]
+        elif name == 'trim':
+            # Relative to the loudest channel, so every channel is cut at the same level
+            ref_level = max(node.peaks().abs_max() for node in nodes)
+            if ref_level > 0:
+                nodes = [TrimNode(node, ref_level * 10 ** (value / 20)) for node in nodes]
+        else:
+            raise ValueError(f"Unknown edit '{name}'")
+    return nodes
+
+
+def vocoder_threads_per_worker(workers):
+    """Vocoder threads for each of workers processes, so together they use about one per CPU."""
+    return max(1, (os.cpu_count() or 1) // max(workers, 1))
+
+
+def process_file(file_path, out_path, operations, lazy_threshold_bytes):
+    """Worker: render one file through the chain to out_path; returns (frames, channels, seconds)."""
+    started = time.perf_counter()
+    audio = AudioBuffer.from_file(file_path, lazy_threshold_bytes)
+    try:
+        try:
+            subtype = sf.info(file_path).subtype
+        except RuntimeError:
+            subtype = None  # decoded through pydub
+        if subtype not in KEPT_SUBTYPES:
+            subtype = None
+        os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+        write_render(build_chains(audio, operations), audio.sample_rate, out_path, subtype=subtype)
+    finally:
+        if hasattr(audio, 'close'):
+            audio.close()
+    return audio.frames, audio.channels, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not args.glob and not args.tag:
+        parser.error("give at least one --glob or --tag")
+    if not args.operations:
+        parser.error("give at least one edit")
+
+    files = select_files(args.glob, args.tag, args.db)
+    if not files:
+        print("No files matched", file=sys.stderr)
+        return 1
+    outputs = output_paths(files, args.out_dir)
+    print(f"{len(files)} file(s), {len(args.operations)} edit(s), {args.workers} worker(s)")
+
+    started = time.perf_counter()
+    failed, total_samples = 0, 0
+    # Every worker would otherwise start a vocoder thread per CPU of its own
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=set_vocoder_threads,
+                             initargs=(vocoder_threads_per_worker(args.workers),)) as pool:
+        futures = {pool.submit(process_file, file_path, out_path, args.operations, int(args.stream_mb * (1 << 20))):
+                   file_path for file_path, out_path in zip(files, outputs)}
+        for future in as_completed(futures):
+            name = os.path.relpath(futures[future])
+            if name.startswith(os.pardir):
+                name = futures[future]
+            try:
+                frames, channels, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"FAILED {name}: {e}", file=sys.stderr, flush=True)
+                continue
+            total_samples += frames * channels
+            print(f"{seconds:8.2f} s  {frames * channels / seconds / 1e6:7.2f} M samples/s  {name}", flush=True)
+
+    elapsed = time.perf_counter() - started
+    print(f"{len(files) - failed} of {len(files)} file(s) in {elapsed:.2f} s wall time, "
+          f"{total_samples / elapsed / 1e6:.2f} M samples/s overall")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,262 @@
+import struct
+import logging
+import operator
+import threading
+import numpy as np
+import soundfile as sf
+
+
+def mix_to_mono(samples):
+    """1-D float32 mean of the channels of a frames x channels array."""
+    if samples.shape[1] == 1:
+        return samples[:, 0]
+    # Column adds vectorise far better than mean(axis=1) over short interleaved rows
+    mono = samples[:, 0].astype(np.float32)
+    for channel in range(1, samples.shape[1]):
+        mono += samples[:, channel]
+    mono *= np.float32(1.0 / samples.shape[1])
+    return mono
+
+
+class AudioBuffer:
+    """
+        Decoded audio shared by the plot, the editor and the player.
+        Samples are float32 frames x channels, produced by a single decode;
+        the mono mix used for drawing and editing is derived once and cached.
+        Files that would decode to more than LAZY_THRESHOLD_BYTES open as a
+        LazyAudioBuffer instead, which reads windows on demand.
+    """
+    LAZY_THRESHOLD_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, samples, sample_rate, file_path=None):
+        samples = np.asarray(samples, dtype=np.float32)
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        self.samples = samples
+        self.sample_rate = int(sample_rate)
+        self.file_path = file_path
+        self._mono = None
+
+    @classmethod
+    def from_file(cls, file_path, lazy_threshold_bytes=None):
+        """
+            Decode with soundfile; formats libsndfile cannot read go through pydub/ffmpeg instead.
+            lazy_threshold_bytes overrides LAZY_THRESHOLD_BYTES, e.g. for many files open at once.
+        """
+        if lazy_threshold_bytes is None:
+            lazy_threshold_bytes = cls.LAZY_THRESHOLD_BYTES
+        try:
+            info = sf.info(file_path)
+            if info.frames * info.channels * 4 > lazy_threshold_bytes:
+                return LazyAudioBuffer(file_path)
+            samples, sample_rate = sf.read(file_path, dtype='float32', always_2d=True)
+        except Exception as e:
+            logging.info(f"soundfile could not read {file_path} ({e}), decoding with pydub")
+            samples, sample_rate = cls.decode_with_pydub(file_path)
+        return cls(samples, sample_rate, file_path)
+
+    @staticmethod
+    def decode_with_pydub(file_path):
+        from pydub import AudioSegment
+
+        segment = AudioSegment.from_file(file_path)
+        full_scale = float(1 << (8 * segment.sample_width - 1))
+        samples = np.array(segment.get_array_of_samples(), dtype=np.float32) / full_scale
+        return samples.reshape(-1, segment.channels), segment.frame_rate
+
+    @property
+    def frames(self):
+        return len(self.samples)
+
+    @property
+    def channels(self):
+        return self.samples.shape[1]
+
+    @property
+    def duration_seconds(self):
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def nbytes(self):
+        size = self.samples.nbytes
+        if self._mono is not None and not np.may_share_memory(self._mono, self.samples):
+            size += self._mono.nbytes
+        return size
+
+    @property
+    def mono(self):
+        """1-D mono mix; for mono files this is a view of the samples, not a copy."""
+        if self._mono is None:
+            self._mono = mix_to_mono(self.samples)
+        return self._mono
+
+    def read(self, start, count):
+        """Frames [start, start + count) as a view; shorter at the end of the buffer."""
+        start = max(int(start), 0)
+        return self.samples[start:start + max(int(count), 0)]
+
+    def reversed(self):
+        """A buffer playing backwards; shares memory with this one."""
+        return AudioBuffer(self.samples[::-1], self.sample_rate, self.file_path)
+
+
+class LazyAudioBuffer:
+    """
+        A long recording read on demand instead of decoded up front, with the
+        same interface as AudioBuffer apart from samples. PCM_16, PCM_32 and
+        FLOAT WAV data is memory-mapped; other formats are read in blocks from
+        an open SoundFile. read() converts just the requested window to
+        float32, so memory use follows the window, not the file length.
+    """
+    MAPPABLE_SUBTYPES = {'PCM_16': np.int16, 'PCM_32': np.int32, 'FLOAT': np.float32}
+
+    def __init__(self, file_path):
+        info = sf.info(file_path)
+        self.file_path = file_path
+        self.sample_rate = int(info.samplerate)
+        self.channels = info.channels
+        self.frames = info.frames
+        self.lock = threading.Lock()
+        self.sound_file = None
+        self.mapped = self.map_wav_data(file_path, info)
+        if self.mapped is None:
+            self.sound_file = sf.SoundFile(file_path)
+        self._mono = None
+
+    @classmethod
+    def map_wav_data(cls, file_path, info):
+        """A frames x channels memmap over the WAV data chunk, or None if the data cannot be mapped."""
+        dtype = cls.MAPPABLE_SUBTYPES.get(info.subtype)
+        if info.format != 'WAV' or dtype is None:
+            return None
+        offset = cls.find_wav_data_offset(file_path)
+        if offset is None:
+            return None
+        scale = 1.0 if dtype == np.float32 else 1.0 / (1 << (8 * np.dtype(dtype).itemsize - 1))
+        mapped = np.memmap(file_path, dtype=np.dtype(dtype).newbyteorder('<'), mode='r',
+                           offset=offset, shape=(info.frames, info.channels))
+        return mapped, np.float32(scale)
+
+    @staticmethod
+    def find_wav_data_offset(file_path):
+        """Byte offset of the samples in a RIFF/WAVE file, or None if the layout is not plain RIFF."""
+        with open(file_path, 'rb') as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+                return None
+            while True:
+                chunk = f.read(8)
+                if len(chunk) < 8:
+                    return None
+                chunk_id, chunk_size = chunk[:4], struct.unpack('<I', chunk[4:])[0]
+                if chunk_id == b'data':
+                    return f.tell()
+                f.seek(chunk_size + (chunk_size & 1), 1)
+
+    @property
+    def duration_seconds(self):
+        return self.frames / self.sample_rate if self.sample_rate else 0.0
+
+    @property
+    def nbytes(self):
+        # Mapped pages belong to the OS page cache and can be dropped at any time
+        return 0
+
+    @property
+    def mono(self):
+        if self._mono is None:
+            self._mono = LazyMono(self)
+        return self._mono
+
+    def read(self, start, count):
+        """Frames [start, start + count) as a new float32 frames x channels array."""
+        start = min(max(int(start), 0), self.frames)
+        stop = min(start + max(int(count), 0), self.frames)
+        if self.mapped is not None:
+            mapped, scale = self.mapped
+            window = mapped[start:stop].astype(np.float32)
+            if scale != 1.0:
+                window *= scale
+            return window
+        # The player's audio thread and the GUI both read, and seek + read must stay together
+        with self.lock:
+            self.sound_file.seek(start)
+            return self.sound_file.read(stop - start, dtype='float32', always_2d=True)
+
+    def reversed(self):
+        return ReversedSource(self)
+
+    def close(self):
+        if self.sound_file is not None:
+            self.sound_file.close()
+
+
+class LazyMono:
+    """
+        The mono mix of a LazyAudioBuffer as a 1-D float32 sequence: len() and
+        slicing read only the window asked for, so PlotWidget can draw from it
+        directly. It is a playback source as well. np.asarray() reads the whole
+        file, which is what editing operations still do.
+    """
+    ndim = 1
+    dtype = np.dtype(np.float32)
+    channels = 1
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+
+    @property
+    def frames(self):
+        return self.buffer.frames
+
+    @property
+    def sample_rate(self):
+        return self.buffer.sample_rate
+
+    @property
+    def shape(self):
+        return (self.frames,)
+
+    def __len__(self):
+        return self.frames
+
+    def read(self, start, count):
+        return mix_to_mono(self.buffer.read(start, count))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.frames)
+            if step > 0:
+                return self.read(start, max(stop - start, 0))[::step]
+            first = stop + 1
+            return self.read(first, max(start + 1 - first, 0))[::-1][::-step]
+        index = operator.index(key)
+        if index < 0:
+            index += self.frames
+        if not 0 <= index < self.frames:
+            raise IndexError(key)
+        return self.read(index, 1)[0]
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.read(0, self.frames)
+        return data if dtype is None else data.astype(dtype)
+
+    def reversed(self):
+        return ReversedSource(self)
+
+
+class ReversedSource:
+    """Plays a source backwards by reading mirrored windows, so nothing is reversed up front."""
+    def __init__(self, source):
+        self.source = source
+        self.sample_rate = source.sample_rate
+        self.channels = source.channels
+        self.frames = source.frames
+
+    def read(self, start, count):
+        stop = self.frames - min(max(int(start), 0), self.frames)
+        first = max(stop - max(int(count), 0), 0)
+        return self.source.read(first, stop - first)[::-1]
+
+    def reversed(self):
+        return self.source
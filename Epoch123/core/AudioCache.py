@@ -0,0 +1,97 @@
+import os
+import logging
+from collections import OrderedDict
+import numpy as np
+from .AudioBuffer import AudioBuffer
+
+
+class AudioCache:
+    """
+        Decoded audio kept for quick re-selection, bounded by total size in bytes.
+        Entries are (data, sample_rate, AudioBuffer) tuples keyed by file path. The least
+        recently used entries are evicted once max_bytes would be exceeded; an
+        entry larger than the whole budget is not cached at all.
+    """
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, store_float32=True):
+        self.max_bytes = max_bytes
+        self.store_float32 = store_float32
+        self.entries = OrderedDict()  # path -> (data, sample_rate, audio, nbytes)
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def entry_size(data, audio):
+        """Bytes held by an entry; data that is the audio buffer's own mono mix is not counted twice."""
+        data_bytes = data.nbytes if isinstance(data, np.ndarray) else 0
+        if not isinstance(audio, AudioBuffer):
+            return data_bytes
+        if data is audio.mono or np.may_share_memory(data, audio.samples):
+            return audio.nbytes
+        return audio.nbytes + data_bytes
+
+    def __contains__(self, file_path):
+        return file_path in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, file_path):
+        """Return (data, sample_rate, audio) for file_path, or None on a miss."""
+        entry = self.entries.get(file_path)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(file_path)
+        return entry[:3]
+
+    def put(self, file_path, data, sample_rate, audio):
+        """Cache decoded audio, evicting least recently used entries to stay within budget."""
+        if self.store_float32 and isinstance(data, np.ndarray) and data.dtype == np.float64:
+            data = data.astype(np.float32)
+        size = self.entry_size(data, audio)
+        self.invalidate(file_path)
+        if size > self.max_bytes:
+            logging.info(f"Not caching {os.path.basename(file_path)}: {size} bytes exceeds the cache budget")
+            return data
+        while self.current_bytes + size > self.max_bytes and self.entries:
+            evicted_path, evicted = self.entries.popitem(last=False)
+            self.current_bytes -= evicted[3]
+            self.evictions += 1
+            logging.debug(f"Evicted {os.path.basename(evicted_path)} from the audio cache")
+        self.entries[file_path] = (data, sample_rate, audio, size)
+        self.current_bytes += size
+        return data
+
+    def invalidate(self, file_path):
+        """Drop one file, e.g. after it was deleted, renamed or saved."""
+        entry = self.entries.pop(file_path, None)
+        if entry is not None:
+            self.current_bytes -= entry[3]
+
+    def invalidate_prefix(self, directory):
+        """Drop every file under directory."""
+        prefix = os.path.join(directory, '')
+        for file_path in [path for path in self.entries if path.startswith(prefix)]:
+            self.invalidate(file_path)
+
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        """Hit/miss/byte counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,752 @@
+import os
+import shutil
+import logging
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import soundfile as sf
+from .AudioBuffer import ReversedSource
+from .WaveformCache import PeakPyramid
+from .Filters import BlockFilter, design_sos, edge_length
+from .Vocoder import FRAME, analyse, fit, hops_for, normalize, overlap_add, phase_advance, resample_to
+
+
+def read_padded(source, start, stop):
+    """source samples [start, stop) as float32, zeros where the range runs past either end."""
+    out = np.zeros(stop - start, dtype=np.float32)
+    first, last = max(start, 0), min(stop, source.frames)
+    if first < last:
+        out[first - start:last - start] = source.read(first, last - first)
+    return out
+
+
+def decimate(data, factor):
+    """Mean of every factor samples of data, an array or a source, read a chunk at a time."""
+    count = len(data) // factor
+    out = np.empty(count, dtype=np.float32)
+    step = EditNode.RENDER_CHUNK_FRAMES // factor
+    for first in range(0, count, step):
+        last = min(first + step, count)
+        if hasattr(data, 'read'):
+            window = np.asarray(data.read(first * factor, (last - first) * factor))
+        else:
+            window = np.asarray(data[first * factor:last * factor])
+        out[first:last] = window.reshape(-1, factor).mean(axis=1)
+    return out
+
+
+class TileCache:
+    """
+        Rendered tiles of every node, least recently used dropped first once
+        max_bytes is reached. Keys start with id(node) rather than the node, so
+        the cache does not keep graphs and their source data alive; each node
+        purges its own tiles when it is collected.
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.tiles = OrderedDict()
+        self.lock = threading.Lock()  # the playback callback renders too
+
+    def __contains__(self, key):
+        with self.lock:
+            return key in self.tiles
+
+    def get(self, key):
+        with self.lock:
+            tile = self.tiles.get(key)
+            if tile is not None:
+                self.tiles.move_to_end(key)
+            return tile
+
+    def put(self, key, tile):
+        with self.lock:
+            if key in self.tiles:
+                return
+            self.tiles[key] = tile
+            self.bytes += tile.nbytes
+            while self.bytes > self.max_bytes and len(self.tiles) > 1:
+                _, evicted = self.tiles.popitem(last=False)
+                self.bytes -= evicted.nbytes
+
+    def purge(self, owner):
+        """Drop every tile whose key starts with owner."""
+        with self.lock:
+            for key in [key for key in self.tiles if key[0] == owner]:
+                self.bytes -= self.tiles.pop(key).nbytes
+
+    def clear(self):
+        with self.lock:
+            self.tiles.clear()
+            self.bytes = 0
+
+
+tile_cache = TileCache(128 * 1024 * 1024)
+# Renders the tile after the one being read, so sequential playback finds it cached
+prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix='edit-graph-prefetch')
+prefetching = set()
+prefetching_lock = threading.Lock()
+# Renders the chunks of long phase vocoder passes in parallel
+VOCODER_THREAD_PREFIX = 'edit-graph-vocoder'
+vocoder_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix=VOCODER_THREAD_PREFIX)
+
+
+def set_vocoder_threads(count):
+    """
+        Replace vocoder_pool with one of count threads, e.g. in each of several
+        worker processes so together they use about one thread per CPU.
+    """
+    global vocoder_pool
+    previous = vocoder_pool
+    vocoder_pool = ThreadPoolExecutor(max_workers=max(int(count), 1), thread_name_prefix=VOCODER_THREAD_PREFIX)
+    previous.shutdown(wait=False)
+
+
+def map_chunks(function, *iterables):
+    """
+        function over the chunks on vocoder_pool. Chunks of a vocoder node
+        reading another one, and chunks after the pool has shut down at exit,
+        run on this thread, since waiting for the pool from inside it could
+        wait for ever.
+    """
+    if threading.current_thread().name.startswith(VOCODER_THREAD_PREFIX):
+        return list(map(function, *iterables))
+    try:
+        return list(vocoder_pool.map(function, *iterables))
+    except RuntimeError:
+        return list(map(function, *iterables))
+
+
+class EditNode:
+    """
+        One step of a non-destructive edit graph. A node describes an edit of
+        its input instead of holding the result; it renders TILE_FRAMES at a
+        time, only for the windows that are read, and keeps recent tiles in
+        the shared tile_cache. Nodes look like the 1-D mono data the editor
+        works on (len, slicing, np.asarray renders everything) and are
+        playback sources, so the plot draws and the player streams straight
+        from the graph. Saving is the one full render.
+    """
+    ndim = 1
+    dtype = np.dtype(np.float32)
+    channels = 1
+    TILE_FRAMES = 1 << 15
+    # Whether the overview needs a render pass, rather than being derived from the input's
+    RENDERS_OVERVIEW = True
+    PREVIEW_FACTORS = (8, 4, 2)
+    PREVIEW_MAX_FRAMES = 1 << 23
+    # Full passes render in larger chunks that bypass the tile cache
+    RENDER_CHUNK_FRAMES = 1 << 20
+
+    def __init__(self, input):
+        self.input = input
+        self._peaks = None
+        weakref.finalize(self, tile_cache.purge, id(self))
+
+    @property
+    def sample_rate(self):
+        return self.input.sample_rate
+
+    @property
+    def frames(self):
+        return self.input.frames
+
+    @property
+    def shape(self):
+        return (self.frames,)
+
+    def __len__(self):
+        return self.frames
+
+    def render_range(self, start, stop):
+        """Samples [start, stop) of this node's output as float32."""
+        raise NotImplementedError
+
+    def tile(self, index):
+        tile = tile_cache.get((id(self), index))
+        if tile is None:
+            start = index * self.TILE_FRAMES
+            tile = self.render_range(start, min(start + self.TILE_FRAMES, self.frames))
+            tile_cache.put((id(self), index), tile)
+        return tile
+
+    def read(self, start, count):
+        start = max(int(start), 0)
+        stop = min(start + max(int(count), 0), self.frames)
+        if start >= stop:
+            return np.zeros(0, dtype=np.float32)
+        self.prefetch((stop - 1) // self.TILE_FRAMES + 1)
+        return self.gather(self.tile, start, stop)
+
+    def gather(self, tile, start, stop):
+        """Samples [start, stop) assembled from tile(index), for start < stop within the output."""
+        first, last = start // self.TILE_FRAMES, (stop - 1) // self.TILE_FRAMES
+        if first == last:
+            offset = first * self.TILE_FRAMES
+            return tile(first)[start - offset:stop - offset]
+        parts = []
+        for index in range(first, last + 1):
+            offset = index * self.TILE_FRAMES
+            parts.append(tile(index)[max(start - offset, 0):stop - offset])
+        return np.concatenate(parts)
+
+    def prefetch(self, index):
+        key = (id(self), index)
+        if index * self.TILE_FRAMES >= self.frames or key in tile_cache:
+            return
+        with prefetching_lock:
+            if key in prefetching:
+                return
+            prefetching.add(key)
+        prefetcher.submit(self.prefetch_tile, index)
+
+    def prefetch_tile(self, index):
+        try:
+            self.tile(index)
+        except Exception as e:
+            logging.error(f"Failed to prefetch edit graph tile {index}: {e}")
+        finally:
+            with prefetching_lock:
+                prefetching.discard((id(self), index))
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.frames)
+            if step > 0:
+                return self.read(start, max(stop - start, 0))[::step]
+            first = stop + 1
+            return self.read(first, max(start + 1 - first, 0))[::-1][::-step]
+        index = int(key)
+        if index < 0:
+            index += self.frames
+        if not 0 <= index < self.frames:
+            raise IndexError(key)
+        return self.read(index, 1)[0]
+
+    def render(self):
+        """The whole output, without filling the tile cache with it."""
+        step = self.RENDER_CHUNK_FRAMES
+        parts = [self.render_range(start, min(start + step, self.frames)) for start in range(0, self.frames, step)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.float32)
+
+    def __array__(self, dtype=None, copy=None):
+        data = self.render()
+        return data if dtype is None else data.astype(dtype)
+
+    def reversed(self):
+        return ReversedSource(self)
+
+    def peaks(self, peaks_for=PeakPyramid.build, on_chunk=None):
+        """
+            The PeakPyramid of this node's output. peaks_for gives the pyramid of
+            the raw data at the root, e.g. from the waveform cache; on_chunk is
+            passed on to PeakPyramid.from_source for any render pass.
+        """
+        if self._peaks is None:
+            self._peaks = self.derive_peaks(peaks_for, on_chunk)
+        return self._peaks
+
+    def overview_pending(self):
+        """True when peaks() would have to render samples, so it belongs on a worker thread."""
+        if self._peaks is not None:
+            return False
+        return self.RENDERS_OVERVIEW or (self.input is not None and self.input.overview_pending())
+
+    def input_peaks(self, peaks_for, on_chunk=None):
+        return self.input.peaks(peaks_for, on_chunk)
+
+    def derive_peaks(self, peaks_for, on_chunk=None):
+        """By default render the output once, streamed; structural edits derive it from the input's."""
+        return PeakPyramid.from_source(RenderedOutput(self), on_chunk)
+
+    def with_input(self, input):
+        """The same edit applied to another input."""
+        raise NotImplementedError
+
+    def root(self):
+        return self.input.root()
+
+    def on_root(self, root):
+        """This graph rebuilt on another root node, e.g. one channel of the file it was built on."""
+        return self.with_input(self.input.on_root(root))
+
+    def decimated(self, factor):
+        """This graph rebuilt on a copy of the root decimated by factor, or None if an edit cannot be."""
+        raise NotImplementedError
+
+    def preview_peaks(self):
+        """
+            A rough overview computed on a decimated copy of the graph, quick
+            enough to show while peaks() renders the real one; None if no
+            decimation suits every edit in the graph or the copy would be too long.
+        """
+        for factor in self.PREVIEW_FACTORS:
+            if self.frames // factor > self.PREVIEW_MAX_FRAMES:
+                continue
+            graph = self.decimated(factor)
+            if graph is not None:
+                peaks = graph.peaks()
+                levels = [(block_size * factor, mins, maxs) for block_size, mins, maxs in peaks.levels]
+                return PeakPyramid(self.frames, levels)
+        return None
+
+
+class RenderedOutput:
+    """A node as a source that renders every read afresh, for single passes over the whole output."""
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def frames(self):
+        return self.node.frames
+
+    def read(self, start, count):
+        stop = min(start + count, self.frames)
+        return self.node.render_range(start, stop)
+
+
+class SourceNode(EditNode):
+    """The root of a graph: unedited data, an array or a lazily read file."""
+    RENDERS_OVERVIEW = False
+
+    def __init__(self, data, sample_rate):
+        super().__init__(None)
+        self.data = data
+        self.rate = sample_rate
+
+    @property
+    def sample_rate(self):
+        return self.rate
+
+    @property
+    def frames(self):
+        return len(self.data)
+
+    def read(self, start, count):
+        start = max(int(start), 0)
+        stop = min(start + max(int(count), 0), self.frames)
+        if hasattr(self.data, 'read'):
+            return self.data.read(start, stop - start)
+        return np.asarray(self.data[start:stop], dtype=np.float32)
+
+    def render_range(self, start, stop):
+        return self.read(start, stop - start)
+
+    def derive_peaks(self, peaks_for, on_chunk=None):
+        return peaks_for(self.data)
+
+    def root(self):
+        return self
+
+    def on_root(self, root):
+        return root
+
+    def decimated(self, factor):
+        return SourceNode(decimate(self.data, factor), self.rate / factor)
+
+
+class ChannelSource:
+    """One channel of a multi-channel buffer as a 1-D source, to root a graph on it."""
+    def __init__(self, buffer, channel):
+        self.buffer = buffer
+        self.channel = channel
+
+    @property
+    def frames(self):
+        return self.buffer.frames
+
+    @property
+    def sample_rate(self):
+        return self.buffer.sample_rate
+
+    def __len__(self):
+        return self.frames
+
+    def read(self, start, count):
+        return self.buffer.read(start, count)[:, self.channel]
+
+
+def as_node(data, sample_rate):
+    """data itself if it already is an edit graph, otherwise a SourceNode to build one on."""
+    return data if isinstance(data, EditNode) else SourceNode(data, sample_rate)
+
+
+class FilterNode(EditNode):
+    """
+        Zero-phase Butterworth filter giving what sosfiltfilt gives for the
+        whole signal, rendered a tile at a time; cutoff is in Hz, a pair for
+        band filters. The forward pass is a BlockFilter whose state carries
+        over from the previous tile, so sequential reads such as playback and
+        saving filter every sample once; a tile whose predecessor has not been
+        rendered warms up over a margin instead. The backward pass of a tile
+        starts a margin past its end, or at the end of the signal. The margin
+        is at least MARGIN samples and six periods of the lowest cutoff, after
+        which the impulse response has decayed below 1e-7. The forward state
+        at the end of each tile lives in the tile cache next to the tile.
+    """
+    MARGIN = 4096
+    MARGIN_PERIODS = 6
+
+    def __init__(self, input, btype, cutoff, order=4):
+        super().__init__(input)
+        self.btype = btype
+        self.cutoff = cutoff
+        self.order = order
+        self.sos = design_sos(btype, cutoff, self.sample_rate, order)
+        self.edge = edge_length(self.sos)
+        self.margin = max(self.MARGIN, int(np.ceil(self.MARGIN_PERIODS * self.sample_rate / np.min(cutoff))))
+
+    def with_input(self, input):
+        return FilterNode(input, self.btype, self.cutoff, self.order)
+
+    def decimated(self, factor):
+        # The cutoffs have to stay clear of the decimated Nyquist frequency
+        if np.max(self.cutoff) >= 0.45 * self.sample_rate / factor:
+            return None
+        input = self.input.decimated(factor)
+        return None if input is None else self.with_input(input)
+
+    def forward_tile(self, index):
+        """The forward pass over input tile index, cached alongside the output tiles."""
+        tile = tile_cache.get((id(self), 'forward', index))
+        if tile is None:
+            tile, _ = self.render_forward(index)
+        return tile
+
+    def render_forward(self, index):
+        """Run the forward pass over input tile index; returns (tile, filter state at its end)."""
+        start = index * self.TILE_FRAMES
+        stop = min(start + self.TILE_FRAMES, self.frames)
+        forward = BlockFilter(self.sos, tile_cache.get((id(self), 'state', index - 1)))
+        if index == 0:
+            # sosfiltfilt runs the forward pass in from an odd extension before the signal
+            head = self.input.read(0, self.edge + 1)
+            extension = 2 * head[0] - head[self.edge:0:-1]
+            forward.prime(extension[0])
+            forward.process(extension)
+        elif forward.zi is None:
+            warm_up = self.input.read(max(start - self.margin, 0), min(self.margin, start))
+            forward.prime(warm_up[0])
+            forward.process(warm_up)
+        tile = forward.process(self.input.read(start, stop - start)).astype(np.float32)
+        tile_cache.put((id(self), 'forward', index), tile)
+        tile_cache.put((id(self), 'state', index), forward.zi)
+        return tile, forward.zi
+
+    def forward_tail(self):
+        """The forward pass over the odd extension sosfiltfilt adds after the signal."""
+        last = (self.frames - 1) // self.TILE_FRAMES
+        state = tile_cache.get((id(self), 'state', last))
+        if state is None:
+            _, state = self.render_forward(last)
+        tail = self.input.read(self.frames - self.edge - 1, self.edge + 1)
+        extension = 2 * tail[-1] - tail[-2::-1]
+        return BlockFilter(self.sos, state).process(extension)
+
+    def render_range(self, start, stop):
+        if self.frames <= self.edge:
+            # Too short for the odd extension; filter it whole
+            window = self.input.read(0, self.frames)
+            if len(window) < 2:
+                return np.asarray(window[start:stop], dtype=np.float32)
+            import scipy.signal as sig
+
+            return sig.sosfiltfilt(self.sos, window, padlen=len(window) - 1)[start:stop].astype(np.float32)
+        last = min(stop + self.margin, self.frames)
+        forward = self.gather(self.forward_tile, start, last)
+        if last == self.frames:
+            forward = np.concatenate((forward, self.forward_tail()))
+        backward = BlockFilter(self.sos)
+        backward.prime(forward[-1])
+        return backward.process(forward[::-1])[::-1][:stop - start].astype(np.float32)
+
+
+class VocoderNode(EditNode):
+    """
+        Base for phase vocoder edits. Vocoder frame m is centred on input
+        sample m * analysis_hop and its grain on sample m * synthesis_hop of
+        the stretched signal. A frame's synthesis phases are a running sum of
+        advances that each depend on two neighbouring frames only, so with the
+        sum over the frames before it, a chunk of CHUNK_FRAMES frames renders
+        on its own exactly as it would in one pass over the whole signal. The
+        starting phases of the chunks are computed once, the chunks' sums in
+        parallel, and long renders synthesize their chunks in parallel too,
+        on vocoder_pool.
+    """
+    CHUNK_FRAMES = 128
+
+    def __init__(self, input, ratio):
+        import scipy.signal as sig
+
+        super().__init__(input)
+        self.hops = hops_for(ratio)
+        analysis_hop, synthesis_hop = self.hops
+        self.window = sig.windows.hann(FRAME, sym=False).astype(np.float32)
+        self.omega = 2 * np.pi * np.arange(FRAME // 2 + 1) * analysis_hop / FRAME
+        # Frames either side of a chunk whose grains reach into it, with room for the resampling filter
+        self.margin = FRAME // synthesis_hop + 2
+        self.start_phases = []  # synthesis phases of the frame before each chunk
+        self.start_phases_lock = threading.Lock()
+        # A tile per chunk, so reads through the tile cache render every chunk once
+        self.TILE_FRAMES = self.CHUNK_FRAMES * self.output_hop
+
+    @property
+    def output_hop(self):
+        """Output samples per vocoder frame."""
+        raise NotImplementedError
+
+    def finish(self, index, stretched, origin):
+        """Output of chunk index from the stretched signal around it, which starts at stretched sample origin."""
+        raise NotImplementedError
+
+    def analyse(self, first, last):
+        """Magnitudes, phases and phase advances of frames [first, last)."""
+        analysis_hop, synthesis_hop = self.hops
+        samples = read_padded(self.input, (first - 1) * analysis_hop - FRAME // 2, (last - 1) * analysis_hop + FRAME // 2)
+        frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME)[::analysis_hop]
+        magnitude, phase = analyse(frames, self.window)
+        advance = phase_advance(phase[1:], phase[:-1], self.omega, synthesis_hop / analysis_hop)
+        return magnitude[1:], phase[1:], advance
+
+    def phase_sum(self, index):
+        """Total phase advance over the frames of chunk index."""
+        _, _, advance = self.analyse(index * self.CHUNK_FRAMES, (index + 1) * self.CHUNK_FRAMES)
+        return np.mod(advance.sum(axis=0), 2 * np.pi)
+
+    def start_phase(self, index):
+        # The lock only guards the list: rendering while holding it could wait on a thread waiting for it
+        with self.start_phases_lock:
+            if index < len(self.start_phases):
+                return self.start_phases[index]
+            known = len(self.start_phases)
+        if known == 0:
+            # Frame 0 keeps its analysed phases
+            _, phase, advance = self.analyse(0, 1)
+            first = [phase[0] - advance[0]]
+        sums = map_chunks(self.phase_sum, range(max(known - 1, 0), index))
+        with self.start_phases_lock:
+            if not self.start_phases:
+                self.start_phases.extend(first)
+            # Another thread may have got further meanwhile
+            for chunk, total in zip(range(max(known - 1, 0), index), sums):
+                if chunk + 1 == len(self.start_phases):
+                    self.start_phases.append(np.mod(self.start_phases[chunk] + total, 2 * np.pi))
+            return self.start_phases[index]
+
+    def render_chunk(self, index, start_phase):
+        """Output [index, index + 1) * CHUNK_FRAMES * output_hop as float32."""
+        synthesis_hop = self.hops[1]
+        first = index * self.CHUNK_FRAMES - self.margin
+        magnitude, _, advance = self.analyse(first, (index + 1) * self.CHUNK_FRAMES + self.margin)
+        running = np.cumsum(advance, axis=0)
+        running -= running[self.margin - 1]  # relative to the frame before the chunk
+        out, weights = overlap_add(magnitude, start_phase + running, self.window, synthesis_hop)
+        return self.finish(index, normalize(out, weights), first * synthesis_hop - FRAME // 2)
+
+    def render_range(self, start, stop):
+        size = self.CHUNK_FRAMES * self.output_hop
+        indices = range(start // size, (stop - 1) // size + 1)
+        start_phases = [self.start_phase(index) for index in indices]
+        if len(indices) > 1:
+            chunks = map_chunks(self.render_chunk, indices, start_phases)
+        else:
+            chunks = [self.render_chunk(indices[0], start_phases[0])]
+        origin = indices[0] * size
+        return np.concatenate(chunks)[start - origin:stop - origin]
+
+
+class PitchNode(VocoderNode):
+    """
+        Pitch shift by factor at the same length: a phase vocoder stretch by
+        factor, resampled back with resample_poly and aligned with the input.
+    """
+    def __init__(self, input, factor):
+        super().__init__(input, factor)
+        self.factor = factor
+
+    @property
+    def output_hop(self):
+        return self.hops[0]
+
+    def with_input(self, input):
+        return PitchNode(input, self.factor)
+
+    def decimated(self, factor):
+        input = self.input.decimated(factor)
+        return None if input is None else self.with_input(input)
+
+    def finish(self, index, stretched, origin):
+        analysis_hop, synthesis_hop = self.hops
+        # Resample from a multiple of the synthesis hop, so output samples land on whole input samples
+        skip = -origin % synthesis_hop
+        shifted = resample_to(stretched[skip:], analysis_hop, synthesis_hop)
+        offset = index * self.CHUNK_FRAMES * analysis_hop - (origin + skip) // synthesis_hop * analysis_hop
+        return fit(shifted[offset:], self.CHUNK_FRAMES * analysis_hop).astype(np.float32)
+
+
+class StretchNode(VocoderNode):
+    """Time stretch to ratio times the length at the same pitch."""
+    def __init__(self, input, ratio):
+        super().__init__(input, ratio)
+        self.ratio = ratio
+
+    @property
+    def frames(self):
+        analysis_hop, synthesis_hop = self.hops
+        return self.input.frames * synthesis_hop // analysis_hop
+
+    @property
+    def output_hop(self):
+        return self.hops[1]
+
+    def with_input(self, input):
+        return StretchNode(input, self.ratio)
+
+    def decimated(self, factor):
+        input = self.input.decimated(factor)
+        return None if input is None else self.with_input(input)
+
+    def finish(self, index, stretched, origin):
+        offset = index * self.CHUNK_FRAMES * self.output_hop - origin
+        return stretched[offset:offset + self.CHUNK_FRAMES * self.output_hop].astype(np.float32)
+
+
+class TrimNode(EditNode):
+    """Zero every sample quieter than threshold (an absolute amplitude)."""
+    RENDERS_OVERVIEW = False
+
+    def __init__(self, input, threshold):
+        super().__init__(input)
+        self.threshold = threshold
+
+    def with_input(self, input):
+        return TrimNode(input, self.threshold)
+
+    def decimated(self, factor):
+        input = self.input.decimated(factor)
+        return None if input is None else self.with_input(input)
+
+    def render_range(self, start, stop):
+        window = self.input.read(start, stop - start)
+        return np.where(np.abs(window) < self.threshold, 0, window).astype(np.float32)
+
+    def derive_peaks(self, peaks_for, on_chunk=None):
+        # Exact from the input's blocks: a block keeps its extreme only if that survives the trim
+        block_size, mins, maxs = self.input_peaks(peaks_for, on_chunk).levels[0]
+        t = self.threshold
+        new_maxs = np.where(maxs >= t, maxs, np.where(maxs > -t, 0, maxs))
+        new_mins = np.where(mins <= -t, mins, np.where(mins < t, 0, mins))
+        return PeakPyramid.from_base_level(self.frames, block_size, new_mins.astype(np.float32), new_maxs.astype(np.float32))
+
+
+class CropNode(EditNode):
+    """Keep only input samples [start, stop)."""
+    RENDERS_OVERVIEW = False
+
+    def __init__(self, input, start, stop):
+        super().__init__(input)
+        self.start = max(int(start), 0)
+        self.stop = min(int(stop), input.frames)
+
+    def with_input(self, input):
+        return CropNode(input, self.start, self.stop)
+
+    def decimated(self, factor):
+        input = self.input.decimated(factor)
+        return None if input is None else CropNode(input, self.start // factor, self.stop // factor)
+
+    @property
+    def frames(self):
+        return self.stop - self.start
+
+    def read(self, start, count):
+        start = max(int(start), 0)
+        count = min(max(int(count), 0), self.frames - start)
+        if count <= 0:
+            return np.zeros(0, dtype=np.float32)
+        return self.input.read(self.start + start, count)
+
+    def render_range(self, start, stop):
+        return self.read(start, stop - start)
+
+    def derive_peaks(self, peaks_for, on_chunk=None):
+        # Whole input blocks, so the overview may be off by less than a block
+        block_size, mins, maxs = self.input_peaks(peaks_for, on_chunk).levels[0]
+        first, last = self.start // block_size, -(-self.stop // block_size)
+        return PeakPyramid.from_base_level(self.frames, block_size, mins[first:last], maxs[first:last])
+
+
+class CropOutNode(EditNode):
+    """Remove input samples [start, stop)."""
+    RENDERS_OVERVIEW = False
+
+    def __init__(self, input, start, stop):
+        super().__init__(input)
+        self.start = max(int(start), 0)
+        self.stop = min(int(stop), input.frames)
+
+    def with_input(self, input):
+        return CropOutNode(input, self.start, self.stop)
+
+    def decimated(self, factor):
+        input = self.input.decimated(factor)
+        return None if input is None else CropOutNode(input, self.start // factor, self.stop // factor)
+
+    @property
+    def frames(self):
+        return self.input.frames - (self.stop - self.start)
+
+    def read(self, start, count):
+        start = max(int(start), 0)
+        stop = min(start + max(int(count), 0), self.frames)
+        if start >= stop:
+            return np.zeros(0, dtype=np.float32)
+        removed = self.stop - self.start
+        if stop <= self.start:
+            return self.input.read(start, stop - start)
+        if start >= self.start:
+            return self.input.read(start + removed, stop - start)
+        return np.concatenate((self.input.read(start, self.start - start),
+                               self.input.read(self.stop, stop - self.start)))
+
+    def render_range(self, start, stop):
+        return self.read(start, stop - start)
+
+    def derive_peaks(self, peaks_for, on_chunk=None):
+        block_size, mins, maxs = self.input_peaks(peaks_for, on_chunk).levels[0]
+        head, tail = -(-self.start // block_size), self.stop // block_size
+        return PeakPyramid.from_base_level(self.frames, block_size,
+                                           np.concatenate((mins[:head], mins[tail:])),
+                                           np.concatenate((maxs[:head], maxs[tail:])))
+
+
+def write_render(graphs, sample_rate, file_path, on_chunk=None, subtype=None):
+    """
+        The one full render of the edit graphs, one per channel, written
+        RENDER_CHUNK_FRAMES at a time to a temporary file that replaces
+        file_path only once complete, so a cancelled or failed write leaves
+        the file as it was. on_chunk(fraction done) is called after every
+        chunk and may raise to abandon the write. subtype is soundfile's,
+        e.g. 'PCM_24'; None takes the format's default.
+    """
+    frames = graphs[0].frames
+    fd, temp_path = tempfile.mkstemp(suffix=os.path.splitext(file_path)[1], dir=os.path.dirname(file_path) or '.')
+    os.close(fd)
+    try:
+        with sf.SoundFile(temp_path, 'w', samplerate=int(sample_rate), channels=len(graphs), subtype=subtype) as f:
+            step = EditNode.RENDER_CHUNK_FRAMES
+            for start in range(0, frames, step):
+                stop = min(start + step, frames)
+                f.write(np.column_stack([graph.render_range(start, stop) for graph in graphs]))
+                if on_chunk is not None:
+                    on_chunk(stop / frames)
+        if os.path.exists(file_path):
+            shutil.copymode(file_path, temp_path)
+        os.replace(temp_path, file_path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    return file_path
@@ -0,0 +1,329 @@
+import os
+import logging
+import tempfile
+import numpy as np
+from .EditGraph import EditNode
+
+CHUNK_FRAMES = 1 << 20
+
+
+def window(data, start, stop):
+    """data[start:stop] for arrays and for lazily read sources alike."""
+    if hasattr(data, 'read'):
+        return data.read(start, stop - start)
+    return data[start:stop]
+
+
+def capture(data, start, stop):
+    """
+        What an undo step keeps of data[start:stop]: a reference for lazily read
+        sources, whose file does not change, otherwise a compact copy that does
+        not keep the whole array alive. float64 is stored as float32.
+    """
+    if hasattr(data, 'read'):
+        return (data, start, stop)
+    values = np.asarray(data[start:stop])
+    return values.astype(np.float32) if values.dtype == np.float64 else values.copy()
+
+
+def common_prefix(before, after):
+    """Number of leading samples before and after share, compared a chunk at a time."""
+    limit = min(len(before), len(after))
+    for start in range(0, limit, CHUNK_FRAMES):
+        stop = min(start + CHUNK_FRAMES, limit)
+        mismatches = np.flatnonzero(np.asarray(window(before, start, stop)) != np.asarray(window(after, start, stop)))
+        if mismatches.size:
+            return start + int(mismatches[0])
+    return limit
+
+
+def common_suffix(before, after, limit):
+    """Number of trailing samples before and after share, at most limit."""
+    n_before, n_after = len(before), len(after)
+    for offset in range(0, limit, CHUNK_FRAMES):
+        count = min(CHUNK_FRAMES, limit - offset)
+        tail_before = np.asarray(window(before, n_before - offset - count, n_before - offset))
+        tail_after = np.asarray(window(after, n_after - offset - count, n_after - offset))
+        mismatches = np.flatnonzero(tail_before != tail_after)
+        if mismatches.size:
+            return offset + count - 1 - int(mismatches[-1])
+    return limit
+
+
+def slice_offset(before, after):
+    """Where after starts in before when it is a contiguous view into it, else None."""
+    if not (isinstance(before, np.ndarray) and isinstance(after, np.ndarray)):
+        return None
+    if before.ndim != 1 or after.ndim != 1 or before.dtype != after.dtype or len(after) == 0:
+        return None
+    if before.strides != after.strides or not np.shares_memory(before, after):
+        return None
+    offset, remainder = divmod(after.ctypes.data - before.ctypes.data, before.strides[0])
+    if remainder or offset < 0 or offset + len(after) > len(before):
+        return None
+    return offset
+
+
+class EditDelta:
+    """
+        One undo or redo step. RANGE replaces data[start:stop] with values,
+        SPARSE writes values at indices, SWAP replaces the data with values
+        as a whole (an edit graph, or the array it was built on), VIEW only
+        restores the axis limits.
+        Applying a delta returns the edited data and the delta that reverts it.
+    """
+    RANGE, SPARSE, SWAP, VIEW = 'range', 'sparse', 'swap', 'view'
+
+    def __init__(self, kind, view, label='', start=0, stop=0, values=None, indices=None):
+        self.kind = kind
+        self.view = view
+        self.label = label
+        self.start = start
+        self.stop = stop
+        self.values = values  # ndarray, or (source, start, stop) into a lazily read file
+        self.indices = indices
+        self.spill_path = None
+
+    @property
+    def nbytes(self):
+        """Bytes held in memory; spilled deltas and file references cost nothing."""
+        size = self.values.nbytes if isinstance(self.values, np.ndarray) else 0
+        if self.indices is not None:
+            size += self.indices.nbytes
+        return size
+
+    @classmethod
+    def between(cls, before, after, view, label=''):
+        """
+            The deltas that, applied in order, turn after back into before;
+            empty when they are equal.
+        """
+        if isinstance(after, EditNode):
+            # The graph keeps its input, so remembering the previous data costs nothing
+            return [cls(cls.SWAP, view, label, values=before)]
+        offset = slice_offset(before, after)
+        if offset is not None:
+            # Cropped to a view of before: put back the tail, then the head
+            stop = offset + len(after)
+            deltas = [cls(cls.RANGE, view, label, len(after), len(after), capture(before, stop, len(before))),
+                      cls(cls.RANGE, view, label, 0, 0, capture(before, 0, offset))]
+            return [delta for delta in deltas if delta.size]
+
+        prefix = common_prefix(before, after)
+        if prefix == len(before) == len(after):
+            return []
+        suffix = common_suffix(before, after, min(len(before), len(after)) - prefix)
+        stop_before, stop_after = len(before) - suffix, len(after) - suffix
+
+        if len(before) == len(after) and not hasattr(before, 'read'):
+            # Edits such as trimming may change only scattered samples; then keep just those
+            old, new = np.asarray(before[prefix:stop_before]), np.asarray(after[prefix:stop_after])
+            index_type = np.int64 if len(after) > np.iinfo(np.int32).max else np.int32
+            differs = old != new
+            if np.count_nonzero(differs) * (np.dtype(index_type).itemsize + 4) < old.size * 4 // 2:
+                changed = np.flatnonzero(differs)
+                values = capture(old[changed], 0, changed.size)
+                return [cls(cls.SPARSE, view, label, values=values, indices=(changed + prefix).astype(index_type))]
+        return [cls(cls.RANGE, view, label, prefix, stop_after, capture(before, prefix, stop_before))]
+
+    @property
+    def size(self):
+        """Number of samples the delta writes."""
+        if isinstance(self.values, tuple):
+            return self.values[2] - self.values[1]
+        return 0 if self.values is None else len(self.values)
+
+    def spill(self, directory):
+        """Move the values to an .npz file in directory."""
+        fd, path = tempfile.mkstemp(suffix='.npz', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            arrays = {'values': self.values}
+            if self.indices is not None:
+                arrays['indices'] = self.indices
+            np.savez(f, **arrays)
+        self.spill_path = path
+        self.values = None
+        self.indices = None
+
+    def load(self):
+        """Bring spilled values back into memory."""
+        if self.spill_path is None:
+            return
+        with np.load(self.spill_path) as arrays:
+            self.values = arrays['values']
+            self.indices = arrays['indices'] if 'indices' in arrays else None
+        self.discard()
+
+    def discard(self):
+        if self.spill_path is not None:
+            try:
+                os.unlink(self.spill_path)
+            except OSError as e:
+                logging.error(f"Failed to remove spilled undo step {self.spill_path}: {e}")
+            self.spill_path = None
+
+    def materialize(self):
+        if isinstance(self.values, tuple):
+            source, start, stop = self.values
+            return np.asarray(source.read(start, stop - start))
+        return self.values
+
+    def apply(self, data, current_view):
+        """Return (edited data, delta reverting the edit)."""
+        self.load()
+        if self.kind == self.VIEW:
+            return data, EditDelta(self.VIEW, current_view, self.label)
+        if self.kind == self.SWAP:
+            return self.values, EditDelta(self.SWAP, current_view, self.label, values=data)
+        values = self.materialize()
+        if self.kind == self.SPARSE:
+            edited = np.array(data, copy=True)
+            inverse = EditDelta(self.SPARSE, current_view, self.label, values=edited[self.indices].copy(), indices=self.indices)
+            edited[self.indices] = values
+            return edited, inverse
+        inverse = EditDelta(self.RANGE, current_view, self.label, self.start, self.start + len(values),
+                            capture(data, self.start, self.stop))
+        edited = np.concatenate((np.asarray(window(data, 0, self.start)), values,
+                                 np.asarray(window(data, self.stop, len(data)))))
+        return edited, inverse
+
+
+class EditHistory:
+    """
+        Undo/redo for the editor's audio data that keeps only what each edit
+        changed: the replaced range, the individual samples for scattered
+        edits, the cut-off ends for a crop, or a reference into the original
+        file when it is read lazily. Edits made as edit graph nodes only keep
+        the previous node. Each step is a list of EditDeltas applied
+        in order. At most max_depth steps are kept; once the deltas in memory
+        exceed max_bytes the oldest are spilled to a temporary directory and
+        read back when undone.
+    """
+    DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+    DEFAULT_MAX_DEPTH = 100
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, max_depth=DEFAULT_MAX_DEPTH, spill_dir=None):
+        self.max_bytes = max_bytes
+        self.max_depth = max_depth
+        self.spill_dir = spill_dir
+        self._spill_tempdir = None
+        self.undo_steps = []
+        self.redo_steps = []
+
+    @property
+    def can_undo(self):
+        return bool(self.undo_steps)
+
+    @property
+    def can_redo(self):
+        return bool(self.redo_steps)
+
+    @property
+    def memory_bytes(self):
+        return sum(delta.nbytes for step in self.undo_steps + self.redo_steps for delta in step)
+
+    def record(self, before, after, view, label=''):
+        """Remember how to get from after back to before; returns False when nothing changed."""
+        step = EditDelta.between(before, after, view, label)
+        if not step:
+            return False
+        self.push_undo(step)
+        return True
+
+    def record_view(self, view, label=''):
+        """Remember axis limits, e.g. before zooming, with no change to the data."""
+        self.push_undo([EditDelta(EditDelta.VIEW, view, label)])
+
+    def push_undo(self, step):
+        self.clear_steps(self.redo_steps)
+        self.undo_steps.append(step)
+        self.enforce_limits()
+
+    def undo(self, data, current_view):
+        """Return (data, view) before the last edit, or None if there is nothing to undo."""
+        return self.apply_step(self.undo_steps, self.redo_steps, data, current_view)
+
+    def redo(self, data, current_view):
+        """Return (data, view) after the last undone edit, or None if there is nothing to redo."""
+        return self.apply_step(self.redo_steps, self.undo_steps, data, current_view)
+
+    def apply_step(self, source, target, data, current_view):
+        if not source:
+            return None
+        step = source.pop()
+        inverse = []
+        for delta in step:
+            data, reverting = delta.apply(data, current_view)
+            inverse.insert(0, reverting)
+        target.append(inverse)
+        self.enforce_limits()
+        return data, step[0].view
+
+    def enforce_limits(self):
+        while len(self.undo_steps) > self.max_depth:
+            self.discard_step(self.undo_steps.pop(0))
+        while self.memory_bytes > self.max_bytes:
+            furthest = self.furthest_in_memory()
+            if furthest is None:
+                return
+            steps, position, delta = furthest
+            try:
+                delta.spill(self.spill_directory())
+            except OSError as e:
+                logging.error(f"Failed to spill undo step to disk, dropping it and the steps beyond it: {e}")
+                self.drop_through(steps, position)
+
+    def furthest_in_memory(self):
+        """
+            (stack, position, delta) of the in-memory delta furthest from the
+            current data: the bottom of the undo stack first, then the redo
+            stack, whose first step is the last one redo reaches. None when
+            every delta is already on disk.
+        """
+        for steps in (self.undo_steps, self.redo_steps):
+            for position, step in enumerate(steps):
+                for delta in step:
+                    if delta.nbytes:
+                        return steps, position, delta
+        return None
+
+    def drop_through(self, steps, position):
+        """
+            Forget steps[position] and every step further away. Each step only
+            applies to the data the steps nearer the present leave behind, so a
+            stack can only lose steps from its far end.
+        """
+        for step in steps[:position + 1]:
+            self.discard_step(step)
+        del steps[:position + 1]
+
+    def spill_directory(self):
+        if self.spill_dir is not None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            return self.spill_dir
+        if self._spill_tempdir is None:
+            self._spill_tempdir = tempfile.TemporaryDirectory(prefix='epoch123-undo-')
+        return self._spill_tempdir.name
+
+    @staticmethod
+    def discard_step(step):
+        for delta in step:
+            delta.discard()
+
+    def clear_steps(self, steps):
+        for step in steps:
+            self.discard_step(step)
+        steps.clear()
+
+    def clear(self):
+        self.clear_steps(self.undo_steps)
+        self.clear_steps(self.redo_steps)
+
+    def stats(self):
+        deltas = [delta for step in self.undo_steps + self.redo_steps for delta in step]
+        return {
+            'undo_steps': len(self.undo_steps),
+            'redo_steps': len(self.redo_steps),
+            'memory_bytes': self.memory_bytes,
+            'spilled_deltas': sum(delta.spill_path is not None for delta in deltas),
+        }
@@ -0,0 +1,61 @@
+import numpy as np
+
+FILTER_TYPES = ('lowpass', 'highpass', 'bandpass', 'bandstop')
+
+
+def design_sos(btype, cutoff, sample_rate, order=4):
+    """
+        Butterworth second-order sections for cutoff in Hz at sample_rate; band
+        filters take a (low, high) pair. Raises ValueError for cutoffs the
+        file's sample rate cannot represent.
+    """
+    if btype not in FILTER_TYPES:
+        raise ValueError(f"Unknown filter type '{btype}'")
+    cutoffs = np.atleast_1d(np.asarray(cutoff, dtype=np.float64))
+    expected = 2 if btype in ('bandpass', 'bandstop') else 1
+    if len(cutoffs) != expected:
+        raise ValueError(f"A {btype} filter needs {expected} cutoff frequenc{'ies' if expected == 2 else 'y'}")
+    nyquist = sample_rate / 2
+    if np.any(cutoffs <= 0) or np.any(cutoffs >= nyquist):
+        raise ValueError(f"Cutoffs must lie between 0 and {nyquist:g} Hz for audio at {sample_rate:g} Hz")
+    if expected == 2 and cutoffs[0] >= cutoffs[1]:
+        raise ValueError("The low cutoff must be below the high cutoff")
+    import scipy.signal as sig
+
+    return sig.butter(order, cutoffs if expected == 2 else cutoffs[0], btype=btype, fs=sample_rate, output='sos')
+
+
+def edge_length(sos):
+    """How many samples of odd extension sosfiltfilt pads either end of the signal with."""
+    ntaps = 2 * len(sos) + 1 - min((sos[:, 2] == 0).sum(), (sos[:, 5] == 0).sum())
+    return 3 * ntaps
+
+
+class BlockFilter:
+    """
+        Causal SOS filter over consecutive blocks of frames, 1-D or frames x
+        channels with each channel filtered on its own. The filter state is
+        carried from block to block, so a signal filtered block by block
+        comes out exactly as if it had been filtered in one go, and only one
+        block has to be in memory.
+    """
+    def __init__(self, sos, zi=None):
+        self.sos = sos
+        self.zi = zi  # (sections, 2[, channels]); None starts from silence
+
+    def prime(self, first):
+        """Start in the steady state of a signal held at first (a sample or a frame), as sosfiltfilt does."""
+        import scipy.signal as sig
+
+        first = np.asarray(first, dtype=np.float64)
+        steady = sig.sosfilt_zi(self.sos)
+        self.zi = steady.reshape(steady.shape + (1,) * first.ndim) * first
+
+    def process(self, block):
+        import scipy.signal as sig
+
+        block = np.asarray(block)
+        if self.zi is None:
+            self.zi = np.zeros((len(self.sos), 2) + block.shape[1:])
+        filtered, self.zi = sig.sosfilt(self.sos, block, axis=0, zi=self.zi)
+        return filtered
@@ -0,0 +1,127 @@
+import os
+import shutil
+import logging
+import soundfile as sf
+
+AUDIO_EXTENSIONS = ('.wav', '.flac', '.mp3')
+
+
+def probe_audio_header(file_path):
+    """
+        Read (num_channels, sample_rate, duration) from the container header
+        without decoding any audio. MP3s go straight to mutagen since
+        libsndfile may have to walk every frame to count them.
+    """
+    if not file_path.lower().endswith('.mp3'):
+        try:
+            info = sf.info(file_path)
+            return info.channels, info.samplerate, info.duration
+        except Exception:
+            pass  # Fall back to mutagen below
+
+    from mutagen import File as MutagenFile
+
+    audio = MutagenFile(file_path)
+    if audio is None or audio.info is None:
+        raise ValueError(f"Unrecognized audio format: {file_path}")
+    return audio.info.channels, audio.info.sample_rate, audio.info.length
+
+
+def file_signature(stat_result):
+    """The (size, mtime, inode) triple used to decide whether a file has changed."""
+    return stat_result.st_size, stat_result.st_mtime_ns, stat_result.st_ino
+
+
+def build_metadata_row(file_path, stat_result):
+    """Probe a file and build the row MetaDataDB.upsert_scanned_files expects."""
+    num_channels, sample_rate, duration = probe_audio_header(file_path)
+    size, mtime_ns, inode = file_signature(stat_result)
+    return {
+        'file_name': os.path.basename(file_path),
+        'file_path': file_path,
+        'num_channels': num_channels,
+        'sample_rate': sample_rate,
+        'file_size': round(size / 1024, 2),
+        'duration': round(duration, 2),
+        'file_bytes': size,
+        'mtime_ns': mtime_ns,
+        'inode': inode,
+    }
+
+
+def ingest_file(source_path, destination_path=None):
+    """
+        Copy a file into the library (when a destination is given), then probe it.
+        Runs inside ingest pool workers, so it only takes and returns plain data.
+    """
+    file_path = source_path
+    if destination_path is not None:
+        shutil.copy(source_path, destination_path)
+        file_path = destination_path
+    return build_metadata_row(file_path, os.stat(file_path))
+
+
+def iter_audio_files(directory):
+    """Yield (path, stat_result) for every audio file under directory."""
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.lower().endswith(AUDIO_EXTENSIONS) and entry.is_file():
+                            yield entry.path, entry.stat()
+                    except OSError as e:
+                        logging.error(f"Failed to stat {entry.path}: {e}")
+        except OSError as e:
+            logging.error(f"Failed to scan directory {current}: {e}")
+
+
+class LibraryScanner:
+    """
+        Keeps the audio_files table in sync with a sound directory.
+        Files whose size, mtime and inode match what the database recorded on
+        the previous scan are skipped; only new or changed files are probed,
+        and all of their rows are written in a single transaction.
+    """
+    def __init__(self, metadata_db):
+        self.metadata_db = metadata_db
+
+    def find_changes(self, directory):
+        """
+            Return ([(path, stat_result)] for files that are new or changed since
+            the last scan, [path] of files under directory the database still
+            lists but that are gone from disk).
+        """
+        known = self.metadata_db.get_file_signatures()
+        changed, seen = [], set()
+        for path, stat_result in iter_audio_files(directory):
+            seen.add(path)
+            if known.get(path) != file_signature(stat_result):
+                changed.append((path, stat_result))
+        prefix = os.path.join(directory, '')
+        # Checked again so a folder the walk could not read does not lose its files' tags
+        removed = [path for path in known
+                   if path.startswith(prefix) and path not in seen and not os.path.exists(path)]
+        return changed, removed
+
+    def scan(self, directory):
+        """
+            Probe new or changed files and store their metadata, and forget files
+            that were removed. Returns the number of rows written.
+        """
+        changed, removed = self.find_changes(directory)
+        if removed:
+            self.metadata_db.delete_many(removed)
+        rows = []
+        for path, stat_result in changed:
+            try:
+                rows.append(build_metadata_row(path, stat_result))
+            except Exception as e:
+                logging.error(f"Failed to read metadata for {os.path.basename(path)}: {e}")
+        if rows:
+            self.metadata_db.upsert_scanned_files(rows)
+        return len(rows)
@@ -0,0 +1,584 @@
+import sqlite3
+import os
+import re
+import logging
+import threading
+from contextlib import contextmanager
+from .paths import get_main_sound_dir_path
+
+# Configure logging
+logging.basicConfig(level=logging.ERROR, format='%(asctime)s %(levelname)s: %(message)s')
+
+# Schema migrations, applied in order. Migration N upgrades a database whose
+# PRAGMA user_version is N - 1 to version N, inside a single transaction.
+
+def migrate_base_schema(cursor):
+    """v1: the original tables. IF NOT EXISTS keeps databases created before versioning intact."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audio_files (
+            file_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            file_name TEXT NOT NULL,
+            file_path TEXT NOT NULL,
+            num_channels INTEGER,
+            sample_rate INTEGER,
+            file_size INTEGER,
+            duration REAL,
+            description TEXT
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS tags (
+            tag_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tag_name TEXT UNIQUE
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS file_tags (
+            file_id INTEGER,
+            tag_id INTEGER,
+            PRIMARY KEY (file_id, tag_id),
+            FOREIGN KEY (file_id) REFERENCES audio_files (file_id),
+            FOREIGN KEY (tag_id) REFERENCES tags (tag_id)
+        )
+    ''')
+
+
+def migrate_scan_columns(cursor):
+    """v2: the (size, mtime, inode) signature the library scanner uses to skip unchanged files."""
+    existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(audio_files)")}
+    for column in ('file_bytes', 'mtime_ns', 'inode'):
+        if column not in existing_columns:
+            cursor.execute(f"ALTER TABLE audio_files ADD COLUMN {column} INTEGER")
+
+
+def migrate_lookup_indexes(cursor):
+    """v3: unique index on audio_files(file_path) and an index on file_tags(tag_id)."""
+    # Older databases may hold the same path twice; keep the oldest row and move its tags over
+    duplicates = cursor.execute('''
+        SELECT dup.file_id, kept.kept_id
+        FROM audio_files dup
+        JOIN (SELECT file_path, MIN(file_id) AS kept_id FROM audio_files
+              GROUP BY file_path HAVING COUNT(*) > 1) kept
+        ON dup.file_path = kept.file_path AND dup.file_id != kept.kept_id
+    ''').fetchall()
+    for duplicate_id, kept_id in duplicates:
+        cursor.execute("UPDATE OR IGNORE file_tags SET file_id = ? WHERE file_id = ?", (kept_id, duplicate_id))
+        cursor.execute("DELETE FROM file_tags WHERE file_id = ?", (duplicate_id,))
+        cursor.execute("DELETE FROM audio_files WHERE file_id = ?", (duplicate_id,))
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_audio_files_path ON audio_files (file_path)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_file_tags_tag ON file_tags (tag_id)")
+
+
+def migrate_search_index(cursor):
+    """
+        v4: FTS5 index over file names, descriptions and tag names.
+        Triggers keep it in sync with every write to audio_files, file_tags and tags.
+        Skipped when sqlite was built without FTS5; search() then falls back to LIKE.
+    """
+    try:
+        cursor.execute('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS search_index
+            USING fts5(file_name, description, tags, prefix='2 3')
+        ''')
+    except sqlite3.OperationalError as e:
+        logging.warning(f"Full-text search unavailable: {e}")
+        return
+
+    file_tags_sql = '''
+        (SELECT COALESCE(GROUP_CONCAT(tags.tag_name, ' '), '') FROM file_tags
+         JOIN tags ON tags.tag_id = file_tags.tag_id WHERE file_tags.file_id = {file_id})
+    '''
+    cursor.execute(f'''
+        INSERT INTO search_index (rowid, file_name, description, tags)
+        SELECT file_id, file_name, COALESCE(description, ''), {file_tags_sql.format(file_id='audio_files.file_id')}
+        FROM audio_files
+    ''')
+    triggers = [
+        '''
+        CREATE TRIGGER IF NOT EXISTS search_index_file_insert AFTER INSERT ON audio_files BEGIN
+            INSERT INTO search_index (rowid, file_name, description, tags)
+            VALUES (new.file_id, new.file_name, COALESCE(new.description, ''), '');
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS search_index_file_update AFTER UPDATE OF file_name, description ON audio_files BEGIN
+            UPDATE search_index SET file_name = new.file_name, description = COALESCE(new.description, '')
+            WHERE rowid = new.file_id;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS search_index_file_delete AFTER DELETE ON audio_files BEGIN
+            DELETE FROM search_index WHERE rowid = old.file_id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS search_index_tag_link AFTER INSERT ON file_tags BEGIN
+            UPDATE search_index SET tags = {file_tags_sql.format(file_id='new.file_id')} WHERE rowid = new.file_id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS search_index_tag_unlink AFTER DELETE ON file_tags BEGIN
+            UPDATE search_index SET tags = {file_tags_sql.format(file_id='old.file_id')} WHERE rowid = old.file_id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS search_index_tag_change AFTER UPDATE OF tag_name ON tags BEGIN
+            UPDATE search_index SET tags = {file_tags_sql.format(file_id='search_index.rowid')}
+            WHERE rowid IN (SELECT file_id FROM file_tags WHERE tag_id = new.tag_id);
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS search_index_tag_delete AFTER DELETE ON tags BEGIN
+            UPDATE search_index SET tags = {file_tags_sql.format(file_id='search_index.rowid')}
+            WHERE rowid IN (SELECT file_id FROM file_tags WHERE tag_id = old.tag_id);
+        END
+        ''',
+    ]
+    # One execute per trigger: executescript() would commit the migration transaction early
+    for trigger in triggers:
+        cursor.execute(trigger)
+
+
+def migrate_library_sort_indexes(cursor):
+    """
+        v5: indexes for each column the library view sorts by, and a tag_list
+        column holding a file's tag names, sorted and comma separated, so that
+        tags sort through an index too. Triggers keep tag_list in sync.
+    """
+    existing_columns = {row[1] for row in cursor.execute("PRAGMA table_info(audio_files)")}
+    if 'tag_list' not in existing_columns:
+        cursor.execute("ALTER TABLE audio_files ADD COLUMN tag_list TEXT")
+
+    tag_list_sql = '''
+        (SELECT GROUP_CONCAT(tag_name, ', ') FROM
+         (SELECT tags.tag_name FROM file_tags JOIN tags ON tags.tag_id = file_tags.tag_id
+          WHERE file_tags.file_id = {file_id} ORDER BY tags.tag_name))
+    '''
+    cursor.execute(f"UPDATE audio_files SET tag_list = {tag_list_sql.format(file_id='audio_files.file_id')}")
+    triggers = [
+        f'''
+        CREATE TRIGGER IF NOT EXISTS tag_list_link AFTER INSERT ON file_tags BEGIN
+            UPDATE audio_files SET tag_list = {tag_list_sql.format(file_id='new.file_id')} WHERE file_id = new.file_id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS tag_list_unlink AFTER DELETE ON file_tags BEGIN
+            UPDATE audio_files SET tag_list = {tag_list_sql.format(file_id='old.file_id')} WHERE file_id = old.file_id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS tag_list_tag_change AFTER UPDATE OF tag_name ON tags BEGIN
+            UPDATE audio_files SET tag_list = {tag_list_sql.format(file_id='audio_files.file_id')}
+            WHERE file_id IN (SELECT file_id FROM file_tags WHERE tag_id = new.tag_id);
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS tag_list_tag_delete AFTER DELETE ON tags BEGIN
+            UPDATE audio_files SET tag_list = {tag_list_sql.format(file_id='audio_files.file_id')}
+            WHERE file_id IN (SELECT file_id FROM file_tags WHERE tag_id = old.tag_id);
+        END
+        ''',
+    ]
+    for trigger in triggers:
+        cursor.execute(trigger)
+
+    # Indexed on the same expressions library_page orders by; the rowid every index ends with breaks ties
+    for column, expression in LIBRARY_SORT_KEYS.items():
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_audio_files_sort_{column} ON audio_files ({expression})")
+
+
+# Columns the library view can sort by, and the indexed expression each one sorts on.
+# Missing values sort as -1 or '' rather than NULL so keyset paging can compare them.
+LIBRARY_SORT_KEYS = {
+    'file_name': 'file_name COLLATE NOCASE',
+    'duration': 'IFNULL(duration, -1)',
+    'sample_rate': 'IFNULL(sample_rate, -1)',
+    'file_size': 'IFNULL(file_size, -1)',
+    'tag_list': "IFNULL(tag_list, '')",
+}
+
+MIGRATIONS = [
+    migrate_base_schema,
+    migrate_scan_columns,
+    migrate_lookup_indexes,
+    migrate_search_index,
+    migrate_library_sort_indexes,
+]
+
+
+class MetaDataDB:
+    # Size of sqlite3's per-connection prepared statement cache
+    STATEMENT_CACHE_SIZE = 256
+
+    def __init__(self, db_path=None, on_error=None):
+        """on_error(title, message), if given, is told about failed writes as well as the log, e.g. to show a dialog."""
+        self.db_path = db_path or get_main_sound_dir_path('Epoch123/DB') + '/metadata.db'
+        self.on_error = on_error
+        self._local = threading.local()
+        self.initialize_db()
+
+    def report_error(self, title, message):
+        logging.error(message)
+        if self.on_error is not None:
+            self.on_error(title, message)
+
+    def initialize_db(self):
+        try:
+            self.migrate()
+        except sqlite3.Error as e:
+            self.report_error("Database Initialization Error", f"Database initialization error: {e}")
+
+    @property
+    def schema_version(self):
+        return self.connection.execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        """Upgrade the database in place to the latest schema, one version per transaction."""
+        version = self.schema_version
+        if version > len(MIGRATIONS):
+            logging.warning(f"Database schema version {version} is newer than this application supports")
+            return
+        for target_version, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            with self.transaction() as cursor:
+                migration(cursor)
+                cursor.execute(f"PRAGMA user_version = {target_version}")
+
+    @property
+    def connection(self):
+        """
+            The calling thread's long-lived connection, opened on first use.
+            sqlite connections cannot be shared between threads, so each thread
+            (GUI, ingest workers) gets its own. Connections run in autocommit
+            mode; multi-statement writes go through transaction().
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None, cached_statements=self.STATEMENT_CACHE_SIZE)
+            # WAL lets readers on the GUI thread run while a worker is writing
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Close the calling thread's connection; it is reopened on next use."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def db_connection(self):
+        """ Context manager yielding the calling thread's persistent connection """
+        yield self.connection
+
+    @contextmanager
+    def transaction(self):
+        """Run the enclosed statements in one transaction, rolling back on error. Nests safely."""
+        conn = self.connection
+        if conn.in_transaction:
+            yield conn.cursor()
+            return
+        # IMMEDIATE takes the write lock up front so a busy database waits instead of failing mid-way
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def execute_query(self, query, params=(), commit=False):
+        # Connections autocommit, so commit is kept only for existing callers
+        cursor = self.connection.execute(query, params)
+        return cursor.fetchall()
+
+    def file_already_exists(self, file_path):
+        """Check if the file already exists in the database to avoid duplicates."""
+        try:
+            cursor = self.connection.execute("SELECT 1 FROM audio_files WHERE file_path = ?", (file_path,))
+            return cursor.fetchone() is not None
+        except sqlite3.Error as e:
+            logging.error(f"Error checking if file exists: {e}")
+            return False
+
+    def insert_metadata(self, file_name, file_path, num_channels, sample_rate, file_size, duration):
+        """Insert metadata into the database, ignoring if it already exists."""
+        try:
+            self.connection.execute('''
+                INSERT OR IGNORE INTO audio_files (file_name, file_path, num_channels, sample_rate, file_size, duration)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (file_name, file_path, num_channels, sample_rate, file_size, duration))
+        except sqlite3.Error as e:
+            self.report_error("Failed to Insert Metadata", f"Failed to insert metadata for {file_name}: {e}")
+
+    def insert_many(self, rows):
+        """
+            Insert many (file_name, file_path, num_channels, sample_rate, file_size, duration)
+            rows in one transaction, skipping paths that are already in the database.
+        """
+        try:
+            with self.transaction() as cursor:
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO audio_files (file_name, file_path, num_channels, sample_rate, file_size, duration)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                ''', rows)
+        except sqlite3.Error as e:
+            self.report_error("Failed to Insert Metadata", f"Failed to insert metadata: {e}")
+
+    def file_ids_for_paths(self, cursor, file_paths):
+        """Map each known path in file_paths to its file_id."""
+        file_ids = {}
+        for path in set(file_paths):
+            row = cursor.execute("SELECT file_id FROM audio_files WHERE file_path = ?", (path,)).fetchone()
+            if row:
+                file_ids[path] = row[0]
+        return file_ids
+
+    def tag_many(self, file_tags):
+        """Attach tags to files from an iterable of (file_path, tag_name) pairs, in one transaction."""
+        try:
+            with self.transaction() as cursor:
+                self.insert_file_tags(cursor, file_tags)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to tag files: {e}")
+
+    def insert_file_tags(self, cursor, file_tags):
+        """Tag files on cursor, leaving errors to the caller so an enclosing transaction rolls back."""
+        file_tags = list(file_tags)
+        tag_names = {tag_name for _, tag_name in file_tags}
+        cursor.executemany('''
+            INSERT OR IGNORE INTO tags (tag_name)
+            VALUES (?)
+        ''', [(tag_name,) for tag_name in tag_names])
+        tag_ids = {name: tag_id for name, tag_id in cursor.execute("SELECT tag_name, tag_id FROM tags")
+                   if name in tag_names}
+        file_ids = self.file_ids_for_paths(cursor, (file_path for file_path, _ in file_tags))
+        cursor.executemany('''
+            INSERT OR IGNORE INTO file_tags (file_id, tag_id)
+            VALUES (?, ?)
+        ''', [(file_ids[file_path], tag_ids[tag_name]) for file_path, tag_name in file_tags
+              if file_path in file_ids])
+
+    def delete_many(self, file_paths):
+        """Remove many files and their tag links from the database in one transaction."""
+        try:
+            with self.transaction() as cursor:
+                params = [(file_id,) for file_id in self.file_ids_for_paths(cursor, file_paths).values()]
+                cursor.executemany("DELETE FROM file_tags WHERE file_id = ?", params)
+                cursor.executemany("DELETE FROM audio_files WHERE file_id = ?", params)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to delete files: {e}")
+
+    def get_file_signatures(self):
+        """Return {file_path: (file_bytes, mtime_ns, inode)} for every file in the database."""
+        query = '''
+            SELECT file_path, file_bytes, mtime_ns, inode FROM audio_files
+        '''
+        result = self.execute_query(query)
+        return {row[0]: tuple(row[1:]) for row in result}
+
+    def upsert_scanned_files(self, rows):
+        """
+            Insert or refresh the scanned metadata for many files in one transaction.
+            Descriptions and tags of files that are already known are left untouched.
+        """
+        try:
+            with self.transaction() as cursor:
+                cursor.executemany('''
+                    INSERT INTO audio_files (file_name, file_path, num_channels, sample_rate, file_size, duration,
+                                             file_bytes, mtime_ns, inode)
+                    VALUES (:file_name, :file_path, :num_channels, :sample_rate, :file_size, :duration,
+                            :file_bytes, :mtime_ns, :inode)
+                    ON CONFLICT (file_path) DO UPDATE
+                    SET file_name = excluded.file_name, num_channels = excluded.num_channels,
+                        sample_rate = excluded.sample_rate, file_size = excluded.file_size, duration = excluded.duration,
+                        file_bytes = excluded.file_bytes, mtime_ns = excluded.mtime_ns, inode = excluded.inode
+                ''', rows)
+        except sqlite3.Error as e:
+            logging.error(f"Failed to store scanned metadata: {e}")
+
+    def write_metadata(self, file_path, num_channels=None, sample_rate=None, file_size=None, duration=None, description=None, tags=None):
+        try:
+            with self.transaction() as cursor:
+                cursor.execute('''
+                    INSERT INTO audio_files (file_name, file_path, num_channels, sample_rate, file_size, duration, description)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (file_path) DO UPDATE
+                    SET file_name = excluded.file_name, num_channels = excluded.num_channels,
+                        sample_rate = excluded.sample_rate, file_size = excluded.file_size,
+                        duration = excluded.duration, description = excluded.description
+                ''', (os.path.basename(file_path), file_path, num_channels, sample_rate, file_size, duration, description))
+
+                # Update the tags
+                if tags is not None:
+                    self.insert_file_tags(cursor, ((file_path, tag) for tag in tags))
+        except sqlite3.Error as e:
+            self.report_error("Error Writing Metadata", f"Error writing metadata: {e}")
+
+    def rename_file(self, old_path, new_path):
+        query = "UPDATE audio_files SET file_path = ?, file_name = ? WHERE file_path = ?"
+        self.execute_query(query, (new_path, os.path.basename(new_path), old_path), commit=True)
+
+
+    def delete_file(self, file_path):
+        self.delete_many([file_path])
+
+    def get_metadata(self, file_path):
+        query = '''
+            SELECT file_id, file_name, file_path, num_channels, sample_rate, file_size, duration, description
+            FROM audio_files
+            WHERE file_path = ?
+        '''
+        result = self.execute_query(query, (file_path,))
+        return result[0] if result else None
+
+    def add_tag(self, tag_name):
+        query = '''
+            INSERT OR IGNORE INTO tags (tag_name)
+            VALUES (?)
+        '''
+        self.execute_query(query, (tag_name,))
+
+    def get_tags(self):
+        query = '''
+            SELECT tag_name FROM tags
+        '''
+        result = self.execute_query(query)
+        return [tag[0] for tag in result] if result else []
+
+    def get_files_by_tag(self, tag_name):
+        query = '''
+            SELECT file_path FROM audio_files
+            WHERE file_id IN (
+                SELECT file_id FROM file_tags
+                WHERE tag_id = (SELECT tag_id FROM tags WHERE tag_name = ?)
+            )
+        '''
+        result = self.execute_query(query, (tag_name,))
+        return [file[0] for file in result] if result else []
+
+    def remove_tag(self, tag_name):
+        query = '''
+            DELETE FROM tags
+            WHERE tag_name = ?
+        '''
+        self.execute_query(query, (tag_name,))
+
+    def remove_tag_from_file(self, file_path, tag_name):
+        query = '''
+            DELETE FROM file_tags
+            WHERE file_id = (SELECT file_id FROM audio_files WHERE file_path = ?)
+            AND tag_id = (SELECT tag_id FROM tags WHERE tag_name = ?)
+        '''
+        self.execute_query(query, (file_path, tag_name))
+
+    def add_tag_to_file(self, file_path, tag_name):
+        query = '''
+            INSERT INTO file_tags (file_id, tag_id)
+            VALUES ((SELECT file_id FROM audio_files WHERE file_path = ?), (SELECT tag_id FROM tags WHERE tag_name = ?))
+        '''
+        self.execute_query(query, (file_path, tag_name))
+
+    def get_tags_for_file(self, file_path):
+        query = '''
+            SELECT tag_name FROM tags
+            WHERE tag_id IN (
+                SELECT tag_id FROM file_tags
+                WHERE file_id = (SELECT file_id FROM audio_files WHERE file_path = ?)
+            )
+        '''
+        result = self.execute_query(query, (file_path,))
+        return [tag[0] for tag in result] if result else []
+
+    # Column weights for bm25 ranking: file_name, description, tags
+    SEARCH_WEIGHTS = (10.0, 1.0, 5.0)
+
+    def search(self, text, limit=500, directory=None):
+        """
+            Return file paths matching every word in text, best match first.
+            Each word is a prefix query, so "duc qua" finds "duck_quack.wav".
+            With directory, only files under it count towards the limit.
+        """
+        terms = re.findall(r'\w+', text.lower())
+        if not terms:
+            return []
+        where, where_params = self.library_filter(directory) if directory is not None else ('1', [])
+        try:
+            query = f'''
+                SELECT audio_files.file_path FROM search_index
+                JOIN audio_files ON audio_files.file_id = search_index.rowid
+                WHERE search_index MATCH ? AND {where}
+                ORDER BY bm25(search_index, {', '.join(map(str, self.SEARCH_WEIGHTS))})
+                LIMIT ?
+            '''
+            match = ' '.join(f'"{term}"*' for term in terms)
+            result = self.execute_query(query, (match, *where_params, limit))
+        except sqlite3.OperationalError:
+            # No FTS5 in this sqlite build: substring match on names and descriptions
+            conditions = ' AND '.join("(file_name LIKE ? OR description LIKE ?)" for _ in terms)
+            params = [pattern for term in terms for pattern in (f'%{term}%', f'%{term}%')]
+            result = self.execute_query(f"SELECT file_path FROM audio_files WHERE {conditions} AND {where} LIMIT ?",
+                                        (*params, *where_params, limit))
+        return [row[0] for row in result]
+
+    @staticmethod
+    def library_filter(directory, file_paths=None, index_paths=True):
+        """
+            WHERE clause and parameters for the files under directory, only those
+            in file_paths if given. index_paths=False keeps sqlite from answering
+            the directory range from the path index, for queries that should walk
+            a sort index instead.
+        """
+        prefix = os.path.join(directory, '')
+        # Everything under prefix sorts between it and prefix with its last character bumped
+        path_column = 'file_path' if index_paths else '+file_path'
+        conditions = [f"{path_column} >= ? AND {path_column} < ?"]
+        params = [prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)]
+        if file_paths is not None:
+            conditions.append(f"file_path IN ({', '.join('?' * len(file_paths))})")
+            params.extend(file_paths)
+        return ' AND '.join(conditions), params
+
+    def count_library(self, directory, file_paths=None):
+        """Number of files under directory, or of those among file_paths."""
+        where, params = self.library_filter(directory, file_paths)
+        return self.execute_query(f"SELECT COUNT(*) FROM audio_files WHERE {where}", params)[0][0]
+
+    def library_page(self, directory, sort_key='file_name', descending=False, after=None, limit=256, file_paths=None):
+        """
+            Up to limit rows of (sort value, file_id, file_name, file_path, duration,
+            sample_rate, file_size, tag_list) for the files under directory, ordered
+            by the LIBRARY_SORT_KEYS entry sort_key. Pass the sort value and file_id
+            of a page's last row as after to get the next page; each page is a
+            range scan of the sort index, however deep into the library it is.
+        """
+        expression = LIBRARY_SORT_KEYS[sort_key]
+        where, params = self.library_filter(directory, file_paths, index_paths=False)
+        if after is not None:
+            # Spelled out rather than as a row value, which sqlite cannot turn into an index range
+            beyond = '<' if descending else '>'
+            where += f" AND {expression} {beyond}= ? AND ({expression} {beyond} ? OR file_id {beyond} ?)"
+            sort_value, file_id = after
+            params.extend((sort_value, sort_value, file_id))
+        direction = 'DESC' if descending else 'ASC'
+        query = f'''
+            SELECT {expression}, file_id, file_name, file_path, duration, sample_rate, file_size, tag_list
+            FROM audio_files
+            WHERE {where}
+            ORDER BY {expression} {direction}, file_id {direction}
+            LIMIT ?
+        '''
+        return self.execute_query(query, (*params, limit))
+
+    def get_files_under(self, directory):
+        """Paths of every file the database holds under directory."""
+        where, params = self.library_filter(directory)
+        return [row[0] for row in self.execute_query(f"SELECT file_path FROM audio_files WHERE {where}", params)]
+
+    def get_all_files(self):
+        query = '''
+            SELECT file_path FROM audio_files
+        '''
+        result = self.execute_query(query)
+        return [file[0] for file in result] if result else []
@@ -0,0 +1,83 @@
+from math import gcd
+import numpy as np
+from .PlaybackEngine import ArraySource
+
+
+class MixerTrack:
+    """One input of a MixerSource: a playback source, its gain and the frame it starts at."""
+    def __init__(self, source, gain=1.0, offset=0):
+        self.source = source
+        self.gain = gain
+        self.offset = int(offset)
+
+    @property
+    def stop(self):
+        return self.offset + self.source.frames
+
+
+class MixerSource:
+    """
+        Plays several sources at once as a single playback source, so any
+        engine that can stream one file can stream a mix. Tracks are placed
+        at sample offsets on a shared timeline and summed with their gains
+        block by block in read(), so nothing is mixed ahead of time. Tracks
+        at another sample rate are resampled once when added, and mono
+        tracks are spread over every output channel.
+    """
+    def __init__(self, sample_rate, channels=2):
+        self.sample_rate = int(sample_rate)
+        self.channels = channels
+        self.tracks = []
+        self.mix_buffer = np.zeros((0, channels), dtype=np.float32)
+
+    @property
+    def frames(self):
+        return max((track.stop for track in self.tracks), default=0)
+
+    def add_track(self, source, gain=1.0, offset=0):
+        """Add source at frame offset; returns the MixerTrack so gain and offset can be changed later."""
+        if source.sample_rate != self.sample_rate:
+            source = self.resample(source, self.sample_rate)
+        track = MixerTrack(source, gain, offset)
+        self.tracks.append(track)
+        return track
+
+    @staticmethod
+    def resample(source, sample_rate):
+        """An ArraySource holding source converted to sample_rate with a polyphase filter."""
+        from scipy.signal import resample_poly
+
+        divisor = gcd(sample_rate, source.sample_rate)
+        samples = np.asarray(source.read(0, source.frames), dtype=np.float32)
+        resampled = resample_poly(samples, sample_rate // divisor, source.sample_rate // divisor, axis=0)
+        return ArraySource(resampled.astype(np.float32), sample_rate)
+
+    def read(self, start, count):
+        """
+            Mixed frames [start, start + count) as frames x channels. The
+            array is a reused buffer, valid until the next read().
+        """
+        start = max(int(start), 0)
+        count = max(min(int(count), self.frames - start), 0)
+        if len(self.mix_buffer) < count:
+            self.mix_buffer = np.zeros((count, self.channels), dtype=np.float32)
+        out = self.mix_buffer[:count]
+        out.fill(0.0)
+        stop = start + count
+        for track in self.tracks:
+            first, last = max(start, track.offset), min(stop, track.stop)
+            if first >= last or track.gain == 0:
+                continue
+            chunk = track.source.read(first - track.offset, last - first)
+            if chunk.ndim == 1:
+                chunk = chunk[:, np.newaxis]
+            elif chunk.shape[1] != self.channels:
+                # Fold extra channels down to mono and spread them over the output
+                chunk = chunk.mean(axis=1, keepdims=True)
+            target = out[first - start:first - start + len(chunk)]
+            if track.gain == 1.0:
+                target += chunk
+            else:
+                target += chunk * np.float32(track.gain)
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
@@ -0,0 +1,501 @@
+import time
+import logging
+import threading
+import numpy as np
+
+
+class ArraySource:
+    """
+        Playback source over an in-memory array. Sources only need frames,
+        channels, sample_rate and read(start, count) returning at most count
+        frames as a frames x channels (or 1-D mono) array; AudioBuffer
+        satisfies the same protocol.
+    """
+    def __init__(self, samples, sample_rate):
+        self.samples = np.asarray(samples)
+        self.sample_rate = int(sample_rate)
+
+    @property
+    def frames(self):
+        return len(self.samples)
+
+    @property
+    def channels(self):
+        return 1 if self.samples.ndim == 1 else self.samples.shape[1]
+
+    def read(self, start, count):
+        start = max(int(start), 0)
+        return self.samples[start:start + max(int(count), 0)]
+
+    def reversed(self):
+        """The same samples played backwards: a negative-stride view, so nothing is copied."""
+        return ArraySource(self.samples[::-1], self.sample_rate)
+
+
+class StreamingEngine:
+    """
+        Streams a source to an SDL audio device opened with AUDIO_F32.
+        A feeder thread reads the source ahead of playback into a ring of
+        RING_FRAMES frames, following the region and looping; SDL calls
+        fill() on its audio thread for every BLOCK_FRAMES frames and fill()
+        only copies out of the ring. Sources that render or read from disk,
+        such as edit graphs and lazily read files, so never hold up the
+        device. Seek, regions and loops stay exact to the sample: every ring
+        frame carries its source position. The lock guards the ring indexes,
+        position and counters only; the GUI thread polls playhead() and
+        is_active().
+    """
+    BLOCK_FRAMES = 512
+    RING_FRAMES = 1 << 14
+    # The feeder reads at most this many frames at a time
+    FEED_FRAMES = 4096
+    # resume() waits at most this long for the feeder to buffer the first block
+    START_TIMEOUT_SECONDS = 1.0
+    # A callback arriving this many block durations after the previous one means the device ran dry
+    UNDERRUN_FACTOR = 1.5
+
+    def __init__(self, block_frames=BLOCK_FRAMES):
+        from pygame._sdl2 import sdl2, audio as sdl_audio
+
+        self.sdl_audio = sdl_audio
+        sdl2.init_subsystem(sdl2.INIT_AUDIO)
+        self.device_names = sdl_audio.get_audio_device_names(False)
+        if not self.device_names:
+            raise RuntimeError("No audio output device available")
+        self.block_frames = block_frames
+        self.lock = threading.Lock()
+        self.ring_changed = threading.Condition(self.lock)
+        self.feeder = None
+        self.closing = False
+        self.device = None
+        self.device_config = None
+        self.source = None
+        self.region = (0, 0)
+        self.looping = False
+        self.gain = 1.0
+        self.position = 0
+        self.playing = False
+        self.finished = False
+        self.ring = np.zeros((self.RING_FRAMES, 1), dtype=np.float32)
+        self.ring_positions = np.zeros(self.RING_FRAMES, dtype=np.int64)
+        self.ring_start = 0
+        self.ring_count = 0
+        self.feed_position = 0
+        self.feed_ended = False
+        self.feed_generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.callbacks = 0
+        self.underruns = 0
+        self.callback_seconds = 0.0
+        self.max_callback_seconds = 0.0
+        self.last_callback_time = None
+        self.last_block_start = 0
+
+    def open_device(self, sample_rate, channels):
+        """(Re)open the device when the rate or channel count differs from the source's."""
+        wanted = (int(sample_rate), channels)
+        if self.device is not None and self.device_config == wanted:
+            return
+        self.close()
+        self.device = self.sdl_audio.AudioDevice(
+            devicename=self.device_names[0], iscapture=False, frequency=wanted[0],
+            audioformat=self.sdl_audio.AUDIO_F32, numchannels=channels,
+            chunksize=self.block_frames, allowed_changes=0, callback=self.fill)
+        self.device_config = wanted
+
+    def close(self):
+        if self.device is not None:
+            self.device.pause(1)
+            self.device.close()
+        self.device = None
+        self.device_config = None
+        self.stop_feeder()
+
+    def start_feeder(self):
+        if self.feeder is None:
+            self.closing = False
+            self.feeder = threading.Thread(target=self.feed, name='playback-feeder', daemon=True)
+            self.feeder.start()
+
+    def stop_feeder(self):
+        if self.feeder is not None:
+            with self.ring_changed:
+                self.closing = True
+                self.ring_changed.notify_all()
+            self.feeder.join()
+            self.feeder = None
+
+    def restart_feed(self):
+        """Empty the ring and feed again from position; call with the lock held."""
+        self.ring_start = 0
+        self.ring_count = 0
+        self.feed_position = self.position
+        self.feed_ended = False
+        self.feed_generation += 1
+        self.ring_changed.notify_all()
+
+    def feed(self):
+        """Feeder thread: keep the ring full, reading the source outside the lock."""
+        while True:
+            with self.ring_changed:
+                while not self.closing and (self.source is None or self.feed_ended or self.ring_count == len(self.ring)):
+                    self.ring_changed.wait()
+                if self.closing:
+                    return
+                start, stop = self.region
+                if self.feed_position >= stop:
+                    if self.looping and stop > start:
+                        self.feed_position = start
+                    else:
+                        self.feed_ended = True
+                        self.ring_changed.notify_all()
+                    continue
+                source, generation, position = self.source, self.feed_generation, self.feed_position
+                count = min(len(self.ring) - self.ring_count, self.FEED_FRAMES, stop - position)
+            try:
+                chunk = np.asarray(source.read(position, count))
+            except Exception as e:
+                logging.error(f"Failed to read audio for playback at frame {position}: {e}")
+                chunk = np.zeros(0, dtype=np.float32)
+            with self.ring_changed:
+                if generation != self.feed_generation:
+                    continue  # seeked, reloaded or re-regioned while reading
+                if len(chunk) == 0:
+                    self.feed_ended = True
+                else:
+                    self.ring_write(chunk.reshape(len(chunk), -1), position)
+                    self.feed_position = position + len(chunk)
+                self.ring_changed.notify_all()
+
+    def ring_write(self, chunk, position):
+        """Append chunk, whose first frame is source frame position; call with the lock held."""
+        count = len(chunk)
+        end = (self.ring_start + self.ring_count) % len(self.ring)
+        first = min(count, len(self.ring) - end)
+        self.ring[end:end + first] = chunk[:first]
+        self.ring[:count - first] = chunk[first:]
+        positions = np.arange(position, position + count)
+        self.ring_positions[end:end + first] = positions[:first]
+        self.ring_positions[:count - first] = positions[first:]
+        self.ring_count += count
+
+    def ring_read(self, out):
+        """Move up to len(out) frames from the ring into out; returns how many. Call with the lock held."""
+        count = min(len(out), self.ring_count)
+        first = min(count, len(self.ring) - self.ring_start)
+        out[:first] = self.ring[self.ring_start:self.ring_start + first]
+        out[first:count] = self.ring[:count - first]
+        if count:
+            last = (self.ring_start + count - 1) % len(self.ring)
+            self.ring_start = (self.ring_start + count) % len(self.ring)
+            self.ring_count -= count
+            # The next frame to be heard; after a loop it is back at the region start
+            self.position = int(self.ring_positions[self.ring_start] if self.ring_count else self.ring_positions[last] + 1)
+        return count
+
+    def load(self, source):
+        """Make source current and stop; the region covers the whole source until set_region()."""
+        self.open_device(source.sample_rate, source.channels)
+        self.device.pause(1)
+        self.start_feeder()
+        with self.lock:
+            self.source = source
+            if self.ring.shape[1] != source.channels:
+                self.ring = np.zeros((self.RING_FRAMES, source.channels), dtype=np.float32)
+            self.region = (0, source.frames)
+            self.position = 0
+            self.playing = False
+            self.finished = False
+            self.restart_feed()
+
+    def set_region(self, start=None, stop=None):
+        """Restrict playback (and looping) to frames [start, stop); None means the source edge."""
+        with self.lock:
+            frames = self.source.frames if self.source is not None else 0
+            start = 0 if start is None else min(max(int(start), 0), frames)
+            stop = frames if stop is None else min(max(int(stop), start), frames)
+            self.region = (start, stop)
+            self.position = min(max(self.position, start), stop)
+            self.restart_feed()
+
+    def set_looping(self, looping):
+        with self.lock:
+            if looping != self.looping:
+                self.looping = looping
+                self.restart_feed()
+
+    def set_gain(self, gain):
+        with self.lock:
+            self.gain = gain
+
+    def seek(self, frame):
+        """Continue from frame, clamped to the region; takes effect on the next block."""
+        with self.lock:
+            self.position = min(max(int(frame), self.region[0]), self.region[1])
+            self.last_block_start = self.position
+            self.last_callback_time = None
+            self.finished = False
+            self.restart_feed()
+
+    def play(self):
+        """Start from the beginning of the region."""
+        self.seek(self.region[0])
+        self.resume()
+
+    def resume(self):
+        if self.device is None or self.source is None:
+            return
+        with self.ring_changed:
+            # Lazily rendered sources such as edit graphs render the first block before the device starts
+            self.ring_changed.wait_for(lambda: self.ring_count >= self.block_frames or self.feed_ended,
+                                       timeout=self.START_TIMEOUT_SECONDS)
+            self.playing = True
+            self.finished = False
+            self.last_callback_time = None
+        self.device.pause(0)
+
+    def pause(self):
+        if self.device is not None:
+            self.device.pause(1)
+        with self.lock:
+            self.playing = False
+
+    def stop(self):
+        self.pause()
+        with self.lock:
+            self.position = self.region[0]
+            self.finished = False
+            self.restart_feed()
+
+    def is_active(self):
+        """True while playing or paused mid-region; False once the region has played out."""
+        with self.lock:
+            return self.source is not None and not self.finished and (self.playing or self.position > self.region[0])
+
+    def playhead(self):
+        """The frame being heard, interpolated from the last callback so the GUI can poll it smoothly."""
+        with self.lock:
+            if not self.playing or self.last_callback_time is None:
+                return self.position
+            rate = self.device_config[0]
+            estimate = self.last_block_start + int((time.perf_counter() - self.last_callback_time) * rate)
+            return min(estimate, self.position) if estimate >= self.last_block_start else self.position
+
+    def output_latency_seconds(self):
+        """Time a sample spends in the device buffer before it is heard."""
+        if self.device is None:
+            return 0.0
+        return self.device.chunksize / self.device.frequency
+
+    def stats(self):
+        """Callback timing and underrun counters for monitoring."""
+        with self.lock:
+            return {
+                'callbacks': self.callbacks,
+                'underruns': self.underruns,
+                'mean_callback_ms': self.callback_seconds / self.callbacks * 1000 if self.callbacks else 0.0,
+                'max_callback_ms': self.max_callback_seconds * 1000,
+                'output_latency_ms': self.output_latency_seconds() * 1000,
+            }
+
+    def fill(self, device, stream):
+        """SDL audio callback: copy the next block out of the ring into stream."""
+        started = time.perf_counter()
+        out = np.asarray(stream).view(np.float32)
+        with self.lock:
+            channels = self.device_config[1]
+            block = out.reshape(-1, channels)
+            block_duration = len(block) / self.device_config[0]
+            if self.last_callback_time is not None and started - self.last_callback_time > block_duration * self.UNDERRUN_FACTOR:
+                self.underruns += 1
+            self.last_callback_time = started
+            self.last_block_start = self.position
+
+            written = 0
+            if self.playing:
+                written = self.ring_read(block)
+                if written < len(block):
+                    if self.feed_ended:
+                        self.playing = False
+                        self.finished = True
+                    else:
+                        # The feeder fell behind; play silence rather than wait for it
+                        self.underruns += 1
+                self.ring_changed.notify_all()
+
+            if written and self.gain != 1.0:
+                block[:written] *= self.gain
+            block[written:] = 0.0
+
+            elapsed = time.perf_counter() - started
+            self.callbacks += 1
+            self.callback_seconds += elapsed
+            self.max_callback_seconds = max(self.max_callback_seconds, elapsed)
+
+
+class SoundEngine:
+    """
+        Fallback for systems where an SDL callback device cannot be opened:
+        plays the region as int16 pygame mixer.Sounds, with the same
+        interface as StreamingEngine. Only the first HEAD_SECONDS are
+        converted before playback starts; the rest is queued on the same
+        channel, and the converted sounds are kept so replaying costs no
+        conversion. The playhead comes from a monotonic clock.
+    """
+    HEAD_SECONDS = 0.25
+
+    def __init__(self):
+        self.mixer_config = None
+        self.source = None
+        self.region = (0, 0)
+        self.looping = False
+        self.gain = 1.0
+        self.sounds = []
+        self.sound_source = None  # (source, region, looping, mixer config) the cached sounds were built from
+        self.channel = None
+        self.start_time = None
+        self.paused_elapsed = 0.0
+        self.paused = False
+        import pygame as pg
+
+        if not pg.mixer.get_init():
+            pg.mixer.init()
+
+    def ensure_mixer(self, sample_rate, channels):
+        """(Re)open the mixer when the sample rate or channel count differs from the audio's."""
+        import pygame as pg
+
+        wanted = (int(sample_rate), channels)
+        # Compare with what was requested: the device may round the frequency
+        if pg.mixer.get_init() is None or self.mixer_config != wanted:
+            pg.mixer.quit()
+            pg.mixer.init(frequency=wanted[0], size=-16, channels=channels)
+            self.mixer_config = wanted
+
+    def make_sound(self, samples):
+        """A mixer.Sound built straight from float or int16 samples, 1-D or frames x channels."""
+        import pygame as pg
+
+        samples = np.asarray(samples)
+        if samples.ndim == 1:
+            samples = samples.reshape(-1, 1)
+        channels = self.mixer_config[1]
+        if samples.dtype != np.int16:
+            pcm = np.empty((len(samples), channels), dtype=np.int16)
+            np.multiply(np.clip(samples[:, :channels], -1.0, 1.0), 32767, out=pcm, casting='unsafe')
+        else:
+            pcm = np.ascontiguousarray(samples[:, :channels])
+        return pg.mixer.Sound(buffer=pcm)
+
+    def load(self, source):
+        self.stop()
+        self.source = source
+        self.region = (0, source.frames)
+
+    def set_region(self, start=None, stop=None):
+        frames = self.source.frames if self.source is not None else 0
+        start = 0 if start is None else min(max(int(start), 0), frames)
+        stop = frames if stop is None else min(max(int(stop), start), frames)
+        self.region = (start, stop)
+
+    def set_looping(self, looping):
+        self.looping = looping
+
+    def set_gain(self, gain):
+        self.gain = gain
+        for sound in self.sounds:
+            sound.set_volume(gain)
+
+    def seek(self, frame):
+        logging.info("Seeking is not supported by the mixer.Sound fallback")
+
+    def play(self):
+        self.stop()
+        if self.source is None:
+            return
+        self.ensure_mixer(self.source.sample_rate, min(self.source.channels, 2))
+        key = (self.source, self.region, self.looping, self.mixer_config)
+        start, stop = self.region
+        if self.sound_source == key:
+            self.start_channel()
+            for sound in self.sounds[1:]:
+                self.channel.queue(sound)
+        elif self.looping:
+            # A looping region has to be a single Sound so it can repeat seamlessly
+            self.sounds = [self.make_sound(self.source.read(start, stop - start))]
+            self.start_channel(loops=-1)
+        else:
+            # Start on the short head as soon as it is converted, convert the tail while it plays
+            head_stop = min(start + max(int(self.HEAD_SECONDS * self.source.sample_rate), 1), stop)
+            self.sounds = [self.make_sound(self.source.read(start, head_stop - start))]
+            self.start_channel()
+            if stop > head_stop:
+                tail = self.make_sound(self.source.read(head_stop, stop - head_stop))
+                tail.set_volume(self.gain)
+                self.channel.queue(tail)
+                self.sounds.append(tail)
+        self.sound_source = key
+
+    def start_channel(self, loops=0):
+        for sound in self.sounds:
+            sound.set_volume(self.gain)
+        self.channel = self.sounds[0].play(loops=loops)
+        self.start_time = time.perf_counter()
+        self.paused_elapsed = 0.0
+        self.paused = False
+
+    def elapsed_seconds(self):
+        if self.paused or self.start_time is None:
+            return self.paused_elapsed
+        return time.perf_counter() - self.start_time
+
+    def pause(self):
+        if self.channel is not None and not self.paused:
+            self.channel.pause()
+            self.paused_elapsed = self.elapsed_seconds()
+            self.paused = True
+
+    def resume(self):
+        if self.channel is not None and self.paused:
+            self.channel.unpause()
+            # Restart the clock so the time spent paused is not counted
+            self.start_time = time.perf_counter() - self.paused_elapsed
+            self.paused = False
+
+    def stop(self):
+        if self.channel is not None:
+            self.channel.stop()
+        self.channel = None
+        self.start_time = None
+        self.paused_elapsed = 0.0
+        self.paused = False
+
+    def is_active(self):
+        return self.channel is not None and (self.paused or self.channel.get_busy())
+
+    def playhead(self):
+        start, stop = self.region
+        offset = int(self.elapsed_seconds() * self.source.sample_rate) if self.source is not None else 0
+        if self.looping and stop > start:
+            offset %= stop - start
+        return min(start + offset, stop)
+
+    def stats(self):
+        return {'callbacks': 0, 'underruns': 0, 'mean_callback_ms': 0.0, 'max_callback_ms': 0.0, 'output_latency_ms': 0.0}
+
+    def close(self):
+        self.stop()
+
+
+def create_engine():
+    """The streaming engine when an SDL callback device can be opened, otherwise the mixer.Sound fallback."""
+    try:
+        engine = StreamingEngine()
+        # Open once up front so a device that cannot stream is found now, not on the first play
+        engine.open_device(44100, 1)
+        return engine
+    except Exception as e:
+        logging.info(f"Streaming playback unavailable ({e}), using pygame mixer Sounds")
+        return SoundEngine()
@@ -0,0 +1,203 @@
+from math import gcd
+import numpy as np
+
+FRAME = 2048
+# The larger of the two hops; four frames overlap at every sample
+MAX_HOP = FRAME // 4
+# Factors outside this range leave too little window overlap or too few frames
+MIN_RATIO, MAX_RATIO = 0.25, 4.0
+
+
+def hops_for(ratio):
+    """
+        (analysis hop, synthesis hop) for a stretch by ratio, the larger of the
+        two being MAX_HOP. Hops are whole samples, so the ratio is rounded,
+        within 2 cents near 1 and 7 cents at the extremes. Raises ValueError
+        outside MIN_RATIO to MAX_RATIO.
+    """
+    if not MIN_RATIO <= ratio <= MAX_RATIO:
+        raise ValueError(f"Factor {ratio:g} is outside {MIN_RATIO:g} to {MAX_RATIO:g}")
+    if ratio >= 1:
+        return int(round(MAX_HOP / ratio)), MAX_HOP
+    return MAX_HOP, int(round(MAX_HOP * ratio))
+
+
+def analyse(frames, window):
+    """Magnitudes and phases of the spectra of frames (..., frame), windowed, in single precision."""
+    import scipy.fft
+
+    spectra = scipy.fft.rfft(frames.astype(np.float32) * window, axis=-1)
+    return np.abs(spectra), np.angle(spectra)
+
+
+def phase_advance(phase, previous, omega, ratio):
+    """
+        How far each bin's synthesis phase moves from the frame before, for
+        frames with the given phases after frames with the previous ones: the
+        bin's measured frequency, its centre frequency omega plus the wrapped
+        deviation of the analysed advance, times ratio.
+    """
+    deviation = phase - previous - omega
+    deviation -= 2 * np.pi * np.round(deviation / (2 * np.pi))
+    return (omega + deviation) * ratio
+
+
+def overlap_add(magnitude, phase, window, hop):
+    """
+        Grains from magnitudes and phases (count, [channels,] bins) added every
+        hop samples, and the summed squared window at every sample to divide by.
+    """
+    import scipy.fft
+
+    # Wrapped to single precision, where cos and sin are several times faster than a complex exp
+    phase = (phase - 2 * np.pi * np.floor(phase / (2 * np.pi))).astype(np.float32)
+    spectra = np.empty(phase.shape, dtype=np.complex64)
+    np.multiply(magnitude, np.cos(phase), out=spectra.real)
+    np.multiply(magnitude, np.sin(phase), out=spectra.imag)
+    grains = scipy.fft.irfft(spectra, n=len(window), axis=-1) * window
+    grains = np.moveaxis(grains, -1, 1)  # (count, frame[, channels])
+    count, frame = grains.shape[:2]
+    # Grains cut into hop long pieces: piece k of grain i lands on output piece i + k
+    pieces = -(-frame // hop)
+    padded = np.zeros((count, pieces * hop) + grains.shape[2:], dtype=np.float32)
+    padded[:, :frame] = grains
+    padded = padded.reshape((count, pieces, hop) + grains.shape[2:])
+    window_squared = np.zeros(pieces * hop)
+    window_squared[:frame] = window ** 2
+    window_squared = window_squared.reshape(pieces, hop)
+    out = np.zeros((count + pieces - 1, hop) + grains.shape[2:])
+    weights = np.zeros((count + pieces - 1, hop))
+    for k in range(pieces):
+        out[k:k + count] += padded[:, k]
+        weights[k:k + count] += window_squared[k]
+    length = (count - 1) * hop + frame
+    return out.reshape((-1,) + grains.shape[2:])[:length], weights.reshape(-1)[:length]
+
+
+def normalize(out, weights):
+    """Overlap-added samples divided by their window weights, as float32."""
+    weights = np.maximum(weights, 1e-3)
+    return (out / (weights if out.ndim == 1 else weights[:, np.newaxis])).astype(np.float32)
+
+
+class PhaseVocoder:
+    """
+        Streaming STFT time stretch: Hann windowed frames of frame samples are
+        read every analysis_hop samples and overlap-added every synthesis_hop,
+        with each bin's phase advanced by its measured frequency so partials
+        stay continuous. Blocks are 1-D or frames x channels; process() takes
+        any number of samples and returns the output completed so far, and
+        the phases, unread input and overlap-add tail carry over to the next
+        call, so only about one frame is held between blocks. The first
+        frame keeps its analysed phases. The first and last half frame of
+        the output are weighted by the window edges; feed half a frame of
+        context either side where that matters.
+    """
+    def __init__(self, analysis_hop, synthesis_hop, frame=FRAME):
+        import scipy.signal as sig
+
+        self.frame = frame
+        self.analysis_hop = analysis_hop
+        self.synthesis_hop = synthesis_hop
+        self.window = sig.windows.hann(frame, sym=False).astype(np.float32)
+        self.omega = 2 * np.pi * np.arange(frame // 2 + 1) * analysis_hop / frame
+        self.pending = None  # input not yet covered by a whole frame
+        self.analysis_phase = None  # phase of the last frame read
+        self.synthesis_phase = None  # phase given to the last frame written
+        self.tail = None  # overlap-add sums past the output returned so far
+        self.tail_weights = None
+
+    def process(self, block):
+        block = np.asarray(block, dtype=np.float64)
+        x = block if self.pending is None else np.concatenate((self.pending, block))
+        count = (len(x) - self.frame) // self.analysis_hop + 1 if len(x) >= self.frame else 0
+        if count <= 0:
+            self.pending = x
+            return np.zeros((0,) + x.shape[1:], dtype=np.float32)
+        self.pending = x[count * self.analysis_hop:]
+
+        frames = np.lib.stride_tricks.sliding_window_view(x, self.frame, axis=0)[::self.analysis_hop][:count]
+        magnitude, phase = analyse(frames, self.window)
+        previous = phase[:1] if self.analysis_phase is None else self.analysis_phase[np.newaxis]
+        advance = phase_advance(phase, np.concatenate((previous, phase[:-1])), self.omega,
+                                self.synthesis_hop / self.analysis_hop)
+        start = phase[0] - advance[0] if self.synthesis_phase is None else self.synthesis_phase
+        synthesis = start + np.cumsum(advance, axis=0)
+        self.analysis_phase, self.synthesis_phase = phase[-1], synthesis[-1]
+
+        out, weights = overlap_add(magnitude, synthesis, self.window, self.synthesis_hop)
+        if self.tail is not None:
+            out[:len(self.tail)] += self.tail
+            weights[:len(self.tail_weights)] += self.tail_weights
+        done = count * self.synthesis_hop
+        self.tail, self.tail_weights = out[done:], weights[done:]
+        return normalize(out[:done], weights[:done])
+
+    def flush(self):
+        """The rest of the overlap-add tail, once the input has ended."""
+        if self.tail is None:
+            return np.zeros(0, dtype=np.float32)
+        out = normalize(self.tail, self.tail_weights)
+        self.tail = self.tail_weights = None
+        return out
+
+
+def resample_to(samples, up, down):
+    """samples resampled by up / down with a polyphase filter, along the first axis."""
+    import scipy.signal as sig
+
+    divisor = gcd(up, down)
+    up, down = up // divisor, down // divisor
+    if up == down:
+        return samples
+    return sig.resample_poly(samples, up, down, axis=0)
+
+
+def stream_padded(vocoder, samples, block_frames):
+    """
+        The vocoder's whole output for samples fed in blocks, with half a frame
+        of silence either side so the window edges fall outside the signal.
+        Frame m is then centred on input sample m * analysis_hop and on output
+        sample m * synthesis_hop + FRAME / 2.
+    """
+    padding = np.zeros((FRAME // 2,) + np.shape(samples)[1:])
+    parts = [vocoder.process(padding)]
+    for start in range(0, len(samples), block_frames):
+        parts.append(vocoder.process(samples[start:start + block_frames]))
+    parts.append(vocoder.process(padding))
+    parts.append(vocoder.flush())
+    return np.concatenate(parts)
+
+
+def time_stretch(samples, ratio, block_frames=1 << 16):
+    """
+        samples (1-D or frames x channels) stretched to about ratio times the
+        length at the same pitch, streamed in blocks and aligned with the input.
+    """
+    analysis_hop, synthesis_hop = hops_for(ratio)
+    stretched = stream_padded(PhaseVocoder(analysis_hop, synthesis_hop), samples, block_frames)
+    length = round(len(samples) * synthesis_hop / analysis_hop)
+    return fit(stretched[FRAME // 2:], length).astype(np.float32)
+
+
+def pitch_shift(samples, factor, block_frames=1 << 16):
+    """
+        samples (1-D or frames x channels) with every frequency multiplied by
+        factor at the same length: a phase vocoder stretch by factor streamed
+        in blocks, resampled back to the original length and aligned with the
+        input.
+    """
+    analysis_hop, synthesis_hop = hops_for(factor)
+    stretched = stream_padded(PhaseVocoder(analysis_hop, synthesis_hop), samples, block_frames)
+    # Resampling from a frame centre puts every output sample on an input sample
+    skip = FRAME // 2 % synthesis_hop
+    shifted = resample_to(stretched[skip:], analysis_hop, synthesis_hop)
+    offset = FRAME // 2 // synthesis_hop * analysis_hop
+    return fit(shifted[offset:], len(samples)).astype(np.float32)
+
+
+def fit(samples, length):
+    """samples cut or zero padded to length frames."""
+    if len(samples) >= length:
+        return samples[:length]
+    return np.concatenate((samples, np.zeros((length - len(samples),) + samples.shape[1:], dtype=samples.dtype)))
@@ -0,0 +1,238 @@
+import os
+import glob
+import hashlib
+import logging
+import threading
+import numpy as np
+
+
+class PeakPyramid:
+    """
+        Min/max summaries of a waveform at several resolutions, the way audio
+        editors draw overviews. Level 0 holds the min and max of every
+        BASE_BLOCK samples; each following level merges LEVEL_FACTOR blocks of
+        the one below. Drawing picks the coarsest level that still has at least
+        one block per pixel, so the number of plotted points depends on the
+        widget width rather than the file length.
+    """
+    BASE_BLOCK = 64
+    LEVEL_FACTOR = 4
+    MIN_LEVEL_BLOCKS = 1024
+    # Long recordings start from a coarser base level so the pyramid stays a few MB
+    MAX_BASE_BLOCKS = 1 << 20
+    SOURCE_CHUNK_FRAMES = 1 << 20
+
+    def __init__(self, length, levels):
+        self.length = length
+        self.levels = levels  # [(block_size, mins, maxs)], finest first
+
+    @classmethod
+    def build(cls, data):
+        """From an array, or streamed from anything with the read(start, count) source protocol."""
+        if hasattr(data, 'read'):
+            return cls.from_source(data)
+        return cls.from_samples(data)
+
+    @classmethod
+    def from_samples(cls, data):
+        data = np.asarray(data)
+        mins, maxs = cls.reduce_blocks(data, data, cls.BASE_BLOCK)
+        return cls.from_base_level(len(data), cls.BASE_BLOCK, mins, maxs)
+
+    @classmethod
+    def from_source(cls, source, on_chunk=None):
+        """
+            Build the pyramid reading SOURCE_CHUNK_FRAMES at a time, so memory does not grow with the length.
+            on_chunk(fraction done) is called after every chunk and may raise to abandon the build.
+        """
+        block_size = cls.BASE_BLOCK
+        while source.frames // block_size > cls.MAX_BASE_BLOCKS:
+            block_size *= cls.LEVEL_FACTOR
+        chunk_frames = max(cls.SOURCE_CHUNK_FRAMES // block_size, 1) * block_size
+        mins, maxs = [], []
+        for start in range(0, source.frames, chunk_frames):
+            window = np.asarray(source.read(start, chunk_frames))
+            chunk_mins, chunk_maxs = cls.reduce_blocks(window, window, block_size)
+            mins.append(chunk_mins)
+            maxs.append(chunk_maxs)
+            if on_chunk is not None:
+                on_chunk(min(start + chunk_frames, source.frames) / source.frames)
+        if not mins:
+            return cls.from_samples(np.zeros(0, dtype=np.float32))
+        return cls.from_base_level(source.frames, block_size, np.concatenate(mins), np.concatenate(maxs))
+
+    @classmethod
+    def from_base_level(cls, length, block_size, mins, maxs):
+        levels = [(block_size, mins, maxs)]
+        while len(mins) > cls.MIN_LEVEL_BLOCKS:
+            mins, maxs = cls.reduce_blocks(mins, maxs, cls.LEVEL_FACTOR)
+            block_size *= cls.LEVEL_FACTOR
+            levels.append((block_size, mins, maxs))
+        return cls(length, levels)
+
+    @staticmethod
+    def reduce_blocks(mins, maxs, factor):
+        """Min of mins and max of maxs over consecutive groups of factor values; the last group may be short."""
+        if len(mins) == 0:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32)
+        full = len(mins) // factor * factor
+        new_mins = mins[:full].reshape(-1, factor).min(axis=1)
+        new_maxs = maxs[:full].reshape(-1, factor).max(axis=1)
+        if full < len(mins):
+            new_mins = np.append(new_mins, mins[full:].min())
+            new_maxs = np.append(new_maxs, maxs[full:].max())
+        return new_mins.astype(np.float32), new_maxs.astype(np.float32)
+
+    def abs_max(self):
+        """Largest absolute sample value, read off the coarsest level."""
+        _, mins, maxs = self.levels[-1]
+        if len(mins) == 0:
+            return 0.0
+        return float(max(maxs.max(), -mins.min()))
+
+    def level_for(self, samples_per_pixel):
+        """The coarsest level whose blocks are no wider than a pixel, or None to draw raw samples."""
+        chosen = None
+        for level in self.levels:
+            if level[0] <= samples_per_pixel:
+                chosen = level
+        return chosen
+
+    def envelope(self, start, stop, samples_per_pixel):
+        """
+            Block centres with their mins and maxs covering samples [start, stop),
+            or None when the zoom is deep enough that raw samples should be drawn.
+        """
+        level = self.level_for(samples_per_pixel)
+        if level is None:
+            return None
+        block_size, mins, maxs = level
+        first = max(int(start), 0) // block_size
+        last = -(-min(int(stop), self.length) // block_size)
+        x = np.arange(first, last) * block_size + block_size / 2
+        return x, mins[first:last], maxs[first:last]
+
+    @classmethod
+    def window_envelope(cls, data, start, stop, block_size):
+        """Like envelope(), but reduced on the fly from data for zooms finer than the base level."""
+        block_size = max(int(block_size), 1)
+        first = max(int(start), 0) // block_size
+        window = np.asarray(data[first * block_size:min(int(stop), len(data))])
+        mins, maxs = cls.reduce_blocks(window, window, block_size)
+        x = (np.arange(len(mins)) + first) * block_size + block_size / 2
+        return x, mins, maxs
+
+    def save(self, path):
+        arrays = {'length': np.array([self.length])}
+        for index, (block_size, mins, maxs) in enumerate(self.levels):
+            arrays[f'block_{index}'] = np.array([block_size])
+            arrays[f'mins_{index}'] = mins
+            arrays[f'maxs_{index}'] = maxs
+        # Write then rename, so a reader never sees a half-written file
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            levels = []
+            index = 0
+            while f'block_{index}' in arrays:
+                levels.append((int(arrays[f'block_{index}'][0]), arrays[f'mins_{index}'], arrays[f'maxs_{index}']))
+                index += 1
+            return cls(int(arrays['length'][0]), levels)
+
+
+class WaveformCache:
+    """
+        On-disk store of PeakPyramids, one .npz per file, named after a hash
+        of its path followed by its size and mtime. An edited or replaced file
+        gets a new entry that takes the place of the old one. Reading an entry
+        marks it as used; once the store exceeds max_bytes the entries used
+        least recently are deleted.
+    """
+    DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path_prefix(self, file_path):
+        return os.path.join(self.cache_dir, hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest())
+
+    def cache_path(self, file_path):
+        stat_result = os.stat(file_path)
+        return f"{self.path_prefix(file_path)}-{stat_result.st_size}-{stat_result.st_mtime_ns}.npz"
+
+    def entries_for(self, file_path):
+        return glob.glob(glob.escape(self.path_prefix(file_path)) + '-*.npz')
+
+    def get(self, file_path, data):
+        """
+            Load the pyramid for file_path, building and storing it from data on a miss.
+            Safe to call from worker threads, e.g. to build it before the plot needs it.
+        """
+        try:
+            cache_path = self.cache_path(file_path)
+        except OSError:
+            return PeakPyramid.build(data)
+
+        if os.path.exists(cache_path):
+            try:
+                peaks = PeakPyramid.load(cache_path)
+                if peaks.length == len(data):
+                    os.utime(cache_path)
+                    return peaks
+            except Exception as e:
+                logging.error(f"Discarding unreadable waveform cache {cache_path}: {e}")
+
+        peaks = PeakPyramid.build(data)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            peaks.save(cache_path)
+        except OSError as e:
+            logging.error(f"Failed to write waveform cache for {file_path}: {e}")
+            return peaks
+        for stale_path in self.entries_for(file_path):
+            if stale_path != cache_path:
+                self.unlink(stale_path)
+        self.evict()
+        return peaks
+
+    def remove(self, file_path):
+        """Forget file_path, e.g. once it has been deleted from the library."""
+        for cache_path in self.entries_for(file_path):
+            self.unlink(cache_path)
+
+    def evict(self):
+        """Delete the least recently used entries until the store fits in max_bytes."""
+        entries = []
+        try:
+            with os.scandir(self.cache_dir) as scan:
+                for entry in scan:
+                    if entry.name.endswith('.npz'):
+                        try:
+                            stat_result = entry.stat()
+                        except OSError:
+                            continue  # removed by another thread meanwhile
+                        entries.append((stat_result.st_mtime_ns, stat_result.st_size, entry.path))
+        except OSError as e:
+            logging.error(f"Failed to read waveform cache {self.cache_dir}: {e}")
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, cache_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self.unlink(cache_path)
+            total -= size
+
+    @staticmethod
+    def unlink(cache_path):
+        try:
+            os.unlink(cache_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logging.error(f"Failed to remove waveform cache {cache_path}: {e}")
@@ -0,0 +1,22 @@
+"""
+    The data and DSP side of Epoch123, usable without Qt: decoding and lazy
+    file buffers, the edit graph and its filters and phase vocoder,
+    waveform peaks, playback engines, the library scanner and the
+    metadata database. Nothing in this package imports PySide6, so
+    command line tools such as batch.py can use it headless.
+
+    scipy, pygame and mutagen take longer to import than everything else
+    the window needs before it first paints, so modules import them in the
+    functions that use them rather than at load time.
+"""
+
+
+def preload():
+    """
+        Import the heavy modules the package defers, e.g. on a background
+        thread once the window is up, so the first edit or playback does not
+        wait for them.
+    """
+    import scipy.fft  # noqa: F401
+    import scipy.signal  # noqa: F401
+    import pygame  # noqa: F401
@@ -0,0 +1,108 @@
+"""
+    Filter throughput in samples per second (frames x channels) for a
+    44.1 kHz stereo signal, comparing the old whole-array filtfilt on (b, a)
+    coefficients with the second-order-section engine in Filters and
+    EditGraph.FilterNode.
+
+    Rows:
+      filtfilt (b, a)      the filter as the editor used to apply it, per channel
+      sosfiltfilt          the same zero-phase filter from SOS, whole array
+      BlockFilter stream   causal SOS over BLOCK_FRAMES blocks with carried
+                           state, both channels at once; what a streaming
+                           effect would cost, in constant memory
+      FilterNode render    zero-phase, rendered in RENDER_CHUNK_FRAMES chunks
+                           as saving does, per channel
+      FilterNode tiles     zero-phase, single tiles in random order with a
+                           cold cache, as the plot and playback read them
+
+    Then the largest deviation of FilterNode from sosfiltfilt, and how a
+    low cutoff (b, a) filter compares with its SOS form, where (b, a)
+    coefficients lose precision.
+
+    Run from the repository root:
+        python3 benchmarks/bench_filter.py [seconds]
+"""
+import os
+import sys
+
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+
+import time
+import numpy as np
+import scipy.signal as sig
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Epoch123'))
+from core.AudioBuffer import AudioBuffer
+from core.EditGraph import ChannelSource, FilterNode, SourceNode, tile_cache
+from core.Filters import BlockFilter, design_sos
+
+SAMPLE_RATE = 44100
+BLOCK_FRAMES = 4096
+CUTOFF = [300.0, 3000.0]
+RANDOM_TILES = 64
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def report(name, samples, seconds):
+    print(f"{name:<20} {seconds:7.3f} s  {samples / seconds / 1e6:8.1f} M samples/s")
+
+
+def stream(sos, samples):
+    block_filter = BlockFilter(sos)
+    out = np.empty_like(samples)
+    for start in range(0, len(samples), BLOCK_FRAMES):
+        out[start:start + BLOCK_FRAMES] = block_filter.process(samples[start:start + BLOCK_FRAMES])
+    return out
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 300.0
+    rng = np.random.default_rng(0)
+    samples = (rng.standard_normal((int(seconds * SAMPLE_RATE), 2)) * 0.2).astype(np.float32)
+    audio = AudioBuffer(samples, SAMPLE_RATE)
+    total = samples.size
+    print(f"{seconds:g} s stereo at {SAMPLE_RATE} Hz, band pass {CUTOFF[0]:g}-{CUTOFF[1]:g} Hz, order 4")
+
+    b, a = sig.butter(4, CUTOFF, btype='bandpass', fs=SAMPLE_RATE)
+    _, elapsed = timed(lambda: [sig.filtfilt(b, a, samples[:, channel]) for channel in range(2)])
+    report("filtfilt (b, a)", total, elapsed)
+
+    sos = design_sos('bandpass', CUTOFF, SAMPLE_RATE)
+    reference, elapsed = timed(lambda: sig.sosfiltfilt(sos, samples, axis=0))
+    report("sosfiltfilt", total, elapsed)
+
+    _, elapsed = timed(lambda: stream(sos, samples))
+    report("BlockFilter stream", total, elapsed)
+
+    tile_cache.clear()
+    nodes = [FilterNode(SourceNode(ChannelSource(audio, channel), SAMPLE_RATE), 'bandpass', CUTOFF)
+             for channel in range(2)]
+    rendered, elapsed = timed(lambda: np.column_stack([node.render() for node in nodes]))
+    report("FilterNode render", total, elapsed)
+    print(f"{'':<20} max deviation from sosfiltfilt {np.abs(rendered - reference).max():.2e}")
+
+    tile_cache.clear()
+    node = FilterNode(SourceNode(ChannelSource(audio, 0), SAMPLE_RATE), 'bandpass', CUTOFF)
+    tiles = rng.choice(node.frames // node.TILE_FRAMES, RANDOM_TILES, replace=False)
+    _, elapsed = timed(lambda: [node.tile(int(index)) for index in tiles])
+    report("FilterNode tiles", RANDOM_TILES * node.TILE_FRAMES, elapsed)
+    print(f"{'':<20} {elapsed / RANDOM_TILES * 1000:.2f} ms per cold {node.TILE_FRAMES}-frame tile")
+
+    # Low cutoffs push the poles of a (b, a) filter towards 1, where its coefficients lose precision
+    impulse = np.zeros(SAMPLE_RATE)
+    impulse[0] = 1
+    for order in (4, 8):
+        b, a = sig.butter(order, 10, btype='lowpass', fs=SAMPLE_RATE)
+        sos = sig.butter(order, 10, btype='lowpass', fs=SAMPLE_RATE, output='sos')
+        error = np.abs(sig.lfilter(b, a, impulse) - sig.sosfilt(sos, impulse)).max()
+        print(f"10 Hz low pass order {order}: (b, a) impulse response deviates from SOS by {error:.2e}")
+
+
+if __name__ == '__main__':
+    main()
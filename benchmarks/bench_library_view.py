@@ -0,0 +1,122 @@
+"""
+    Speed of the database-backed library view on a large library: counting
+    the files, the first page in every sort order (what a click on a column
+    header costs), paging through the whole library the way a view scrolling
+    to the end does, and the same through LibraryModel and a QTableView.
+
+    The library is made up: num_files rows spread over 100 folders, half of
+    them tagged, in a temporary database.
+
+    Run from the repository root (QT_QPA_PLATFORM=offscreen works headless):
+        python3 benchmarks/bench_library_view.py [num_files]
+"""
+import os
+import sys
+import random
+import statistics
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Epoch123'))
+from core.MetaDataDB import MetaDataDB, LIBRARY_SORT_KEYS
+
+ROOT = '/bench/library'
+
+
+def fill(db, count):
+    rng = random.Random(0)
+    rows = [(f"sound_{i}.wav", f"{ROOT}/folder_{i % 100}/sound_{i}.wav", rng.choice((1, 2)),
+             rng.choice((22050, 44100, 48000, 96000)), round(rng.uniform(1, 50000), 2), round(rng.uniform(0.1, 600), 2))
+            for i in range(count)]
+    db.insert_many(rows)
+    db.tag_many((row[1], f"tag_{rng.randrange(40)}") for row in rows[::2])
+
+
+def timed_ms(func, repeat=5):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def walk(db, sort_key, descending, page_size=256):
+    """Page through every file; returns (pages, total seconds, slowest page in ms)."""
+    after, pages, slowest = None, 0, 0.0
+    start = time.perf_counter()
+    while True:
+        page_start = time.perf_counter()
+        page = db.library_page(ROOT, sort_key, descending, after=after, limit=page_size)
+        slowest = max(slowest, (time.perf_counter() - page_start) * 1000)
+        if not page:
+            return pages, time.perf_counter() - start, slowest
+        pages += 1
+        after = page[-1][:2]
+
+
+def bench_model(db, count):
+    from PySide6.QtCore import Qt
+    from PySide6.QtWidgets import QApplication, QHeaderView, QTableView
+    from LibraryModel import LibraryModel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    start = time.perf_counter()
+    model = LibraryModel(db, ROOT)
+    # Set up as FileNavigator sets up its file list
+    view = QTableView()
+    view.verticalHeader().hide()
+    view.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+    view.setModel(model)
+    view.resize(500, 800)
+    view.show()
+    app.processEvents()
+    print(f"{'model + view to first paint':<36} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    for column, (header, _) in enumerate(LibraryModel.COLUMNS):
+        for order in (Qt.AscendingOrder, Qt.DescendingOrder):
+            start = time.perf_counter()
+            view.sortByColumn(column, order)
+            app.processEvents()
+            label = f"sort by {header} {'desc' if order == Qt.DescendingOrder else 'asc'}"
+            print(f"{label:<36} {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    # What dragging the scroll bar to the end repeatedly does: one fetchMore per page
+    fetches, slowest = 0, 0.0
+    start = time.perf_counter()
+    while model.canFetchMore():
+        fetch_start = time.perf_counter()
+        model.fetchMore()
+        view.scrollToBottom()
+        app.processEvents()
+        slowest = max(slowest, (time.perf_counter() - fetch_start) * 1000)
+        fetches += 1
+    elapsed = time.perf_counter() - start
+    print(f"{'scroll to end of ' + str(model.rowCount()) + ' rows':<36} {elapsed:8.2f} s   "
+          f"{fetches} fetches, {elapsed / max(fetches, 1) * 1000:.2f} ms mean, {slowest:.2f} ms worst")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MetaDataDB(db_path=os.path.join(tmp, 'bench.db'))
+        start = time.perf_counter()
+        fill(db, count)
+        print(f"{'build library of ' + str(count) + ' files':<36} {time.perf_counter() - start:8.2f} s")
+
+        print(f"{'count_library':<36} {timed_ms(lambda: db.count_library(ROOT)):8.2f} ms")
+        for sort_key in LIBRARY_SORT_KEYS:
+            for descending in (False, True):
+                label = f"first page by {sort_key} {'desc' if descending else 'asc'}"
+                print(f"{label:<36} {timed_ms(lambda: db.library_page(ROOT, sort_key, descending)):8.2f} ms")
+
+        pages, seconds, slowest = walk(db, 'duration', True)
+        print(f"{'page through all, by duration desc':<36} {seconds:8.2f} s   "
+              f"{pages} pages, {seconds / pages * 1000:.2f} ms mean, {slowest:.2f} ms worst")
+
+        bench_model(db, count)
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""
+    Rows/sec written to the metadata database, before and after the persistent
+    connection rewrite of MetaDataDB.
+
+    "legacy" replays what MetaDataDB.insert_metadata used to do per file: open
+    a connection to check for the path, close it, open another to insert,
+    commit and close. The other rows use the current MetaDataDB API.
+
+    Run from the repository root:
+        python3 benchmarks/bench_metadata_db.py [num_rows]
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Epoch123'))
+from core.MetaDataDB import MetaDataDB
+
+
+def make_rows(count, prefix):
+    return [(f"{prefix}_{i}.wav", f"/bench/{prefix}/{prefix}_{i}.wav", 2, 44100, 512.0, 3.0) for i in range(count)]
+
+
+def legacy_insert(db_path, row):
+    conn = sqlite3.connect(db_path)
+    exists = conn.execute("SELECT 1 FROM audio_files WHERE file_path = ?", (row[1],)).fetchone() is not None
+    conn.close()
+    if not exists:
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            INSERT INTO audio_files (file_name, file_path, num_channels, sample_rate, file_size, duration)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', row)
+        conn.commit()
+        conn.close()
+
+
+def timed(label, count, func):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<32} {count:>7} rows  {elapsed:8.3f} s  {count / elapsed:>10.0f} rows/sec")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    with tempfile.TemporaryDirectory() as tmp:
+        db = MetaDataDB(db_path=os.path.join(tmp, 'bench.db'))
+
+        legacy_rows = make_rows(count, 'legacy')
+        timed("legacy (connection per call)", count, lambda: [legacy_insert(db.db_path, row) for row in legacy_rows])
+
+        single_rows = make_rows(count, 'single')
+        timed("insert_metadata (persistent)", count, lambda: [db.insert_metadata(*row) for row in single_rows])
+
+        bulk_count = count * 10
+        bulk_rows = make_rows(bulk_count, 'bulk')
+        timed("insert_many (one transaction)", bulk_count, lambda: db.insert_many(bulk_rows))
+
+        tag_pairs = [(row[1], f"tag{i % 20}") for i, row in enumerate(bulk_rows)]
+        timed("tag_many (one transaction)", bulk_count, lambda: db.tag_many(tag_pairs))
+
+        timed("delete_many (one transaction)", bulk_count, lambda: db.delete_many(row[1] for row in bulk_rows))
+        db.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+    How many concurrent 48 kHz stereo tracks MixerSource can mix on one core
+    within the real-time budget of a StreamingEngine block.
+
+    Each row times MixerSource.read() for BLOCK_FRAMES frames with N tracks
+    (one in four at 44.1 kHz, so resampled when added). A count is
+    sustainable when the 99th percentile block time stays under half the
+    block duration, leaving the rest of the callback budget as margin
+    against underruns. Mixing runs on the SDL audio thread, so numpy is
+    limited to one thread.
+
+    The largest sustainable count is then streamed through a StreamingEngine
+    for a few seconds and halved until the stream keeps up: at most 1% of
+    callbacks late (scheduler jitter alone produces the odd late callback)
+    and at least 95% of the expected callbacks delivered.
+
+    Run from the repository root (SDL_AUDIODRIVER=dummy works headless):
+        python3 benchmarks/bench_mixer.py [seconds_per_track]
+"""
+import os
+import sys
+
+os.environ.setdefault('OMP_NUM_THREADS', '1')
+os.environ.setdefault('OPENBLAS_NUM_THREADS', '1')
+
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Epoch123'))
+from core.Mixer import MixerSource
+from core.PlaybackEngine import ArraySource, StreamingEngine
+
+SAMPLE_RATE = 48000
+BLOCK_FRAMES = StreamingEngine.BLOCK_FRAMES
+TRACK_COUNTS = (1, 4, 16, 64, 256, 512, 1024, 2048)
+# Distinct sources generated; larger counts reuse them at different offsets to bound memory
+DISTINCT_SOURCES = 64
+STREAM_SECONDS = 3
+
+
+def make_track(seconds, sample_rate):
+    samples = (np.random.rand(int(seconds * sample_rate), 2) - 0.5).astype(np.float32)
+    return ArraySource(samples, sample_rate)
+
+
+def block_times(mixer, blocks):
+    times = []
+    position = 0
+    for _ in range(blocks):
+        started = time.perf_counter()
+        mixer.read(position, BLOCK_FRAMES)
+        times.append(time.perf_counter() - started)
+        position = (position + BLOCK_FRAMES) % max(mixer.frames - BLOCK_FRAMES, 1)
+    return np.array(times)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20.0
+    budget = BLOCK_FRAMES / SAMPLE_RATE
+    print(f"block {BLOCK_FRAMES} frames = {budget * 1000:.2f} ms real time, sustainable if p99 < {budget * 500:.2f} ms")
+
+    sources = [make_track(seconds, 44100 if i % 4 == 3 else SAMPLE_RATE) for i in range(DISTINCT_SOURCES)]
+    started = time.perf_counter()
+    mixer = MixerSource(SAMPLE_RATE, channels=2)
+    for source in sources:
+        mixer.add_track(source)
+    resampled = [track.source for track in mixer.tracks]
+    print(f"added {len(sources)} tracks ({len(sources) // 4} resampled) in {time.perf_counter() - started:.2f} s")
+
+    sustained = 0
+    for count in TRACK_COUNTS:
+        mixer.tracks = []
+        for i in range(count):
+            mixer.add_track(resampled[i % len(resampled)], gain=1 / 16, offset=i * 7)
+        times = block_times(mixer, 2000)
+        p99 = np.percentile(times, 99)
+        ok = p99 < budget / 2
+        if ok:
+            sustained = count
+        print(f"{count:>5} tracks  mean {times.mean() * 1000:6.3f} ms  p99 {p99 * 1000:6.3f} ms  "
+              f"{'ok' if ok else 'over budget'}")
+
+    # Block timing alone is optimistic: halve the count until a real stream keeps up
+    candidates = mixer.tracks
+    expected_callbacks = STREAM_SECONDS * SAMPLE_RATE / BLOCK_FRAMES
+    while sustained:
+        mixer.tracks = candidates[:sustained]
+        engine = StreamingEngine()
+        engine.load(mixer)
+        engine.play()
+        time.sleep(STREAM_SECONDS)
+        engine.stop()
+        stats = engine.stats()
+        engine.close()
+        print(f"streamed {sustained:>4} tracks for {STREAM_SECONDS} s: {stats['callbacks']}/{expected_callbacks:.0f} callbacks, "
+              f"{stats['underruns']} underruns, max callback {stats['max_callback_ms']:.2f} ms")
+        if stats['underruns'] <= stats['callbacks'] * 0.01 and stats['callbacks'] >= expected_callbacks * 0.95:
+            break
+        sustained //= 2
+    print(f"sustains {sustained} concurrent 48 kHz stereo tracks per core")
+
+
+if __name__ == '__main__':
+    main()
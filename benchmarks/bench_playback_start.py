@@ -0,0 +1,60 @@
+"""
+    Time from a play call to the first block of real samples reaching the
+    audio device, for forward, reverse and region playback at several file
+    lengths. Reverse and region playback read strided views of the data, so
+    the start-up time should not grow with the file length.
+
+    Run from the repository root (SDL_AUDIODRIVER=dummy works headless):
+        python3 benchmarks/bench_playback_start.py
+"""
+import os
+import sys
+import time
+import threading
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Epoch123'))
+from core.PlaybackEngine import ArraySource, StreamingEngine
+
+SAMPLE_RATE = 44100
+
+
+def time_to_first_block(engine, start_playback):
+    """Seconds from start_playback() until fill() has written a non-silent block."""
+    first_block = threading.Event()
+    fill = engine.fill
+
+    def watched_fill(device, stream):
+        fill(device, stream)
+        if np.any(np.asarray(stream).view(np.float32)):
+            first_block.set()
+
+    engine.fill = watched_fill
+    engine.close()  # Reopen so SDL calls the watched callback
+    started = time.perf_counter()
+    start_playback()
+    first_block.wait(5)
+    elapsed = time.perf_counter() - started
+    engine.stop()
+    engine.fill = fill
+    return elapsed
+
+
+def main():
+    engine = StreamingEngine()
+    for minutes in (0.5, 5, 60):
+        data = (np.random.rand(int(SAMPLE_RATE * 60 * minutes)) - 0.5).astype(np.float32)
+        source = ArraySource(data, SAMPLE_RATE)
+        cases = {
+            'forward': lambda: (engine.load(source), engine.play()),
+            'reverse': lambda: (engine.load(source.reversed()), engine.play()),
+            'region': lambda: (engine.load(source), engine.set_region(len(data) // 3, len(data) // 2), engine.play()),
+        }
+        for label, start_playback in cases.items():
+            elapsed = time_to_first_block(engine, start_playback)
+            print(f"{minutes:>5} min  {label:<8} first block after {elapsed * 1000:7.2f} ms")
+    engine.close()
+
+
+if __name__ == '__main__':
+    main()
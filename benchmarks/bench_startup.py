@@ -0,0 +1,68 @@
+"""
+    Cold start time of the application: from launching a fresh
+    `python3 Epoch123/app.py` process to the first paint event of any
+    widget, which is when the window appears. Every run is a new
+    interpreter, so module imports are never cached in the process; the
+    operating system's file cache is warm after the first run, which is
+    why the first run is reported apart.
+
+    The app is run as __main__ with QApplication replaced by a subclass
+    that exits at the first paint; nothing else about start-up changes.
+    Give another app.py, e.g. from a checkout of an older revision, to
+    compare.
+
+    Run from the repository root (QT_QPA_PLATFORM=offscreen and
+    SDL_AUDIODRIVER=dummy work headless):
+        python3 benchmarks/bench_startup.py [path/to/app.py] [runs]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+# Runs in the child: app.py as __main__, exiting at the first paint
+HARNESS = '''
+import os, runpy, sys
+from PySide6 import QtWidgets
+from PySide6.QtCore import QEvent
+
+class FirstPaintApplication(QtWidgets.QApplication):
+    def notify(self, receiver, event):
+        if event.type() == QEvent.Paint:
+            print("painted", flush=True)
+            os._exit(0)
+        return super().notify(receiver, event)
+
+QtWidgets.QApplication = FirstPaintApplication
+app_path = sys.argv[1]
+sys.argv = [app_path]
+sys.path.insert(0, os.path.dirname(os.path.abspath(app_path)))
+runpy.run_path(app_path, run_name='__main__')
+'''
+
+
+def time_to_first_paint(app_path):
+    started = time.perf_counter()
+    child = subprocess.Popen([sys.executable, '-c', HARNESS, app_path], stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, text=True)
+    for line in child.stdout:
+        if line.strip() == "painted":
+            elapsed = time.perf_counter() - started
+            child.wait()
+            return elapsed
+    child.wait()
+    raise RuntimeError(f"{app_path} exited with status {child.returncode} before painting")
+
+
+def main():
+    app_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join('Epoch123', 'app.py')
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 7
+    first = time_to_first_paint(app_path)
+    times = [time_to_first_paint(app_path) for _ in range(runs)]
+    print(f"{app_path}: first run {first:.3f} s; over {runs} more runs "
+          f"median {statistics.median(times):.3f} s, min {min(times):.3f} s, max {max(times):.3f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""
+    Compare two start-up profiles written by app.py's --profile-startup,
+    e.g. from the previous release and the current tree: time to first
+    paint, every phase, and the imports whose cumulative time changed most.
+
+    Run from the repository root:
+        python3 Epoch123/app.py --profile-startup=old.json --profile-startup-quit
+        python3 benchmarks/compare_startup.py old.json new.json [imports to list]
+"""
+import sys
+import json
+from collections import defaultdict
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def top_level_imports(profile):
+    """Cumulative seconds per module imported directly by the app's own modules, summed over threads."""
+    totals = defaultdict(float)
+    for entry in profile['imports']:
+        if entry['depth'] == 0:
+            totals[entry['module']] += entry['seconds']
+    return totals
+
+
+def row(name, old, new):
+    old_text = '-' if old is None else f"{old:8.3f}"
+    new_text = '-' if new is None else f"{new:8.3f}"
+    change = '' if old is None or new is None else f"{new - old:+8.3f}"
+    print(f"{name:<40} {old_text:>8} {new_text:>8} {change:>8}")
+
+
+def main():
+    old, new = load(sys.argv[1]), load(sys.argv[2])
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 15
+    print(f"{'seconds':<40} {'old':>8} {'new':>8} {'change':>8}")
+    row("first paint", old['first_paint_seconds'], new['first_paint_seconds'])
+    for name in dict.fromkeys(list(old['marks']) + list(new['marks'])):
+        if name != 'first paint':
+            row(f"mark: {name}", old['marks'].get(name), new['marks'].get(name))
+
+    old_phases = {phase['name']: phase['seconds'] for phase in old['phases']}
+    new_phases = {phase['name']: phase['seconds'] for phase in new['phases']}
+    for name in dict.fromkeys(list(old_phases) + list(new_phases)):
+        row(f"phase: {name}", old_phases.get(name), new_phases.get(name))
+
+    old_imports, new_imports = top_level_imports(old), top_level_imports(new)
+    modules = sorted(set(old_imports) | set(new_imports),
+                     key=lambda module: -abs(new_imports.get(module, 0.0) - old_imports.get(module, 0.0)))
+    for module in modules[:count]:
+        row(f"import: {module}", old_imports.get(module), new_imports.get(module))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+import os
+import sys
+
+import pytest
+
+# The application's modules import each other as top-level modules from Epoch123/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Epoch123'))
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+
+@pytest.fixture(scope='session')
+def qapp():
+    """The QApplication for tests of Qt classes; core tests never ask for it."""
+    from PySide6.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def wait_until(qapp):
+    """Process Qt events until condition() holds, failing after timeout seconds."""
+    import time
+
+    def wait(condition, timeout=5.0):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                pytest.fail("timed out waiting for the condition")
+            qapp.processEvents()
+            time.sleep(0.005)
+    return wait
@@ -0,0 +1,59 @@
+import numpy as np
+
+from core.AudioBuffer import AudioBuffer
+from core.AudioCache import AudioCache
+
+
+def samples(frames, dtype=np.float32):
+    return np.zeros(frames, dtype=dtype)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AudioCache(max_bytes=3 * 4000)
+    for name in 'abc':
+        cache.put(name, samples(1000), 8000, None)
+    assert cache.get('a') is not None
+    cache.put('d', samples(1000), 8000, None)
+    assert 'b' not in cache and {'a', 'c', 'd'} <= set(cache.entries)
+    assert cache.current_bytes == 3 * 4000
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entry_larger_than_the_budget_is_not_cached():
+    cache = AudioCache(max_bytes=1000)
+    cache.put('small', samples(10), 8000, None)
+    cache.put('huge', samples(1000), 8000, None)
+    assert 'huge' not in cache and 'small' in cache
+
+
+def test_float64_is_stored_as_float32():
+    cache = AudioCache()
+    stored = cache.put('a', samples(100, np.float64), 8000, None)
+    assert stored.dtype == np.float32
+    assert cache.get('a')[0].dtype == np.float32
+
+
+def test_mono_mix_of_the_buffer_is_not_counted_twice():
+    audio = AudioBuffer(np.zeros((1000, 2), dtype=np.float32), 8000)
+    cache = AudioCache()
+    cache.put('a', audio.mono, 8000, audio)
+    assert cache.current_bytes == audio.nbytes
+
+
+def test_invalidate_drops_files_and_folders():
+    cache = AudioCache()
+    for path in ('/lib/a.wav', '/lib/sub/b.wav', '/lib/sub2/c.wav', '/other/d.wav'):
+        cache.put(path, samples(10), 8000, None)
+    cache.invalidate('/lib/a.wav')
+    cache.invalidate_prefix('/lib/sub')
+    assert set(cache.entries) == {'/lib/sub2/c.wav', '/other/d.wav'}
+    assert cache.current_bytes == 2 * 40
+
+
+def test_stats_count_hits_and_misses():
+    cache = AudioCache()
+    cache.put('a', samples(10), 8000, None)
+    cache.get('a')
+    cache.get('missing')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['hit_rate']) == (1, 1, 0.5)
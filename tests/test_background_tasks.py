@@ -0,0 +1,93 @@
+import threading
+
+from PySide6.QtCore import QThreadPool
+
+from BackgroundTasks import LatestTaskRunner, TaskCancelled, SingleThreadExecutor
+from core.MetaDataDB import MetaDataDB
+
+
+def make_runner(qapp):
+    pool = QThreadPool()
+    pool.setMaxThreadCount(1)
+    runner = LatestTaskRunner(pool)
+    results, errors = [], []
+    runner.result_ready.connect(results.append)
+    runner.error.connect(errors.append)
+    return runner, pool, results, errors
+
+
+def test_only_newest_result_is_delivered(qapp, wait_until):
+    runner, pool, results, errors = make_runner(qapp)
+    release = threading.Event()
+    runner.submit(lambda: release.wait(5) and 'first')
+    runner.submit(lambda: 'second')
+    release.set()
+    pool.waitForDone()
+    wait_until(lambda: not runner.busy)
+    qapp.processEvents()
+    assert results == ['second']
+    assert errors == []
+
+
+def test_cancel_sets_the_running_task_cancel_event(qapp, wait_until):
+    runner, pool, results, errors = make_runner(qapp)
+    started, seen = threading.Event(), []
+
+    def work(cancel_event=None):
+        started.set()
+        seen.append(cancel_event.wait(5))
+        raise TaskCancelled()
+
+    runner.submit(work, pass_cancel_event=True)
+    assert started.wait(5)
+    runner.cancel()
+    pool.waitForDone()
+    qapp.processEvents()
+    assert seen == [True]
+    assert not runner.busy
+    # A cancelled request reports nothing, not even its TaskCancelled
+    assert results == [] and errors == []
+
+
+def test_cancel_pulls_a_queued_task_before_it_runs(qapp):
+    runner, pool, results, errors = make_runner(qapp)
+    release, ran = threading.Event(), []
+    runner.submit(lambda: release.wait(5))
+    # Queued behind the first on the single pool thread; superseding it takes it off the queue
+    pool.start(lambda: None)
+    runner.submit(lambda: ran.append('queued'))
+    runner.cancel()
+    release.set()
+    pool.waitForDone()
+    qapp.processEvents()
+    assert ran == []
+    assert results == [] and errors == []
+
+
+def test_single_thread_executor_keeps_a_connection_between_tasks(qapp, wait_until, tmp_path):
+    db = MetaDataDB(db_path=str(tmp_path / 'library.db'))
+    executor = SingleThreadExecutor()
+    runner = LatestTaskRunner(executor)
+    results = []
+    runner.result_ready.connect(results.append)
+    for _ in range(2):
+        runner.submit(lambda: db.connection)
+        wait_until(lambda: not runner.busy)
+    assert len(results) == 2 and results[0] is results[1]
+    executor.start(db.close)
+    executor.start(lambda: results.append(db._local.conn))
+    executor.shutdown()
+    assert results[2] is None
+
+
+def test_single_thread_executor_takes_queued_tasks(qapp):
+    executor = SingleThreadExecutor()
+    release, ran = threading.Event(), []
+    executor.start(lambda: release.wait(5))
+    queued = lambda: ran.append('queued')  # noqa: E731
+    executor.start(queued)
+    assert executor.tryTake(queued)
+    release.set()
+    executor.waitForDone()
+    assert ran == [] and not executor.tryTake(queued)
+    executor.shutdown()
@@ -0,0 +1,97 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import batch
+from core import EditGraph
+from core.MetaDataDB import MetaDataDB
+
+RATE = 8000
+
+
+def write_sound(path, channels=2, subtype='PCM_24'):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    rng = np.random.default_rng(len(path))
+    sf.write(path, rng.uniform(-0.5, 0.5, (RATE, channels)), RATE, subtype=subtype)
+    return path
+
+
+def test_edits_keep_the_command_line_order():
+    args = batch.build_parser().parse_args(['--glob', '*.wav', '--trim', '-40', '--highpass', '80',
+                                            '--bandpass', '300-3000', '--trim', '-30', '--in-place'])
+    assert args.operations == [('trim', -40.0), ('highpass', 80.0), ('bandpass', [300.0, 3000.0]), ('trim', -30.0)]
+    with pytest.raises(SystemExit):
+        batch.build_parser().parse_args(['--glob', '*.wav', '--bandpass', '300', '--in-place'])
+
+
+def test_select_files_by_glob_and_tag(tmp_path):
+    a = write_sound(str(tmp_path / 'in' / 'a.wav'))
+    b = write_sound(str(tmp_path / 'in' / 'sub' / 'b.wav'))
+    db_path = str(tmp_path / 'metadata.db')
+    db = MetaDataDB(db_path=db_path)
+    db.write_metadata(b, tags=['drums'])
+    db.close()
+    pattern = str(tmp_path / 'in' / '**' / '*.wav')
+    assert batch.select_files([pattern], []) == [a, b]
+    assert batch.select_files([pattern], ['drums'], db_path) == [b]
+
+
+def test_outputs_keep_the_layout_below_the_common_folder():
+    files = ['/in/a.wav', '/in/sub/b.wav']
+    assert batch.output_paths(files, '/out') == ['/out/a.wav', '/out/sub/b.wav']
+    assert batch.output_paths(files, None) == files
+
+
+def test_trim_is_relative_to_the_loudest_channel():
+    audio = batch.AudioBuffer(np.column_stack((np.full(100, 0.05), np.full(100, 0.5))), RATE)
+    quiet, loud = (np.asarray(node) for node in batch.build_chains(audio, [('trim', -12.0)]))
+    assert not quiet.any() and loud.all()
+
+
+def test_process_file_renders_the_chain_in_the_source_encoding(tmp_path):
+    source = write_sound(str(tmp_path / 'a.wav'))
+    out = str(tmp_path / 'out' / 'a.wav')
+    frames, channels, _ = batch.process_file(source, out, [('lowpass', 1000.0)], lazy_threshold_bytes=1 << 30)
+    assert (frames, channels) == (RATE, 2)
+    assert sf.info(out).subtype == 'PCM_24'
+    expected = [np.asarray(node) for node in batch.build_chains(batch.AudioBuffer.from_file(source), [('lowpass', 1000.0)])]
+    np.testing.assert_allclose(sf.read(out)[0], np.column_stack(expected), atol=2 ** -22)
+
+
+def test_main_writes_every_file(tmp_path):
+    write_sound(str(tmp_path / 'in' / 'a.wav'))
+    write_sound(str(tmp_path / 'in' / 'sub' / 'b.wav'))
+    out_dir = str(tmp_path / 'out')
+    assert batch.main(['--glob', str(tmp_path / 'in' / '**' / '*.wav'), '--stretch', '1.5',
+                       '--out-dir', out_dir, '--workers', '1']) == 0
+    stretched = batch.StretchNode(batch.SourceNode(np.zeros(RATE, dtype=np.float32), RATE), 1.5).frames
+    for name in ('a.wav', os.path.join('sub', 'b.wav')):
+        assert sf.info(os.path.join(out_dir, name)).frames == stretched
+    assert batch.main(['--glob', str(tmp_path / 'none' / '*.wav'), '--trim', '-40', '--in-place']) == 1
+
+
+def vocoder_pool_size():
+    return EditGraph.vocoder_pool._max_workers
+
+
+def test_workers_share_the_cpus_between_their_vocoder_threads(monkeypatch):
+    monkeypatch.setattr(os, 'cpu_count', lambda: 8)
+    assert [batch.vocoder_threads_per_worker(workers) for workers in (1, 3, 8, 16)] == [8, 2, 1, 1]
+    with ProcessPoolExecutor(max_workers=1, initializer=EditGraph.set_vocoder_threads, initargs=(2,)) as pool:
+        assert pool.submit(vocoder_pool_size).result() == 2
+
+
+def test_set_vocoder_threads_replaces_the_pool():
+    previous = EditGraph.vocoder_pool
+    try:
+        EditGraph.set_vocoder_threads(3)
+        assert EditGraph.vocoder_pool is not previous and vocoder_pool_size() == 3
+        assert EditGraph.map_chunks(lambda x: x * 2, range(4)) == [0, 2, 4, 6]
+        EditGraph.set_vocoder_threads(0)
+        assert vocoder_pool_size() == 1
+    finally:
+        EditGraph.vocoder_pool.shutdown()
+        EditGraph.vocoder_pool = previous
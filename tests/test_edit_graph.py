@@ -0,0 +1,75 @@
+import gc
+
+import numpy as np
+import pytest
+import scipy.signal as sig
+
+from core import EditGraph
+from core.EditGraph import CropNode, CropOutNode, FilterNode, SourceNode, StretchNode, TileCache, TrimNode, tile_cache
+from core.Filters import design_sos
+
+RATE = 8000
+
+
+@pytest.fixture
+def source():
+    rng = np.random.default_rng(1)
+    return SourceNode(rng.standard_normal(3 * EditGraph.EditNode.TILE_FRAMES + 123).astype(np.float32), RATE)
+
+
+def test_filter_matches_a_whole_signal_filtfilt(source):
+    node = FilterNode(source, 'lowpass', 1000)
+    expected = sig.sosfiltfilt(design_sos('lowpass', 1000, RATE), source.data)
+    np.testing.assert_allclose(np.asarray(node), expected, atol=1e-4)
+    # Tiles read out of order, warming up instead of carrying the state over
+    start = 2 * node.TILE_FRAMES + 17
+    np.testing.assert_allclose(node.read(start, 5000), expected[start:start + 5000], atol=1e-4)
+
+
+def test_trim_zeroes_quiet_samples(source):
+    trimmed = np.asarray(TrimNode(source, 0.5))
+    loud = np.abs(source.data) >= 0.5
+    np.testing.assert_array_equal(trimmed[loud], source.data[loud])
+    assert not trimmed[~loud].any()
+
+
+def test_crop_and_crop_out(source):
+    np.testing.assert_array_equal(np.asarray(CropNode(source, 100, 40000)), source.data[100:40000])
+    cut = CropOutNode(source, 100, 40000)
+    assert len(cut) == len(source) - 39900
+    np.testing.assert_array_equal(np.asarray(cut), np.concatenate((source.data[:100], source.data[40000:])))
+    np.testing.assert_array_equal(cut[50:150], np.concatenate((source.data[50:100], source.data[40000:40050])))
+
+
+def test_stretch_changes_the_length(source):
+    stretched = StretchNode(source, 2.0)
+    assert abs(len(stretched) - 2 * len(source)) <= 1
+    assert np.asarray(stretched).dtype == np.float32
+
+
+def test_slicing_reads_like_an_array(source):
+    node = TrimNode(source, 0.0)
+    np.testing.assert_array_equal(node[10:20], source.data[10:20])
+    np.testing.assert_array_equal(node[20:10:-1], source.data[20:10:-1])
+    assert node[-1] == source.data[-1]
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TileCache(max_bytes=3 * 400)
+    for index in range(3):
+        cache.put((1, index), np.zeros(100, dtype=np.float32))
+    cache.get((1, 0))
+    cache.put((1, 3), np.zeros(100, dtype=np.float32))
+    assert (1, 0) in cache and (1, 1) not in cache
+    assert cache.bytes == 3 * 400
+
+
+def test_collected_nodes_leave_nothing_in_the_cache(source):
+    node = FilterNode(source, 'highpass', 200)
+    node.read(0, 2 * node.TILE_FRAMES)
+    owner = id(node)
+    assert any(key[0] == owner for key in list(tile_cache.tiles))
+    EditGraph.prefetcher.submit(lambda: None).result()  # let the prefetch of the next tile finish
+    del node
+    gc.collect()
+    assert not any(key[0] == owner for key in list(tile_cache.tiles))
@@ -0,0 +1,126 @@
+import numpy as np
+
+from core.EditHistory import EditDelta, EditHistory
+
+VIEW = (0, 1)
+
+
+def edits(count, size=1000, seed=0):
+    """count + 1 successive versions of some audio, each rewriting an overlapping range."""
+    rng = np.random.default_rng(seed)
+    states = [rng.standard_normal(size).astype(np.float32)]
+    for i in range(count):
+        edited = states[-1].copy()
+        edited[100 + 50 * i:600 + 50 * i] *= -0.5
+        states.append(edited)
+    return states
+
+
+def record_all(history, states):
+    for before, after in zip(states, states[1:]):
+        assert history.record(before, after, VIEW)
+
+
+def test_undo_and_redo_round_trip():
+    states = edits(4)
+    history = EditHistory()
+    record_all(history, states)
+    data = states[-1]
+    for expected in reversed(states[:-1]):
+        data, view = history.undo(data, VIEW)
+        np.testing.assert_array_equal(data, expected)
+    assert history.undo(data, VIEW) is None
+    for expected in states[1:]:
+        data, view = history.redo(data, VIEW)
+        np.testing.assert_array_equal(data, expected)
+    assert not history.can_redo
+
+
+def test_unchanged_data_records_nothing():
+    data = np.zeros(10, dtype=np.float32)
+    assert not EditHistory().record(data, data.copy(), VIEW)
+
+
+def test_scattered_changes_keep_only_those_samples():
+    before = np.zeros(10000, dtype=np.float32)
+    after = before.copy()
+    after[[5, 5000, 9000]] = 1.0
+    (delta,) = EditDelta.between(before, after, VIEW)
+    assert delta.kind == EditDelta.SPARSE
+    assert delta.size == 3
+
+
+def test_crop_keeps_only_the_cut_ends():
+    before = np.arange(1000, dtype=np.float32)
+    after = before[200:700]
+    history = EditHistory()
+    history.record(before, after, VIEW)
+    assert history.memory_bytes == (200 + 300) * 4
+    data, _ = history.undo(after, VIEW)
+    np.testing.assert_array_equal(data, before)
+
+
+def test_steps_over_the_budget_spill_to_disk_and_come_back(tmp_path):
+    states = edits(4)
+    history = EditHistory(max_bytes=0, spill_dir=str(tmp_path))
+    record_all(history, states)
+    assert history.memory_bytes == 0
+    assert history.stats()['spilled_deltas'] == 4
+    data = states[-1]
+    for expected in reversed(states[:-1]):
+        data, _ = history.undo(data, VIEW)
+        np.testing.assert_array_equal(data, expected)
+
+
+def test_failed_spill_drops_redo_steps_from_the_far_end(monkeypatch):
+    states = edits(4)
+    history = EditHistory()
+    record_all(history, states)
+    data = states[-1]
+    for _ in range(4):
+        data, _ = history.undo(data, VIEW)
+    np.testing.assert_array_equal(data, states[0])
+
+    def fail(self, directory):
+        raise OSError("disk full")
+    monkeypatch.setattr(EditDelta, 'spill', fail)
+    # Room for all but one redo step, so exactly one has to go
+    history.max_bytes = history.memory_bytes - 1
+    history.enforce_limits()
+    assert len(history.redo_steps) == 3
+
+    # The remaining redos still reproduce the recorded versions, in order
+    for expected in states[1:4]:
+        data, _ = history.redo(data, VIEW)
+        np.testing.assert_array_equal(data, expected)
+    assert not history.can_redo
+
+
+def test_failed_spill_drops_undo_steps_from_the_bottom(monkeypatch):
+    states = edits(4)
+    history = EditHistory()
+    record_all(history, states)
+
+    def fail(self, directory):
+        raise OSError("disk full")
+    monkeypatch.setattr(EditDelta, 'spill', fail)
+    history.max_bytes = history.memory_bytes - 1
+    history.enforce_limits()
+    assert len(history.undo_steps) == 3
+
+    data = states[-1]
+    for expected in reversed(states[1:-1]):
+        data, _ = history.undo(data, VIEW)
+        np.testing.assert_array_equal(data, expected)
+    assert not history.can_undo
+
+
+def test_depth_limit_forgets_the_oldest_steps():
+    states = edits(5)
+    history = EditHistory(max_depth=2)
+    record_all(history, states)
+    assert len(history.undo_steps) == 2
+    data = states[-1]
+    for expected in (states[4], states[3]):
+        data, _ = history.undo(data, VIEW)
+        np.testing.assert_array_equal(data, expected)
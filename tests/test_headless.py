@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+EPOCH123 = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Epoch123')
+
+
+def test_core_and_batch_import_without_qt():
+    script = '''
+import pkgutil, sys
+import core, batch, eutils
+for module in pkgutil.iter_modules(core.__path__):
+    __import__(f'core.{module.name}')
+print(sorted(name for name in sys.modules if name.startswith('PySide6')))
+'''
+    result = subprocess.run([sys.executable, '-c', script], cwd=EPOCH123, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == '[]'
+
+
+def test_paths_print_nothing():
+    script = 'from core.paths import get_main_sound_dir_path; get_main_sound_dir_path("Epoch123/DB")'
+    result = subprocess.run([sys.executable, '-c', script], cwd=EPOCH123, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout == ''
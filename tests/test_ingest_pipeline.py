@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import IngestPipeline
+from IngestPipeline import IngestWorker
+from core.MetaDataDB import MetaDataDB
+
+
+def write_sounds(directory, count, rate=8000):
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for index in range(count):
+        path = os.path.join(directory, f'sound{index:02d}.wav')
+        sf.write(path, np.zeros((rate // 10, 1), dtype=np.float32), rate)
+        paths.append(path)
+    return paths
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = MetaDataDB(db_path=str(tmp_path / 'metadata.db'))
+    yield db
+    db.close()
+
+
+def record(worker):
+    """Collect the worker's progress and batch signals; the slots run directly on this thread."""
+    signals = {'progress': [], 'batches': []}
+    worker.progress.connect(lambda done, total: signals['progress'].append((done, total)))
+    worker.batch_written.connect(signals['batches'].append)
+    return signals
+
+
+def test_directory_ingest_batches_rows_and_reports_progress(qapp, tmp_path, db, monkeypatch):
+    monkeypatch.setattr(IngestWorker, 'BATCH_SIZE', 3)
+    library = str(tmp_path / 'library')
+    paths = write_sounds(library, 7)
+    with open(os.path.join(library, 'broken.wav'), 'wb') as f:
+        f.write(b'not a wav file')
+    worker = IngestWorker.for_directory(db, library, max_workers=2)
+    signals = record(worker)
+
+    assert worker.ingest() == (7, 1)
+    assert sorted(db.get_all_files()) == paths
+    assert sum(signals['batches']) == 7 and max(signals['batches']) <= 3
+    assert signals['progress'][0] == (0, 8)
+    assert signals['progress'][-1] == (8, 8)
+    assert [done for done, _ in signals['progress']] == sorted(done for done, _ in signals['progress'])
+
+
+def test_uploads_are_copied_into_the_library(qapp, tmp_path, db):
+    sources = write_sounds(str(tmp_path / 'incoming'), 3)
+    library = tmp_path / 'library'
+    library.mkdir()
+    worker = IngestWorker.for_uploads(db, sources, str(library))
+
+    assert worker.ingest() == (3, 0)
+    copies = sorted(str(library / os.path.basename(path)) for path in sources)
+    assert sorted(db.get_all_files()) == copies
+    assert all(os.path.exists(path) for path in sources + copies)
+
+
+def test_large_ingests_use_a_process_pool(qapp, tmp_path, db, monkeypatch):
+    monkeypatch.setattr(IngestWorker, 'PROCESS_POOL_THRESHOLD', 4)
+    paths = write_sounds(str(tmp_path / 'library'), 4)
+    worker = IngestWorker(db, jobs=[(path, None) for path in paths], max_workers=2)
+    assert isinstance(worker.create_executor(3), ThreadPoolExecutor)
+    executor = worker.create_executor(4)
+    assert isinstance(executor, ProcessPoolExecutor)
+    executor.shutdown()
+
+    assert worker.ingest() == (4, 0)
+    assert sorted(db.get_all_files()) == paths
+
+
+def test_cancel_keeps_the_rows_of_files_already_copied(qapp, tmp_path, db, monkeypatch):
+    sources = write_sounds(str(tmp_path / 'incoming'), 20)
+    library = tmp_path / 'library'
+    library.mkdir()
+    cancelled = threading.Event()
+
+    def slow_ingest_file(source, destination):
+        # Hold every job but the first until cancel, so some work is still in flight
+        if not source.endswith('sound00.wav'):
+            cancelled.wait(5)
+            time.sleep(0.02)
+        return ingest_file(source, destination)
+
+    ingest_file = IngestPipeline.ingest_file
+    monkeypatch.setattr(IngestPipeline, 'ingest_file', slow_ingest_file)
+    worker = IngestWorker.for_uploads(db, sources, str(library), max_workers=1)
+
+    def cancel_after_first(done, total):
+        if done:
+            worker.cancel()
+            cancelled.set()
+    worker.progress.connect(cancel_after_first)
+
+    written, failed = worker.ingest()
+    copied = sorted(str(path) for path in library.iterdir())
+    assert failed == 0
+    assert 1 <= written < len(sources)
+    assert sorted(db.get_all_files()) == copied
+
+
+def test_run_reports_finished_when_ingest_raises(qapp, tmp_path, db, monkeypatch):
+    def fail(self):
+        raise OSError("disk went away")
+    monkeypatch.setattr(IngestWorker, 'ingest', fail)
+    worker = IngestWorker(db, jobs=[('a.wav', None), ('b.wav', None)])
+    finished = []
+    worker.ingest_finished.connect(lambda written, failed: finished.append((written, failed)))
+
+    worker.run()
+    assert finished == [(0, 2)]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from core.AudioBuffer import AudioBuffer, LazyAudioBuffer
+
+RATE = 8000
+FRAMES = 1000
+
+
+def write_noise(tmp_path, name, subtype, channels=2, frames=FRAMES):
+    path = str(tmp_path / name)
+    samples = np.random.default_rng(7).uniform(-0.9, 0.9, (frames, channels)).astype(np.float32)
+    sf.write(path, samples, RATE, subtype=subtype)
+    # What the file decodes to, after quantisation by the subtype
+    return path, sf.read(path, dtype='float32', always_2d=True)[0]
+
+
+@pytest.mark.parametrize('name, subtype, mapped', [
+    ('a.wav', 'PCM_16', True),
+    ('a.wav', 'PCM_32', True),
+    ('a.wav', 'FLOAT', True),
+    ('a.wav', 'PCM_24', False),
+    ('a.flac', 'PCM_16', False),
+])
+def test_reads_match_a_full_decode(tmp_path, name, subtype, mapped):
+    path, expected = write_noise(tmp_path, name, subtype)
+    buffer = LazyAudioBuffer(path)
+    try:
+        assert (buffer.mapped is not None) == mapped
+        assert (buffer.frames, buffer.channels, buffer.sample_rate) == (FRAMES, 2, RATE)
+        for start, count in [(0, 100), (123, 456), (FRAMES - 10, 10), (FRAMES - 10, 50), (-5, 5)]:
+            window = buffer.read(start, count)
+            assert window.dtype == np.float32
+            first = max(start, 0)
+            np.testing.assert_allclose(window, expected[first:first + count], atol=1e-6)
+        # Reads at or past the tail come back empty, not as an error
+        assert buffer.read(FRAMES, 10).shape == (0, 2)
+        assert buffer.read(FRAMES + 100, 10).shape == (0, 2)
+    finally:
+        buffer.close()
+
+
+def test_mono_slices_and_reversed_reads(tmp_path):
+    path, expected = write_noise(tmp_path, 'a.wav', 'PCM_16')
+    buffer = LazyAudioBuffer(path)
+    mono, expected_mono = buffer.mono, expected.mean(axis=1)
+    assert len(mono) == FRAMES
+    np.testing.assert_allclose(mono[100:200], expected_mono[100:200], atol=1e-6)
+    np.testing.assert_allclose(mono[990:], expected_mono[990:], atol=1e-6)
+    np.testing.assert_allclose(mono[200:100:-3], expected_mono[200:100:-3], atol=1e-6)
+    np.testing.assert_allclose(mono[-1], expected_mono[-1], atol=1e-6)
+    with pytest.raises(IndexError):
+        mono[FRAMES]
+    backwards = buffer.reversed()
+    np.testing.assert_allclose(backwards.read(0, 10), expected[::-1][:10], atol=1e-6)
+    np.testing.assert_allclose(backwards.read(FRAMES - 5, 10), expected[4::-1], atol=1e-6)
+    assert backwards.reversed() is buffer
+
+
+def test_from_file_opens_large_files_lazily(tmp_path):
+    path, expected = write_noise(tmp_path, 'a.wav', 'PCM_16')
+    assert isinstance(AudioBuffer.from_file(path), AudioBuffer)
+    buffer = AudioBuffer.from_file(path, lazy_threshold_bytes=FRAMES)
+    assert isinstance(buffer, LazyAudioBuffer)
+    np.testing.assert_allclose(buffer.read(0, FRAMES), expected, atol=1e-6)
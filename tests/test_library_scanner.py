@@ -0,0 +1,68 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from core.LibraryScanner import LibraryScanner
+from core.MetaDataDB import MetaDataDB
+
+
+def write_sound(path, seconds=0.5, channels=1, rate=8000):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    sf.write(path, np.zeros((int(seconds * rate), channels), dtype=np.float32), rate)
+    return path
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = MetaDataDB(db_path=str(tmp_path / 'metadata.db'))
+    yield db
+    db.close()
+
+
+def test_scan_stores_the_header_metadata(tmp_path, db):
+    library = tmp_path / 'library'
+    path = write_sound(str(library / 'a.wav'), seconds=1.5, channels=2)
+    (library / 'notes.txt').write_text('not audio')
+    assert LibraryScanner(db).scan(str(library)) == 1
+    _, name, stored_path, channels, rate, _, duration, _ = db.get_metadata(path)
+    assert (name, stored_path, channels, rate, duration) == ('a.wav', path, 2, 8000, 1.5)
+
+
+def test_only_new_and_changed_files_are_found_again(tmp_path, db):
+    library = str(tmp_path / 'library')
+    kept = write_sound(os.path.join(library, 'kept.wav'))
+    edited = write_sound(os.path.join(library, 'sub', 'edited.wav'))
+    scanner = LibraryScanner(db)
+    scanner.scan(library)
+    assert scanner.find_changes(library) == ([], [])
+
+    write_sound(edited, seconds=1.0)
+    added = write_sound(os.path.join(library, 'added.wav'))
+    changed, removed = scanner.find_changes(library)
+    assert sorted(path for path, _ in changed) == sorted([edited, added])
+    assert removed == []
+    assert kept not in (path for path, _ in changed)
+
+
+def test_removed_files_are_forgotten_but_unreadable_ones_kept(tmp_path, db):
+    library = str(tmp_path / 'library')
+    gone = write_sound(os.path.join(library, 'gone.wav'))
+    hidden = write_sound(os.path.join(library, 'locked', 'hidden.wav'))
+    outside = write_sound(str(tmp_path / 'elsewhere' / 'outside.wav'))
+    scanner = LibraryScanner(db)
+    scanner.scan(library)
+    scanner.scan(os.path.dirname(outside))
+
+    os.unlink(gone)
+    os.chmod(os.path.dirname(hidden), 0o300)  # listable no more, but its files can still be stat-ed
+    try:
+        changed, removed = scanner.find_changes(library)
+    finally:
+        os.chmod(os.path.dirname(hidden), 0o755)
+    assert changed == []
+    # hidden.wav could not be listed but still exists, and outside.wav is in another folder
+    assert removed == [gone]
+    scanner.scan(library)
+    assert not db.file_already_exists(gone) and db.file_already_exists(hidden)
@@ -0,0 +1,163 @@
+import sqlite3
+
+import pytest
+
+from core.MetaDataDB import LIBRARY_SORT_KEYS, MIGRATIONS, MetaDataDB
+
+ROOT = '/library'
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = MetaDataDB(db_path=str(tmp_path / 'metadata.db'))
+    yield db
+    db.close()
+
+
+def add_files(db, paths, **columns):
+    db.insert_many([(path.rsplit('/', 1)[1], path, 1, columns.get('sample_rate', 44100),
+                     columns.get('file_size', 10.0), columns.get('duration', 1.0)) for path in paths])
+
+
+def database_at_version(path, version):
+    """A database built by the first version migrations, as an older release left it."""
+    conn = sqlite3.connect(path, isolation_level=None)
+    for migration in MIGRATIONS[:version]:
+        migration(conn.cursor())
+    conn.execute(f"PRAGMA user_version = {version}")
+    return conn
+
+
+def test_search_limit_counts_only_files_under_the_directory(db):
+    add_files(db, [f'/elsewhere/dog_{i}.wav' for i in range(5)] + [f'{ROOT}/dog_{i}.wav' for i in range(3)])
+    assert len(db.search('dog', limit=3)) == 3
+    assert sorted(db.search('dog', limit=3, directory=ROOT)) == [f'{ROOT}/dog_{i}.wav' for i in range(3)]
+
+
+def test_library_pages_cover_every_file_once_in_order(db):
+    # Repeated sort values, so pages have to break ties on file_id
+    paths = [f'{ROOT}/folder_{i % 3}/sound_{i % 7}_{i}.wav' for i in range(50)]
+    db.insert_many([(path.rsplit('/', 1)[1], path, 1, 44100 if i % 2 else None, float(i % 5), float(i % 4))
+                    for i, path in enumerate(paths)])
+    db.tag_many((path, f'tag_{i % 3}') for i, path in enumerate(paths[::2]))
+    add_files(db, ['/elsewhere/sound.wav'])
+    for sort_key in LIBRARY_SORT_KEYS:
+        for descending in (False, True):
+            rows, after = [], None
+            while True:
+                page = db.library_page(ROOT, sort_key, descending, after=after, limit=8)
+                if not page:
+                    break
+                rows.extend(page)
+                after = page[-1][:2]
+            assert sorted(row[3] for row in rows) == sorted(paths)
+            keys = [row[:2] for row in rows]
+            assert keys == sorted(keys, reverse=descending)
+    assert db.count_library(ROOT) == 50
+    assert db.count_library(ROOT, paths[:4]) == 4
+
+
+def test_write_metadata_rolls_back_when_tagging_fails(tmp_path):
+    errors = []
+    db = MetaDataDB(db_path=str(tmp_path / 'metadata.db'), on_error=lambda title, message: errors.append(title))
+    path = f'{ROOT}/a.wav'
+    db.write_metadata(path, description='first', tags=['wind'])
+    db.execute_query("""
+        CREATE TRIGGER reject_tags BEFORE INSERT ON file_tags
+        BEGIN SELECT RAISE(ABORT, 'tagging failed'); END
+    """)
+    db.write_metadata(path, description='second', tags=['bird'])
+    assert errors == ["Error Writing Metadata"]
+    assert db.execute_query("SELECT description FROM audio_files WHERE file_path = ?", (path,)) == [('first',)]
+    assert db.get_tags_for_file(path) == ['wind']
+    db.close()
+
+
+def test_tag_list_follows_tag_changes(db):
+    path = f'{ROOT}/a.wav'
+    add_files(db, [path])
+    db.tag_many([(path, 'wind'), (path, 'bird')])
+
+    def tag_list():
+        return db.execute_query("SELECT tag_list FROM audio_files WHERE file_path = ?", (path,))[0][0]
+    assert tag_list() == 'bird, wind'
+    db.execute_query("UPDATE tags SET tag_name = 'zebra' WHERE tag_name = 'bird'")
+    assert tag_list() == 'wind, zebra'
+    db.remove_tag_from_file(path, 'wind')
+    assert tag_list() == 'zebra'
+    db.remove_tag('zebra')
+    assert tag_list() is None
+
+
+def test_upgrade_to_v5_fills_tag_list(tmp_path):
+    path = str(tmp_path / 'metadata.db')
+    conn = database_at_version(path, 4)
+    conn.execute("INSERT INTO audio_files (file_name, file_path) VALUES ('a.wav', '/library/a.wav')")
+    conn.execute("INSERT INTO tags (tag_name) VALUES ('rain'), ('door')")
+    conn.execute("INSERT INTO file_tags (file_id, tag_id) SELECT 1, tag_id FROM tags")
+    conn.close()
+
+    db = MetaDataDB(db_path=path)
+    assert db.schema_version == len(MIGRATIONS)
+    assert db.library_page(ROOT, 'tag_list')[0][7] == 'door, rain'
+    indexes = {row[0] for row in db.execute_query("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {f'idx_audio_files_sort_{column}' for column in LIBRARY_SORT_KEYS} <= indexes
+    db.close()
+
+
+def test_new_database_is_at_the_latest_version(db):
+    assert db.schema_version == len(MIGRATIONS)
+    columns = {row[1] for row in db.execute_query("PRAGMA table_info(audio_files)")}
+    assert {'file_bytes', 'mtime_ns', 'inode', 'tag_list'} <= columns
+
+
+def test_upgrade_from_v1_merges_duplicate_paths(tmp_path):
+    path = str(tmp_path / 'metadata.db')
+    conn = database_at_version(path, 1)
+    conn.executemany("INSERT INTO audio_files (file_name, file_path) VALUES (?, ?)",
+                     [('a.wav', '/library/a.wav'), ('a.wav', '/library/a.wav'), ('b.wav', '/library/b.wav')])
+    conn.execute("INSERT INTO tags (tag_name) VALUES ('rain')")
+    conn.execute("INSERT INTO file_tags (file_id, tag_id) VALUES (2, 1)")
+    conn.close()
+
+    db = MetaDataDB(db_path=path)
+    assert db.execute_query("SELECT file_id, file_path FROM audio_files ORDER BY file_id") == [
+        (1, '/library/a.wav'), (3, '/library/b.wav')]
+    # The duplicate's tag moved to the row that was kept
+    assert db.get_tags_for_file('/library/a.wav') == ['rain']
+    with pytest.raises(sqlite3.IntegrityError):
+        db.execute_query("INSERT INTO audio_files (file_name, file_path) VALUES ('a.wav', '/library/a.wav')")
+    db.close()
+
+
+def test_upgrade_to_v4_indexes_existing_files(tmp_path):
+    path = str(tmp_path / 'metadata.db')
+    conn = database_at_version(path, 3)
+    conn.execute("INSERT INTO audio_files (file_name, file_path, description) "
+                 "VALUES ('door.wav', '/library/door.wav', 'creaking hinge')")
+    conn.close()
+
+    db = MetaDataDB(db_path=path)
+    assert db.search('creak') == ['/library/door.wav']
+    db.close()
+
+
+def test_search_index_follows_every_write(db):
+    add_files(db, [f'{ROOT}/duck_quack.wav', f'{ROOT}/dog.wav'])
+    assert db.search('duc qua') == [f'{ROOT}/duck_quack.wav']
+    db.write_metadata(f'{ROOT}/dog.wav', description='barking in the yard')
+    assert db.search('yard') == [f'{ROOT}/dog.wav']
+    db.tag_many([(f'{ROOT}/dog.wav', 'animal')])
+    assert db.search('animal') == [f'{ROOT}/dog.wav']
+    db.execute_query("UPDATE tags SET tag_name = 'pet' WHERE tag_name = 'animal'")
+    assert db.search('animal') == [] and db.search('pet') == [f'{ROOT}/dog.wav']
+    db.rename_file(f'{ROOT}/dog.wav', f'{ROOT}/hound.wav')
+    assert db.search('hound') == [f'{ROOT}/hound.wav']
+    db.delete_file(f'{ROOT}/hound.wav')
+    assert db.search('pet') == []
+
+
+def test_file_name_matches_rank_first(db):
+    add_files(db, [f'{ROOT}/ambience.wav', f'{ROOT}/rain.wav'])
+    db.write_metadata(f'{ROOT}/ambience.wav', description='rain on a roof')
+    assert db.search('rain') == [f'{ROOT}/rain.wav', f'{ROOT}/ambience.wav']
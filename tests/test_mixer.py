@@ -0,0 +1,67 @@
+import numpy as np
+
+from core.Mixer import MixerSource
+from core.PlaybackEngine import ArraySource
+
+RATE = 8000
+
+
+def constant(value, frames, channels=None, rate=RATE):
+    shape = frames if channels is None else (frames, channels)
+    return ArraySource(np.full(shape, value, dtype=np.float32), rate)
+
+
+def test_tracks_start_at_their_offsets():
+    mixer = MixerSource(RATE, channels=1)
+    mixer.add_track(constant(0.25, 100))
+    mixer.add_track(constant(0.5, 100), offset=150)
+    assert mixer.frames == 250
+    out = mixer.read(0, 300)[:, 0]
+    assert len(out) == 250
+    np.testing.assert_array_equal(out[:100], 0.25)
+    np.testing.assert_array_equal(out[100:150], 0.0)
+    np.testing.assert_array_equal(out[150:], 0.5)
+    # A window straddling the second track's start
+    np.testing.assert_array_equal(mixer.read(140, 20)[:, 0], [0.0] * 10 + [0.5] * 10)
+
+
+def test_overlapping_tracks_sum_with_their_gains():
+    mixer = MixerSource(RATE, channels=1)
+    mixer.add_track(constant(0.25, 100))
+    track = mixer.add_track(constant(0.5, 100), gain=0.5, offset=50)
+    np.testing.assert_allclose(mixer.read(40, 20)[:, 0], [0.25] * 10 + [0.5] * 10)
+    track.gain = 0
+    np.testing.assert_array_equal(mixer.read(50, 50)[:, 0], 0.25)
+
+
+def test_tracks_at_another_rate_are_resampled():
+    mixer = MixerSource(RATE, channels=1)
+    track = mixer.add_track(constant(0.5, 400, rate=RATE // 2))
+    assert track.source.sample_rate == RATE and track.source.frames == 800
+    assert mixer.frames == 800
+    # Away from the filter's edge effects the level is unchanged
+    np.testing.assert_allclose(mixer.read(200, 400)[:, 0], 0.5, atol=1e-3)
+
+
+def test_mono_tracks_spread_and_extra_channels_fold():
+    mixer = MixerSource(RATE, channels=2)
+    mixer.add_track(constant(0.25, 10))
+    stereo = np.column_stack((np.full(10, 0.1), np.full(10, -0.1))).astype(np.float32)
+    mixer.add_track(ArraySource(stereo, RATE))
+    mixer.add_track(ArraySource(np.tile([0.3, 0.0, 0.0], (10, 1)).astype(np.float32), RATE), offset=10)
+    out = mixer.read(0, 20)
+    assert out.shape == (20, 2)
+    np.testing.assert_allclose(out[:10], np.tile([0.35, 0.15], (10, 1)))
+    np.testing.assert_allclose(out[10:], 0.1)
+
+
+def test_the_mix_is_clipped_to_full_scale():
+    mixer = MixerSource(RATE, channels=1)
+    mixer.add_track(constant(0.8, 10))
+    mixer.add_track(constant(0.8, 10))
+    mixer.add_track(constant(-0.9, 10), offset=5)
+    mixer.add_track(constant(-0.9, 10), offset=5)
+    out = mixer.read(0, 15)[:, 0]
+    np.testing.assert_array_equal(out[:5], 1.0)
+    np.testing.assert_allclose(out[5:10], -0.2, rtol=1e-6)
+    np.testing.assert_array_equal(out[10:], -1.0)
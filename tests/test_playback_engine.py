@@ -0,0 +1,131 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core.PlaybackEngine import ArraySource, StreamingEngine
+
+RATE = 8000
+BLOCK = 64
+
+
+@pytest.fixture
+def engine():
+    engine = StreamingEngine(block_frames=BLOCK)
+    engine.open_device(RATE, 1)
+    device = engine.device
+    # SDL never calls fill() while the device stays paused; the tests call it instead
+    engine.device = SimpleNamespace(pause=lambda paused: None, chunksize=BLOCK, frequency=RATE)
+    engine.open_device = lambda sample_rate, channels: setattr(engine, 'device_config', (int(sample_rate), channels))
+    yield engine
+    engine.device = device
+    engine.close()
+
+
+def pull(engine, blocks, channels=1):
+    """What the device would be handed over the next blocks callbacks, waiting for the feeder before each."""
+    out = []
+    for _ in range(blocks):
+        with engine.ring_changed:
+            engine.ring_changed.wait_for(lambda: engine.ring_count >= BLOCK or engine.feed_ended, timeout=5)
+        stream = bytearray(BLOCK * channels * 4)
+        engine.fill(None, stream)
+        out.append(np.frombuffer(stream, dtype=np.float32).reshape(-1, channels))
+    return np.concatenate(out)
+
+
+def ramp(frames):
+    return ArraySource(np.arange(frames, dtype=np.float32), RATE)
+
+
+def test_plays_to_the_end_then_stops(engine):
+    engine.load(ramp(150))
+    engine.play()
+    out = pull(engine, 4)
+    np.testing.assert_array_equal(out[:150, 0], np.arange(150))
+    assert not out[150:].any()
+    assert not engine.is_active() and engine.position == 150
+
+
+def test_region_and_seek_are_exact(engine):
+    engine.load(ramp(1000))
+    engine.set_region(100, 300)
+    engine.play()
+    np.testing.assert_array_equal(pull(engine, 1)[:, 0], np.arange(100, 164))
+    engine.seek(250)
+    out = pull(engine, 2)[:, 0]
+    np.testing.assert_array_equal(out[:50], np.arange(250, 300))
+    assert not out[50:].any() and not engine.is_active()
+
+
+def test_array_source_reads_clamp_to_the_data():
+    source = ArraySource(np.arange(10, dtype=np.float32), RATE)
+    np.testing.assert_array_equal(source.read(-5, 3), [0, 1, 2])
+    np.testing.assert_array_equal(source.read(8, 5), [8, 9])
+    assert len(source.read(12, 4)) == 0 and len(source.read(3, -1)) == 0
+
+
+def test_reversed_source_is_a_view_read_backwards():
+    samples = np.column_stack((np.arange(10), -np.arange(10))).astype(np.float32)
+    source = ArraySource(samples, RATE)
+    backwards = source.reversed()
+    assert np.shares_memory(backwards.samples, samples)
+    assert (backwards.frames, backwards.channels, backwards.sample_rate) == (10, 2, RATE)
+    np.testing.assert_array_equal(backwards.read(0, 3), samples[[9, 8, 7]])
+    np.testing.assert_array_equal(backwards.read(7, 5), samples[[2, 1, 0]])
+    np.testing.assert_array_equal(backwards.reversed().read(0, 10), samples)
+
+
+def test_reversed_region_plays_the_mirrored_frames(engine):
+    # AudioPlayer mirrors a region [100, 300) onto the reversed data the same way
+    frames, start, stop = 1000, 100, 300
+    engine.load(ramp(frames).reversed())
+    engine.set_region(frames - stop, frames - start)
+    engine.play()
+    out = pull(engine, 4)[:, 0]
+    np.testing.assert_array_equal(out[:stop - start], np.arange(stop - 1, start - 1, -1))
+    assert not out[stop - start:].any() and not engine.is_active()
+
+
+def test_looping_wraps_to_the_region_start(engine):
+    engine.load(ramp(1000))
+    engine.set_region(10, 110)
+    engine.set_looping(True)
+    engine.play()
+    out = pull(engine, 5)[:, 0]
+    np.testing.assert_array_equal(out, np.arange(5 * BLOCK) % 100 + 10)
+    assert engine.is_active() and engine.position == 5 * BLOCK % 100 + 10
+
+
+def test_gain_and_channels(engine):
+    engine.load(ArraySource(np.column_stack((np.ones(100), -np.ones(100))).astype(np.float32), RATE))
+    engine.set_gain(0.5)
+    engine.play()
+    out = pull(engine, 1, channels=2)
+    np.testing.assert_array_equal(out, np.tile([0.5, -0.5], (BLOCK, 1)))
+
+
+def test_slow_source_never_holds_up_the_callback(engine):
+    release = threading.Event()
+
+    class SlowSource(ArraySource):
+        def read(self, start, count):
+            if start >= 64:
+                release.wait(5)
+            return super().read(start, count)
+    engine.FEED_FRAMES = 64
+    engine.load(SlowSource(np.ones(1000, dtype=np.float32), RATE))
+    engine.play()
+    pull(engine, 1)
+    started = time.perf_counter()
+    stream = bytearray(BLOCK * 4)
+    engine.fill(None, stream)
+    engine.playhead()
+    assert time.perf_counter() - started < 0.5
+    # Silence while the feeder is stuck, counted as an underrun
+    assert not np.frombuffer(stream, dtype=np.float32).any()
+    assert engine.stats()['underruns'] >= 1
+    release.set()
+    assert pull(engine, 1).all()
@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+import pytest
+
+from core.EditGraph import FilterNode, SourceNode, TrimNode
+
+RATE = 8000
+
+
+@pytest.fixture
+def editor(qapp):
+    from PySide6.QtCore import QThreadPool
+    from PySide6.QtWidgets import QMainWindow
+    from AudioManager import AudioPlayer
+    from SoundEditor import SoundEditor
+
+    window = QMainWindow()
+    window.audio_player = AudioPlayer()
+    window.show_file_nav_widget = lambda: None
+    editor = SoundEditor(window)
+    window.setCentralWidget(editor)
+    yield editor
+    editor.plot_widget.renderer.cancel()
+    QThreadPool.globalInstance().waitForDone()
+
+
+def test_trim_waits_for_the_overview_instead_of_rendering_here(editor, wait_until, monkeypatch):
+    gui_thread = threading.current_thread()
+    release, rendered_here = threading.Event(), []
+    render_range = FilterNode.render_range
+
+    def watched(node, start, stop):
+        if threading.current_thread() is gui_thread:
+            rendered_here.append((start, stop))
+        else:
+            release.wait(5)  # keep the overview render busy until the trim has been asked for
+        return render_range(node, start, stop)
+    monkeypatch.setattr(FilterNode, 'render_range', watched)
+
+    data = np.random.default_rng(5).uniform(-0.8, 0.8, 20 * RATE).astype(np.float32)
+    editor.set_audio_data(data, None, RATE, None)
+    editor.plot_widget.update_plot(data, RATE)
+    node = FilterNode(SourceNode(data, RATE), 'lowpass', 1000)
+    editor.plot_widget.apply_edit(node, "Low Pass")
+    assert editor.plot_widget.renderer.busy
+
+    editor.trim_audio(-20.0)
+    assert editor.audio_data is node and rendered_here == []
+    release.set()
+    wait_until(lambda: isinstance(editor.audio_data, TrimNode))
+    assert rendered_here == []
+    assert editor.audio_data.input is node
+    assert editor.audio_data.threshold == pytest.approx(node.peaks().abs_max() * 0.1)
+
+
+def test_trim_is_dropped_with_a_cancelled_render(editor, wait_until, monkeypatch):
+    release = threading.Event()
+    render_range = FilterNode.render_range
+    monkeypatch.setattr(FilterNode, 'render_range', lambda node, start, stop: (release.wait(5), render_range(node, start, stop))[1])
+
+    data = np.random.default_rng(6).uniform(-0.8, 0.8, 20 * RATE).astype(np.float32)
+    editor.set_audio_data(data, None, RATE, None)
+    editor.plot_widget.update_plot(data, RATE)
+    editor.plot_widget.apply_edit(FilterNode(SourceNode(data, RATE), 'lowpass', 1000), "Low Pass")
+    editor.trim_audio(-20.0)
+    editor.cancel_task()
+    release.set()
+    assert editor.pending_trim is None
+    # Cancelling undid the filter too
+    assert editor.audio_data is data
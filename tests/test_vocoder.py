@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from core.EditGraph import SourceNode, StretchNode
+from core.Vocoder import FRAME, hops_for, pitch_shift, time_stretch
+
+RATE = 44100
+
+
+def tone(frames, frequency=440.0, channels=None):
+    samples = (0.5 * np.sin(2 * np.pi * frequency * np.arange(frames) / RATE)).astype(np.float32)
+    return samples if channels is None else np.column_stack([samples] * channels)
+
+
+@pytest.mark.parametrize('frames', [0, 1000, 44100])
+@pytest.mark.parametrize('ratio', [0.5, 2.0, 4.0])
+def test_stretch_length_follows_the_hops(frames, ratio):
+    analysis_hop, synthesis_hop = hops_for(ratio)
+    out = time_stretch(tone(frames), ratio)
+    assert out.dtype == np.float32
+    assert len(out) == round(frames * synthesis_hop / analysis_hop)
+
+
+def test_short_input_is_stretched_not_dropped():
+    out = time_stretch(tone(1000), 2.0)
+    assert np.abs(out[200:1800]).max() > 0.1
+
+
+def test_stretch_matches_the_edit_graph():
+    samples = tone(20000, frequency=330.0)
+    streamed = time_stretch(samples, 2.0, block_frames=3000)
+    rendered = StretchNode(SourceNode(samples, RATE), 2.0)[:]
+    # Away from the ends, where the first and last frames are phased differently
+    interior = slice(FRAME, len(rendered) - FRAME)
+    np.testing.assert_allclose(streamed[interior], rendered[interior], atol=1e-5)
+
+
+def test_channels_are_kept():
+    out = time_stretch(tone(5000, channels=2), 2.0)
+    assert out.shape == (10000, 2)
+    np.testing.assert_allclose(out[:, 0], out[:, 1])
+    assert pitch_shift(tone(5000, channels=2), 1.5).shape == (5000, 2)
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+
+from core.WaveformCache import PeakPyramid, WaveformCache
+
+
+def make_file(path, size):
+    path.write_bytes(b'\0' * size)
+    return str(path)
+
+
+def test_pyramid_levels_bound_the_samples():
+    data = np.random.default_rng(3).standard_normal(100000).astype(np.float32)
+    peaks = PeakPyramid.build(data)
+    block_size, mins, maxs = peaks.levels[0]
+    assert block_size == PeakPyramid.BASE_BLOCK
+    assert mins.min() == data.min() and maxs.max() == data.max()
+    assert peaks.abs_max() == np.abs(data).max()
+    assert len(peaks.levels[-1][1]) <= PeakPyramid.MIN_LEVEL_BLOCKS
+
+
+def test_entry_is_reused_until_the_file_changes(tmp_path):
+    cache = WaveformCache(str(tmp_path / 'peaks'))
+    sound = make_file(tmp_path / 'a.wav', 10)
+    data = np.arange(1000, dtype=np.float32)
+    cache.get(sound, data)
+    first = cache.entries_for(sound)
+    assert len(first) == 1
+
+    make_file(tmp_path / 'a.wav', 20)
+    cache.get(sound, data)
+    second = cache.entries_for(sound)
+    assert len(second) == 1 and second != first
+
+
+def test_remove_forgets_the_file(tmp_path):
+    cache = WaveformCache(str(tmp_path / 'peaks'))
+    sound = make_file(tmp_path / 'a.wav', 10)
+    cache.get(sound, np.zeros(100, dtype=np.float32))
+    cache.remove(sound)
+    assert os.listdir(cache.cache_dir) == []
+
+
+def test_least_recently_used_entries_go_first(tmp_path):
+    cache = WaveformCache(str(tmp_path / 'peaks'))
+    data = np.zeros(100000, dtype=np.float32)
+    sounds = [make_file(tmp_path / f'{name}.wav', 10) for name in 'abc']
+    for when, sound in enumerate(sounds[:2]):
+        cache.get(sound, data)
+        os.utime(cache.entries_for(sound)[0], ns=(when * 10**9, when * 10**9))
+    entry_size = os.path.getsize(cache.entries_for(sounds[0])[0])
+    cache.max_bytes = 2 * entry_size
+    cache.get(sounds[0], data)  # a hit makes a the most recently used
+    cache.get(sounds[2], data)
+    assert cache.entries_for(sounds[1]) == []
+    assert cache.entries_for(sounds[0]) and cache.entries_for(sounds[2])
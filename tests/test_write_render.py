@@ -0,0 +1,38 @@
+import os
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from core.EditGraph import CropNode, SourceNode, TrimNode, write_render
+
+RATE = 8000
+
+
+@pytest.fixture
+def graphs():
+    rng = np.random.default_rng(2)
+    channels = rng.uniform(-0.9, 0.9, (2, 3 * SourceNode.RENDER_CHUNK_FRAMES // 2)).astype(np.float32)
+    return [CropNode(TrimNode(SourceNode(channel, RATE), 0.1), 5, len(channel) - 5) for channel in channels]
+
+
+def test_writes_every_channel_of_the_render(tmp_path, graphs):
+    path = str(tmp_path / 'out.wav')
+    fractions = []
+    write_render(graphs, RATE, path, on_chunk=fractions.append, subtype='FLOAT')
+    data, rate = sf.read(path, dtype='float32')
+    assert rate == RATE
+    np.testing.assert_array_equal(data, np.column_stack([np.asarray(graph) for graph in graphs]))
+    assert fractions == sorted(fractions) and fractions[-1] == 1.0
+
+
+def test_abandoned_write_leaves_the_file_as_it_was(tmp_path, graphs):
+    path = tmp_path / 'out.wav'
+    path.write_bytes(b'original')
+
+    def cancel(fraction):
+        raise KeyboardInterrupt
+    with pytest.raises(KeyboardInterrupt):
+        write_render(graphs, RATE, str(path), on_chunk=cancel)
+    assert path.read_bytes() == b'original'
+    assert os.listdir(tmp_path) == ['out.wav']